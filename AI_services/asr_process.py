@@ -0,0 +1,235 @@
+"""
+asr_process.py
+Whisper in a dedicated worker process, fed through shared memory.
+
+Decoding in a thread of the capture process competes with the PortAudio
+callback for the GIL, which shows up as input overflows. ASRProcess hosts
+the model in its own process instead:
+
+ - audio goes through a multiprocessing.shared_memory block split into
+   fixed-size slots; the parent copies an utterance into a free slot and
+   only (job id, slot, length, options) crosses the pipe
+ - results come back as small dicts (text + slim segments)
+ - no free slot -> the utterance is dropped (counted), capture never waits
+ - a monitor thread notices a dead or wedged worker, fails the jobs it was
+   holding and starts a fresh one on the same shared memory
+
+ASRProcess.transcribe(audio, **options) mirrors model.transcribe(), so it
+can stand in for the model (cli.py --asr-process).
+"""
+
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+SEGMENT_KEYS = ("start", "end", "text", "avg_logprob", "no_speech_prob", "words")
+
+
+class WorkerCrashed(RuntimeError):
+    pass
+
+
+def _slim(result):
+    segments = [{k: s[k] for k in SEGMENT_KEYS if k in s} for s in result.get("segments", [])]
+    return {"text": result.get("text", ""), "language": result.get("language"), "segments": segments}
+
+
+def _worker_main(shm_name, n_slots, slot_samples, model_name, device, dtype, requests, responses):
+    import model_registry
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray((n_slots, slot_samples), dtype=np.float32, buffer=shm.buf)
+    try:
+        model = model_registry.warm_up_whisper(model_name, device, dtype)
+        responses.put(("ready", None, None))
+        while True:
+            message = requests.get()
+            if message is None:
+                break
+            job_id, op, slot, n, options = message
+            try:
+                audio = slots[slot, :n]
+                if op == "detect":
+                    from language import whisper_detect
+
+                    result = whisper_detect(model, audio)
+                else:
+                    result = _slim(model.transcribe(audio, **options))
+                responses.put((job_id, result, None))
+            except Exception as e:
+                responses.put((job_id, None, f"{type(e).__name__}: {e}"))
+    finally:
+        del slots
+        shm.close()
+
+
+class ASRProcess:
+    def __init__(self, model_name="base", device=None, dtype="float32", slots=4, slot_seconds=30,
+                 job_timeout=60.0, start_timeout=300.0):
+        self.model_name = model_name
+        self.device = device
+        self.dtype = dtype
+        self.n_slots = slots
+        self.slot_samples = int(slot_seconds * SAMPLE_RATE)
+        self.job_timeout = job_timeout
+        self.start_timeout = start_timeout
+
+        self._ctx = mp.get_context("spawn")
+        self._shm = shared_memory.SharedMemory(create=True, size=slots * self.slot_samples * 4)
+        self._slots = np.ndarray((slots, self.slot_samples), dtype=np.float32, buffer=self._shm.buf)
+        self._free = queue.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+        self._jobs = {}                 # job id -> (future, slot, submitted)
+        self._jobs_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._ready = threading.Event()
+        self._ready_at = 0.0
+        self._closed = False
+        self.process = None
+        self.restarts = 0
+        self.dropped = 0
+        self.completed = 0
+
+        self._start_worker()
+        self._collector = threading.Thread(target=self._collect, daemon=True, name="asr-collector")
+        self._collector.start()
+        self._monitor = threading.Thread(target=self._watch, daemon=True, name="asr-monitor")
+        self._monitor.start()
+
+    def wait_ready(self, timeout=None):
+        if not self._ready.wait(self.start_timeout if timeout is None else timeout):
+            raise TimeoutError(f"ASR worker did not load '{self.model_name}' in time")
+
+    def submit(self, audio, op="transcribe", **options):
+        """Queue a job; returns a Future, or None when every slot is busy."""
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        if len(audio) > self.slot_samples:
+            raise ValueError(f"{len(audio) / SAMPLE_RATE:.1f} s of audio does not fit a "
+                             f"{self.slot_samples / SAMPLE_RATE:.0f} s slot")
+        try:
+            slot = self._free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return None
+        self._slots[slot, :len(audio)] = audio
+        job_id = next(self._ids)
+        future = Future()
+        with self._jobs_lock:
+            self._jobs[job_id] = (future, slot, time.monotonic())
+        self._requests.put((job_id, op, slot, len(audio), options))
+        return future
+
+    def transcribe(self, audio, **options):
+        future = self.submit(audio, **options)
+        if future is None:
+            print("⚠️ ASR worker busy, utterance dropped")
+            return {"text": "", "segments": [], "language": options.get("language")}
+        return future.result()
+
+    def detect(self, audio):
+        """{language: probability}, like language.whisper_detect."""
+        future = self.submit(audio, op="detect")
+        return future.result() if future is not None else {}
+
+    def stats(self):
+        return {"restarts": self.restarts, "dropped": self.dropped, "completed": self.completed,
+                "busy_slots": self.n_slots - self._free.qsize()}
+
+    def close(self):
+        self._closed = True
+        if self.process is not None and self.process.is_alive():
+            self._requests.put(None)
+            self.process.join(timeout=10)
+            if self.process.is_alive():
+                self.process.kill()
+        self._fail_all(WorkerCrashed("ASR worker closed"))
+        self._collector.join(timeout=1)
+        self._monitor.join(timeout=1)
+        del self._slots
+        self._shm.close()
+        self._shm.unlink()
+
+    # --- Internal helpers ---
+    def _start_worker(self):
+        # Fresh queues on every (re)start: nothing stale reaches the new worker.
+        self._ready.clear()
+        self._requests = self._ctx.Queue()
+        self._responses = self._ctx.Queue()
+        self.process = self._ctx.Process(
+            target=_worker_main, daemon=True, name="asr-worker",
+            args=(self._shm.name, self.n_slots, self.slot_samples, self.model_name, self.device, self.dtype,
+                  self._requests, self._responses))
+        self.process.start()
+
+    def _collect(self):
+        while not self._closed:
+            responses = self._responses
+            try:
+                job_id, result, error = responses.get(timeout=0.2)
+            except (queue.Empty, OSError, EOFError, ValueError):
+                continue
+            if job_id == "ready":
+                self._ready_at = time.monotonic()
+                self._ready.set()
+                continue
+            with self._jobs_lock:
+                entry = self._jobs.pop(job_id, None)
+            if entry is None:
+                continue          # job of a worker that was already given up on
+            future, slot, _ = entry
+            self._free.put(slot)
+            self.completed += 1
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(error))
+
+    def _watch(self):
+        failures = 0
+        while not self._closed:
+            time.sleep(0.5)
+            if self._closed:
+                return
+            if not self.process.is_alive():
+                reason = f"exit code {self.process.exitcode}"
+            elif self._ready.is_set() and self._oldest_job_age() > self.job_timeout:
+                reason = f"no result for {self.job_timeout:.0f} s"
+                self.process.kill()
+                self.process.join()
+            else:
+                continue
+            self._fail_all(WorkerCrashed(f"ASR worker died ({reason})"))
+            # A worker that cannot even load the model is retried with backoff.
+            failures = failures + 1 if not self._ready.is_set() else 0
+            delay = min(2 ** failures, 60) if failures else 0
+            print(f"💥 ASR worker died ({reason}), restarting" + (f" in {delay} s" if delay else ""))
+            if delay:
+                time.sleep(delay)
+            if self._closed:
+                return
+            self.restarts += 1
+            self._start_worker()
+
+    def _oldest_job_age(self):
+        with self._jobs_lock:
+            if not self._jobs:
+                return 0.0
+            oldest = min(submitted for _, _, submitted in self._jobs.values())
+        # Jobs queued while the worker was still loading count from when it became ready.
+        return time.monotonic() - max(oldest, self._ready_at)
+
+    def _fail_all(self, error):
+        with self._jobs_lock:
+            jobs, self._jobs = self._jobs, {}
+        for future, slot, _ in jobs.values():
+            self._free.put(slot)
+            if not future.done():
+                future.set_exception(error)
@@ -0,0 +1,282 @@
+"""
+asr_server.py
+Multi-session ASR service: one loaded Whisper model, many concurrent speakers.
+
+Every connected client streams 16 kHz mono PCM; each session has its own VAD,
+and finished utterances from all sessions go through one max-batch/max-wait
+scheduler (translate_batcher.MicroBatcher). A batch is padded to Whisper's
+30 s window, encoded and decoded in a single whisper.decode() call, and the
+results are routed back to their sessions in order. Under load batches grow,
+so the model runs few large forward passes instead of one per utterance per
+process.
+
+    python asr_server.py serve --model base --port 8765 --max-batch 8 --max-wait-ms 40
+    python asr_server.py client ../output.wav --sessions 8 --realtime
+
+Wire protocol (TCP), client -> server frames: 1-byte type + uint32 length +
+payload.
+ - b"H": hello, JSON {"language": "en" | null, "name": "..."}
+ - b"A": audio, int16 little-endian PCM, 16 kHz mono
+ - b"E": end of stream
+Server -> client: one JSON object per line, {"start", "end", "text", ...}
+per utterance, then {"event": "end"}.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import struct
+import sys
+import time
+
+import numpy as np
+
+import model_registry
+from metrics import Metrics
+from translate_batcher import MicroBatcher
+from vad import VadSegmenter
+
+SAMPLE_RATE = 16000
+HEADER = struct.Struct("<cI")
+HELLO, AUDIO, END = b"H", b"A", b"E"
+MAX_PENDING_PER_SESSION = 32      # utterances awaiting results before we stop reading the socket
+
+
+# --- Framing ---
+async def read_frame(reader):
+    kind, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return kind, (await reader.readexactly(length) if length else b"")
+
+
+def frame(kind, payload=b""):
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+# --- Batched decoding ---
+def whisper_decode_batch(model, audios, language=None, fp16=False):
+    """Decode up to 30 s clips in one forward pass; returns one dict per clip."""
+    import torch
+    import whisper
+
+    mels = torch.stack([whisper.log_mel_spectrogram(whisper.pad_or_trim(a), model.dims.n_mels)
+                        for a in audios]).to(model.device)
+    options = whisper.DecodingOptions(language=language, fp16=fp16, without_timestamps=True)
+    results = whisper.decode(model, mels, options)
+    return [{"text": r.text.strip(), "language": r.language, "avg_logprob": r.avg_logprob,
+             "no_speech_prob": r.no_speech_prob} for r in results]
+
+
+class ASRServer:
+    """`decode_batch(audios, language) -> [dict]` runs the model; it is only
+    ever called from one thread at a time (max_in_flight=1 per model)."""
+
+    def __init__(self, decode_batch, max_batch=8, max_wait_ms=40, metrics=None):
+        self.decode_batch = decode_batch
+        self.metrics = metrics or Metrics()
+        self.batcher = MicroBatcher(self._run_batch, max_items=max_batch, max_wait_ms=max_wait_ms,
+                                    max_in_flight=1)
+        self._ids = itertools.count(1)
+        self.sessions = 0
+        self.active = 0
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"🎧 ASR server listening on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        session_id = next(self._ids)
+        self.sessions += 1
+        self.active += 1
+        self.metrics.set_gauge("asr_sessions_active", self.active)
+        pending = asyncio.Queue(maxsize=MAX_PENDING_PER_SESSION)
+        sender = asyncio.create_task(self._send_results(writer, pending))
+        try:
+            kind, payload = await read_frame(reader)
+            if kind != HELLO:
+                raise ValueError(f"expected hello frame, got {kind!r}")
+            hello = json.loads(payload or b"{}")
+            language = hello.get("language")
+            print(f"🔌 Session {session_id} ({hello.get('name', '?')}) connected")
+
+            segmenter = VadSegmenter(sample_rate=SAMPLE_RATE)
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind == AUDIO:
+                    samples = np.frombuffer(payload, dtype="<i2").astype(np.float32) / 32768.0
+                    for segment in segmenter.push(samples):
+                        await pending.put(self._submit(segment, language))
+                elif kind == END:
+                    segment = segmenter.flush()
+                    if segment is not None:
+                        await pending.put(self._submit(segment, language))
+                    break
+                else:
+                    raise ValueError(f"unknown frame type {kind!r}")
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            print(f"⚠️ Session {session_id} disconnected mid-stream")
+        except Exception as e:
+            print(f"Error in session {session_id}:", e)
+        finally:
+            await pending.put(None)
+            await sender
+            writer.close()
+            self.active -= 1
+            self.metrics.set_gauge("asr_sessions_active", self.active)
+            print(f"👋 Session {session_id} closed")
+
+    def close(self):
+        self.batcher.close()
+
+    # --- Internal helpers ---
+    def _submit(self, segment, language):
+        future = asyncio.wrap_future(self.batcher.submit((segment.audio, language)))
+        return segment, future, time.perf_counter()
+
+    async def _send_results(self, writer, pending):
+        # Results go out in utterance order, whatever order batches finish in.
+        while True:
+            entry = await pending.get()
+            if entry is None:
+                break
+            segment, future, submitted = entry
+            try:
+                result = await future
+            except Exception as e:
+                result = {"error": str(e)}
+            latency = time.perf_counter() - submitted
+            self.metrics.observe("asr_result_latency_seconds", latency)
+            result.update(start=round(segment.start / SAMPLE_RATE, 3), end=round(segment.end / SAMPLE_RATE, 3),
+                          latency=round(latency, 3))
+            try:
+                writer.write((json.dumps(result) + "\n").encode("utf-8"))
+                await writer.drain()
+            except ConnectionError:
+                pass
+        try:
+            writer.write(b'{"event": "end"}\n')
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    def _run_batch(self, items):
+        results = [None] * len(items)
+        groups = {}
+        for index, (_, language) in enumerate(items):
+            groups.setdefault(language, []).append(index)
+        for language, indexes in groups.items():
+            audios = [items[i][0] for i in indexes]
+            started = time.perf_counter()
+            decoded = self.decode_batch(audios, language)
+            elapsed = time.perf_counter() - started
+            self.metrics.observe("asr_batch_size", len(audios))
+            self.metrics.observe("asr_batch_seconds", elapsed)
+            self.metrics.observe("asr_batch_rtf", elapsed / max(sum(len(a) for a in audios) / SAMPLE_RATE, 1e-3))
+            for i, result in zip(indexes, decoded):
+                results[i] = result
+        return results
+
+
+# --- Client: replay WAV files as concurrent sessions ---
+async def replay_session(host, port, audio, name, language=None, realtime=False, block_seconds=0.1):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(frame(HELLO, json.dumps({"name": name, "language": language}).encode("utf-8")))
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    block = int(SAMPLE_RATE * block_seconds)
+
+    async def send():
+        started = time.perf_counter()
+        for i, pos in enumerate(range(0, len(pcm), block)):
+            writer.write(frame(AUDIO, pcm[pos:pos + block].tobytes()))
+            await writer.drain()
+            if realtime:
+                await asyncio.sleep(max(0.0, started + (i + 1) * block_seconds - time.perf_counter()))
+        writer.write(frame(END))
+        await writer.drain()
+
+    sender = asyncio.create_task(send())
+    results = []
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        message = json.loads(line)
+        if message.get("event") == "end":
+            break
+        results.append(message)
+        print(f"[{name}] {message.get('start', 0):7.2f}s {message.get('text', message.get('error'))}")
+    await sender
+    writer.close()
+    return results
+
+
+async def run_clients(args):
+    from batch_transcribe import to_float_mono, wav_memmap
+
+    clips = []
+    for path in args.paths:
+        frames, sample_rate = wav_memmap(path)
+        clips.append(to_float_mono(frames, sample_rate))
+    started = time.perf_counter()
+    sessions = [replay_session(args.host, args.port, clips[i % len(clips)], f"client-{i + 1}",
+                               args.language, args.realtime) for i in range(args.sessions)]
+    results = await asyncio.gather(*sessions)
+    elapsed = time.perf_counter() - started
+
+    audio_seconds = sum(len(clips[i % len(clips)]) for i in range(args.sessions)) / SAMPLE_RATE
+    latencies = [r["latency"] for rs in results for r in rs if "latency" in r]
+    print(f"📊 {args.sessions} session(s), {audio_seconds:.1f} s of audio in {elapsed:.2f} s "
+          f"({audio_seconds / max(elapsed, 1e-9):.1f}x real time)", file=sys.stderr)
+    if latencies:
+        print(f"📊 Result latency p50 {np.percentile(latencies, 50):.2f} s, "
+              f"p95 {np.percentile(latencies, 95):.2f} s", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-session batched ASR server and replay client.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="run the ASR server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--model", default="base")
+    serve.add_argument("--device", default=None)
+    serve.add_argument("--dtype", choices=("float32", "float16", "int8"), default="float32")
+    serve.add_argument("--max-batch", type=int, default=8, help="utterances per forward pass")
+    serve.add_argument("--max-wait-ms", type=float, default=40, help="max time to wait for a batch to fill")
+    serve.add_argument("--metrics", help="write metrics here on exit (.json, else Prometheus text)")
+
+    client = sub.add_parser("client", help="replay WAV files as concurrent sessions")
+    client.add_argument("paths", nargs="+", help="WAV files (reused round-robin across sessions)")
+    client.add_argument("--host", default="127.0.0.1")
+    client.add_argument("--port", type=int, default=8765)
+    client.add_argument("--sessions", type=int, default=4)
+    client.add_argument("--language", default=None)
+    client.add_argument("--realtime", action="store_true", help="send audio at real-time pace")
+    args = parser.parse_args(argv)
+
+    if args.command == "client":
+        asyncio.run(run_clients(args))
+        return
+
+    model = model_registry.warm_up_whisper(args.model, args.device, args.dtype)
+    fp16 = args.dtype == "float16"
+    server = ASRServer(lambda audios, language: whisper_decode_batch(model, audios, language, fp16),
+                       max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped (Ctrl+C pressed).")
+    finally:
+        server.close()
+        histograms = server.metrics.snapshot()["histograms"]
+        if "asr_batch_size" in histograms:
+            print(f"📊 {server.sessions} session(s), avg batch {histograms['asr_batch_size']['sum'] / histograms['asr_batch_size']['count']:.2f}")
+        if args.metrics:
+            server.metrics.dump(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+batch_transcribe.py
+Offline transcription of recorded audio (WAV files, SpeechData.audio_path).
+Recordings moved to the backend's audio store ("audio:<sha256>" paths) are
+decoded to temporary WAV files first.
+
+Each file is memory-mapped (nothing is read up front), split on silence with
+the same VAD used for live capture, and the resulting utterances are fanned
+out to a process pool. Every worker process loads its own Whisper model once
+and is pinned to a single torch thread, so throughput grows with the number
+of cores instead of fighting over them. Results are put back in order with
+timestamps relative to the start of each file.
+
+Usage:
+    python batch_transcribe.py ../output.wav
+    python batch_transcribe.py --db ../backend/app/dunno.db --workers 8 --format srt
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.request import pathname2url
+
+import numpy as np
+
+from vad import VadSegmenter
+
+SAMPLE_RATE = 16000
+BACKEND_APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "app")
+AUDIO_PREFIX = "audio:"
+SCAN_BLOCK_SECONDS = 10      # how much audio the VAD scans per step
+MAX_SEGMENT_SECONDS = 30     # Whisper's window; longer utterances are split
+
+
+# --- WAV access ---
+def wav_memmap(path):
+    """Memory-map the PCM data of a WAV file.
+
+    Returns (frames, sample_rate) where `frames` is a read-only array of shape
+    (n_frames, channels) backed by the file. Supports 16/32-bit integer and
+    32-bit float PCM.
+    """
+    with open(path, "rb") as f:
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            raise ValueError(f"{path}: not a RIFF/WAVE file")
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path}: no data chunk")
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", f.read(16))
+                f.seek(size - 16 + (size & 1), os.SEEK_CUR)
+            elif chunk_id == b"data":
+                offset = f.tell()
+                break
+            else:
+                f.seek(size + (size & 1), os.SEEK_CUR)
+
+    if fmt is None:
+        raise ValueError(f"{path}: no fmt chunk")
+    audio_format, channels, sample_rate, _, _, bits = fmt
+    if audio_format == 3 and bits == 32:
+        dtype = np.float32
+    elif audio_format in (1, 0xFFFE) and bits in (16, 32):
+        dtype = np.int16 if bits == 16 else np.int32
+    else:
+        raise ValueError(f"{path}: unsupported WAV format {audio_format} / {bits} bit")
+
+    n_frames = size // (channels * (bits // 8))
+    frames = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(n_frames, channels))
+    return frames, sample_rate
+
+
+def to_float_mono(frames, sample_rate, target_rate=SAMPLE_RATE):
+    """Convert a slice of mapped frames to mono float32 at `target_rate`."""
+    audio = frames.astype(np.float32)
+    if frames.dtype == np.int16:
+        audio /= 32768.0
+    elif frames.dtype == np.int32:
+        audio /= 2147483648.0
+    audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+    if sample_rate != target_rate and len(audio):
+        n_out = int(round(len(audio) * target_rate / sample_rate))
+        audio = np.interp(np.linspace(0, len(audio) - 1, n_out),
+                          np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+
+def split_on_silence(path, max_segment_seconds=MAX_SEGMENT_SECONDS):
+    """Return [(start_frame, end_frame), ...] of the speech regions of a file."""
+    frames, sample_rate = wav_memmap(path)
+    segmenter = VadSegmenter(sample_rate=SAMPLE_RATE, max_segment_ms=max_segment_seconds * 1000)
+    scale = sample_rate / SAMPLE_RATE
+    block = int(sample_rate * SCAN_BLOCK_SECONDS)
+
+    spans = []
+    for pos in range(0, len(frames), block):
+        for segment in segmenter.push(to_float_mono(frames[pos:pos + block], sample_rate)):
+            spans.append((int(segment.start * scale), int(segment.end * scale)))
+    segment = segmenter.flush()
+    if segment is not None:
+        spans.append((int(segment.start * scale), int(segment.end * scale)))
+    return spans
+
+
+# --- Worker process ---
+_model = None
+
+
+def _init_worker(model_name, threads):
+    """Process-pool initializer: one model per process, loaded once."""
+    global _model
+    import torch
+    import whisper
+
+    torch.set_num_threads(threads)
+    _model = whisper.load_model(model_name)
+
+
+def _transcribe_span(job):
+    file_index, span_index, path, start, end, language = job
+    frames, sample_rate = wav_memmap(path)
+    audio = to_float_mono(frames[start:end], sample_rate)
+    result = _model.transcribe(audio, fp16=False, language=language)
+
+    offset = start / sample_rate
+    segments = [
+        {"start": round(offset + s["start"], 3), "end": round(offset + s["end"], 3), "text": s["text"].strip()}
+        for s in result.get("segments", [])
+    ]
+    return file_index, span_index, segments, result.get("language")
+
+
+# --- Orchestration ---
+def transcribe_files(paths, model_name="base", workers=None, threads_per_worker=1, language=None):
+    """Transcribe `paths` in parallel; returns one dict per file, in input order."""
+    workers = workers or os.cpu_count() or 1
+    jobs = []
+    results = []
+    for file_index, path in enumerate(paths):
+        frames, sample_rate = wav_memmap(path)
+        spans = split_on_silence(path)
+        results.append({
+            "path": path,
+            "duration": round(len(frames) / sample_rate, 3),
+            "language": language,
+            "segments": [None] * len(spans),
+        })
+        for span_index, (start, end) in enumerate(spans):
+            jobs.append((file_index, span_index, path, start, end, language))
+
+    # Longest spans first so the pool does not end on one straggler.
+    jobs.sort(key=lambda j: j[4] - j[3], reverse=True)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_name, threads_per_worker)) as pool:
+        futures = [pool.submit(_transcribe_span, job) for job in jobs]
+        for future in as_completed(futures):
+            file_index, span_index, segments, detected = future.result()
+            results[file_index]["segments"][span_index] = segments
+            results[file_index]["language"] = results[file_index]["language"] or detected
+
+    for result in results:
+        result["segments"] = [s for span in result["segments"] for s in span]
+        result["text"] = " ".join(s["text"] for s in result["segments"] if s["text"])
+    return results
+
+
+def paths_from_db(db_path, audio_root=None, tmp_dir=None):
+    """Audio files referenced by the backend's speech_data table. Audio-store
+    references are decoded into `tmp_dir` as <sha256>.wav (the store is
+    `audio_root`, by default audio/ next to the DB)."""
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"No database at {db_path}")
+    # Read-only: a wrong path must not leave an empty database behind.
+    with sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True) as conn:
+        rows = conn.execute("SELECT audio_path FROM speech_data ORDER BY id").fetchall()
+    paths, store = [], None
+    for (path,) in rows:
+        if path and path.startswith(AUDIO_PREFIX):
+            if store is None:
+                store = open_audio_store(audio_root or os.path.join(os.path.dirname(os.path.abspath(db_path)), "audio"))
+            if not store.exists(path):
+                print(f"⚠️ {path} is not in the audio store {store.root}, skipped", file=sys.stderr)
+                continue
+            paths.append(store_ref_to_wav(store, path, tmp_dir))
+        elif path and os.path.exists(path):
+            paths.append(path)
+        elif path:
+            print(f"⚠️ Missing audio file {path}, skipped", file=sys.stderr)
+    return paths
+
+
+def open_audio_store(root):
+    sys.path.insert(0, os.path.abspath(BACKEND_APP_DIR))
+    from audio_store import AudioStore
+
+    return AudioStore(root)
+
+
+def store_ref_to_wav(store, ref, tmp_dir):
+    """Decode an audio-store segment to a 16-bit WAV file in `tmp_dir`."""
+    info = store.info(ref)
+    path = os.path.join(tmp_dir, ref[len(AUDIO_PREFIX):] + ".wav")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(info["sample_rate"])
+        w.writeframes(store.read(ref).tobytes())
+    return path
+
+
+# --- Output formats ---
+def _srt_time(seconds):
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def format_result(result, fmt):
+    if fmt == "json":
+        return json.dumps(result, ensure_ascii=False, indent=2)
+    if fmt == "srt":
+        lines = []
+        for i, s in enumerate(result["segments"], 1):
+            lines += [str(i), f"{_srt_time(s['start'])} --> {_srt_time(s['end'])}", s["text"], ""]
+        return "\n".join(lines)
+    return "\n".join(f"[{s['start']:8.2f} - {s['end']:8.2f}] {s['text']}" for s in result["segments"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-transcribe recorded WAV files.")
+    parser.add_argument("paths", nargs="*", help="WAV files to transcribe")
+    parser.add_argument("--db", help="also transcribe every speech_data.audio_path in this SQLite DB")
+    parser.add_argument("--audio-root", help="audio store of the DB (default: audio/ next to it)")
+    parser.add_argument("--model", default="base", help="Whisper model name (tiny/base/small/...)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--language", default=None, help="skip language detection, e.g. 'en'")
+    parser.add_argument("--format", choices=("txt", "srt", "json"), default="txt")
+    parser.add_argument("--out-dir", help="write <name>.<format> files here instead of printing")
+    args = parser.parse_args(argv)
+
+    paths = list(args.paths)
+    tmp_dir = tempfile.mkdtemp(prefix="dunno-audio-")
+    try:
+        if args.db:
+            try:
+                paths += paths_from_db(args.db, args.audio_root, tmp_dir)
+            except (FileNotFoundError, sqlite3.Error) as e:
+                parser.error(f"--db: {e}")
+        if not paths:
+            parser.error("no input files")
+
+        started = time.perf_counter()
+        results = transcribe_files(paths, args.model, args.workers, args.threads_per_worker, args.language)
+        elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    for result in results:
+        text = format_result(result, args.format)
+        if args.out_dir:
+            os.makedirs(args.out_dir, exist_ok=True)
+            name = os.path.splitext(os.path.basename(result["path"]))[0]
+            with open(os.path.join(args.out_dir, f"{name}.{args.format}"), "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            print(f"=== {result['path']} ===\n{text}\n")
+
+    audio_seconds = sum(r["duration"] for r in results)
+    print(f"Transcribed {len(results)} file(s), {audio_seconds:.1f} s of audio in {elapsed:.1f} s "
+          f"({audio_seconds / max(elapsed, 1e-9):.1f}x real time)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+benchmark.py
+Reproducible end-to-end benchmark: replays WAV files through the live
+pipeline (capture ring -> VAD -> Whisper -> translate -> TTS).
+
+The pipeline is the one cli.py builds; only the microphone is replaced by a
+thread writing the file into the capture ring, and googletrans / pyttsx3 by
+the deterministic stand-ins from fakes.py. Each model size runs in its own
+subprocess so peak RSS is measured per model.
+
+    python benchmark.py ../output.wav --models tiny base small --speed max --out bench.jsonl
+    python benchmark.py --compare old.jsonl new.jsonl
+
+Every result is one JSON line (commit, model, real-time factor, latency
+percentiles per stage, peak RSS, CPU utilization), so runs on two commits
+can be compared with --compare.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+import cli
+import model_registry
+from batch_transcribe import to_float_mono, wav_memmap
+from fakes import FakePlayer, FakeTranslator, FakeTTSEngine
+from pipeline import ring_source
+from ring_buffer import BLOCK, RingBuffer
+from translate_batcher import BatchedTranslator
+from translation_cache import TranslationCache
+from tts import PhraseAudioCache, Synthesizer
+
+SAMPLE_RATE = cli.SAMPLE_RATE
+BLOCK_SECONDS = cli.BLOCK_DURATION
+SILENCE_GAP = 1.0      # seconds of silence inserted between replayed files
+
+
+def load_audio(paths):
+    """Concatenate the files (mono float32, 16 kHz) separated by short silences."""
+    gap = np.zeros(int(SAMPLE_RATE * SILENCE_GAP), dtype=np.float32)
+    parts = []
+    for path in paths:
+        frames, sample_rate = wav_memmap(path)
+        parts += [gap, to_float_mono(frames, sample_rate)]
+    parts.append(gap)
+    return np.concatenate(parts)
+
+
+def replay(ring, audio, realtime):
+    """Stand-in for the PortAudio callback: write blocks into the ring."""
+    block = int(SAMPLE_RATE * BLOCK_SECONDS)
+    started = time.perf_counter()
+    for i, pos in enumerate(range(0, len(audio), block)):
+        if realtime:
+            delay = started + i * BLOCK_SECONDS - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        ring.write(audio[pos:pos + block])
+    ring.close()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_single(args):
+    """Benchmark one model size in this process; returns the result dict."""
+    argv = [args.mode, "--model", args.model, "--metrics-interval", "0.5"]
+    if args.language:
+        argv += ["--language", args.language]
+    session = cli.LiveSession(cli.build_parser().parse_args(argv))
+
+    load_started = time.perf_counter()
+    session.model = model_registry.warm_up_whisper(args.model)
+    load_seconds = time.perf_counter() - load_started
+    if session.translate:
+        translator = FakeTranslator(latency=args.translate_latency)
+        session.translations = BatchedTranslator(translator, TranslationCache(translator),
+                                                 metrics=session.metrics)
+    if session.speak:
+        session.tts_engine = FakeTTSEngine(seconds_per_char=args.tts_seconds_per_char)
+        session.synthesizer = Synthesizer(session.tts_engine, PhraseAudioCache())
+        session.player = FakePlayer(realtime=args.speed == "realtime")
+    if args.speed == "max":
+        # No real-time producer to protect: make the replay wait instead of dropping audio.
+        session.audio_ring = RingBuffer(session.audio_ring.capacity, policy=BLOCK, block_timeout=3600)
+    session.pipeline = session.build_pipeline()
+
+    audio = load_audio(args.paths)
+    audio_seconds = len(audio) / SAMPLE_RATE
+    producer = threading.Thread(target=replay, args=(session.audio_ring, audio, args.speed == "realtime"))
+
+    cpu_before = os.times()
+    wall_started = time.perf_counter()
+    producer.start()
+    asyncio.run(session.pipeline.run(ring_source(session.audio_ring)))
+    producer.join()
+    wall = time.perf_counter() - wall_started
+    cpu_after = os.times()
+    if session.translations is not None:
+        session.translations.close()
+
+    cpu = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+    snapshot = session.metrics.snapshot()
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "cpus": os.cpu_count(),
+        "files": args.paths,
+        "mode": args.mode,
+        "speed": args.speed,
+        "model": args.model,
+        "audio_seconds": round(audio_seconds, 3),
+        "wall_seconds": round(wall, 3),
+        "rtf": round(wall / audio_seconds, 4),
+        "load_seconds": round(load_seconds, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "cpu_utilization": round(cpu / wall / (os.cpu_count() or 1), 4),
+        "cpu_seconds": round(cpu, 3),
+        "stages": session.pipeline.stats(),
+        "capture": session.audio_ring.stats(),
+        "histograms": snapshot["histograms"],
+    }
+
+
+def run_all(args):
+    """One subprocess per model size, so RSS and caches do not leak between runs."""
+    results = []
+    for model in args.models:
+        for _ in range(args.repeat):
+            cmd = [sys.executable, os.path.abspath(__file__), *args.paths, "--single", "--model", model,
+                   "--mode", args.mode, "--speed", args.speed,
+                   "--translate-latency", str(args.translate_latency),
+                   "--tts-seconds-per-char", str(args.tts_seconds_per_char)]
+            if args.language:
+                cmd += ["--language", args.language]
+            out = subprocess.run(cmd, capture_output=True, text=True)
+            if out.returncode != 0:
+                print(out.stderr, file=sys.stderr)
+                raise SystemExit(f"benchmark for model '{model}' failed")
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            results.append(result)
+            latency = result["histograms"].get("pipeline_latency_seconds") or {}
+            print(f"{model:>6}: rtf {result['rtf']:.3f}  latency p50 {latency.get('p50')}  "
+                  f"p95 {latency.get('p95')}  rss {result['peak_rss_mb']} MB  "
+                  f"cpu {result['cpu_utilization']:.0%}", file=sys.stderr)
+    return results
+
+
+def compare(old_path, new_path, tolerance=0.10):
+    """Print per-model changes of the headline numbers; exit 1 on a regression
+    larger than `tolerance` (relative)."""
+    def load(path):
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        by_model = {}
+        for row in rows:
+            by_model.setdefault(row["model"], []).append(row)
+        return by_model
+
+    def headline(rows):
+        lat = [r["histograms"].get("pipeline_latency_seconds", {}).get("p95") for r in rows]
+        lat = [x for x in lat if x is not None]
+        return {
+            "rtf": float(np.median([r["rtf"] for r in rows])),
+            "latency_p95": float(np.median(lat)) if lat else None,
+            "peak_rss_mb": float(np.median([r["peak_rss_mb"] for r in rows])),
+        }
+
+    old, new = load(old_path), load(new_path)
+    regressed = False
+    for model in sorted(set(old) & set(new)):
+        a, b = headline(old[model]), headline(new[model])
+        for key in a:
+            if a[key] is None or b[key] is None:
+                continue
+            change = (b[key] - a[key]) / a[key] if a[key] else 0.0
+            flag = ""
+            if change > tolerance:
+                flag, regressed = "  <-- regression", True
+            print(f"{model:>6} {key:<12} {a[key]:10.4f} -> {b[key]:10.4f} ({change:+.1%}){flag}")
+    return 1 if regressed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay WAV files through the speech pipeline.")
+    parser.add_argument("paths", nargs="*", help="WAV files to replay")
+    parser.add_argument("--models", nargs="+", default=["tiny", "base", "small"])
+    parser.add_argument("--mode", choices=("transcribe", "translate", "tts"), default="tts")
+    parser.add_argument("--speed", choices=("realtime", "max"), default="max")
+    parser.add_argument("--language", default=None)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--translate-latency", type=float, default=0.15, help="fake translator RTT (s)")
+    parser.add_argument("--tts-seconds-per-char", type=float, default=0.0, help="fake TTS speaking time")
+    parser.add_argument("--out", help="append JSON lines here (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--model", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        raise SystemExit(compare(*args.compare, tolerance=args.tolerance))
+    if not args.paths:
+        parser.error("no WAV files given")
+    if args.single:
+        print(json.dumps(run_single(args)))
+        return
+
+    results = run_all(args)
+    lines = "\n".join(json.dumps(r) for r in results) + "\n"
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(lines)
+    else:
+        sys.stdout.write(lines)
+
+
+if __name__ == "__main__":
+    main()
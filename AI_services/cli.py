@@ -0,0 +1,465 @@
+"""
+cli.py
+Single entry point for the live speech services.
+
+    python cli.py transcribe [--model base] [--streaming]
+    python cli.py translate  [--model tiny] [--target fr]
+    python cli.py tts        [--model tiny] [--target fr]
+
+Pipeline (pipeline.py stages, bounded queues in between):
+ - audio_ring        : mic -> pipeline source, fixed-size ring buffer
+ - segment  (inline) : VAD, one utterance per item, silence dropped
+ - asr      (thread) : Whisper (with --streaming: segment + incremental ASR;
+                      with --asr-process: decoded in a worker process)
+ - print    (inline) : show the original text
+ - translate (async) : cached, micro-batched translation    (translate, tts)
+ - tts-synth (thread) : render the translation to PCM, phrase cache (tts)
+ - tts-play  (thread) : queue it on the gapless output stream   (tts)
+
+With --save, transcripts and translations are written to the backend DB by a
+write-behind thread (backend/app/persistence.py); no stage waits on disk.
+
+The spoken language is detected once per session and then pinned
+(language.py); --user seeds it from the user's preferred_language.
+
+Models are loaded lazily through model_registry, so `--help` and imports are
+instant; the time to "ready" is printed at startup.
+"""
+
+import time
+
+_T0 = time.perf_counter()
+
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import threading
+
+import model_registry
+from asr_process import ASRProcess
+from language import LanguageManager, preferred_language_from_db, whisper_detect
+from mel_frontend import IncrementalLogMel
+from metrics import Metrics
+from pipeline import ASYNC, INLINE, THREAD, Pipeline, Stage, ring_source
+from quality import AdaptiveController, ladder
+from ring_buffer import RingBuffer
+from streaming import StreamingTranscriber
+from translate_batcher import BatchedTranslator
+from translation_cache import TranslationCache, normalize_text, text_hash
+from translation_memory import TranslationMemory
+from tts import PhraseAudioCache, Player, Synthesizer
+from vad import VadSegmenter
+
+# --- Settings ---
+SAMPLE_RATE = 16000
+CHANNELS = 1
+BLOCK_DURATION = 0.1        # seconds per mic block; utterances are cut by the VAD
+RING_SECONDS = 30           # capture buffer size; bounded memory on long sessions
+BACKEND_APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "app")
+BACKEND_DB = os.path.join(BACKEND_APP_DIR, "dunno.db")
+
+
+class LiveSession:
+    """Builds the capture -> segment -> ASR -> translate -> TTS pipeline for a
+    subcommand and runs it until Ctrl+C."""
+
+    def __init__(self, args):
+        self.args = args
+        self.translate = args.command in ("translate", "tts")
+        self.speak = args.command == "tts"
+        self.fp16 = args.dtype == "float16"
+
+        self.audio_ring = RingBuffer(int(SAMPLE_RATE * args.ring_seconds))
+        self.metrics = Metrics()
+        self.pipeline = None
+        self.model = None
+        self.translations = None
+        self.tts_engine = None
+        self.synthesizer = None
+        self.player = None
+        self.quality = None
+        self.writer = None
+        self.owner_id = None
+        self.segmenter = None
+        self._loading = set()
+        self.languages = LanguageManager(seed=self.initial_language(), fixed=args.language is not None,
+                                         detect=self.detect_language,
+                                         metrics=self.metrics)
+
+    def initial_language(self):
+        if self.args.language:
+            return self.args.language
+        if self.args.user is None:
+            return None
+        db_path = getattr(self.args, "db", None) or BACKEND_DB
+        try:
+            language = preferred_language_from_db(db_path, self.args.user)
+        except Exception as e:
+            print(f"⚠️ Could not read the preferred language of user {self.args.user}:", e)
+            return None
+        if language:
+            print(f"🌍 Starting with {language} (preferred language of user {self.args.user})")
+        return language
+
+    def load(self):
+        args = self.args
+        print(f"⏳ Loading Whisper model '{args.model}'...")
+        if args.asr_process:
+            # Decoding in another process keeps the GIL free for the audio callback.
+            self.model = ASRProcess(args.model, args.device, args.dtype)
+            self.model.wait_ready()
+        elif args.warmup:
+            self.model = model_registry.warm_up_whisper(args.model, args.device, args.dtype)
+        else:
+            self.model = model_registry.get_whisper(args.model, args.device, args.dtype)
+        if args.adaptive:
+            if args.streaming:
+                print("⚠️ --adaptive only applies to segment-by-segment ASR, ignored with --streaming")
+            else:
+                self.quality = AdaptiveController(ladder(args.model, args.min_model),
+                                                  latency_budget=args.latency_budget,
+                                                  metrics=self.metrics, on_switch=self.apply_profile)
+        if args.save:
+            self.writer, self.owner_id = open_writer(getattr(args, "db", None) or BACKEND_DB, args.user)
+        if self.translate:
+            translator = model_registry.get_translator()
+            store = open_translation_store(args.db) if args.db else None
+            memory = None
+            if args.fuzzy_threshold is not None:
+                memory = TranslationMemory(args.fuzzy_threshold)
+                if args.db:
+                    try:
+                        loaded = memory.load_from_db(args.db, args.target)
+                        print(f"🧠 Translation memory: {loaded} stored translations")
+                    except (FileNotFoundError, ValueError) as e:
+                        print("⚠️ Translation memory starts empty:", e)
+            # With --save the writer's linked Translation row (it has the
+            # source_hash) is the cache entry: no second, unlinked row.
+            cache = TranslationCache(translator, maxsize=args.cache_size, ttl=args.cache_ttl, store=store,
+                                     fuzzy=memory, store_writes=not args.save)
+            self.translations = BatchedTranslator(translator, cache, max_items=args.batch_size,
+                                                  max_wait_ms=args.batch_wait_ms,
+                                                  max_in_flight=args.max_in_flight,
+                                                  metrics=self.metrics)
+        if self.speak:
+            self.tts_engine = model_registry.get_tts_engine(language=args.target)
+            cache = PhraseAudioCache(max_bytes=int(args.tts_cache_mb * 1024 * 1024), disk_dir=args.tts_cache_dir)
+            self.synthesizer = Synthesizer(self.tts_engine, cache)
+            self.player = Player(max_queued=args.tts_queue)
+        print(f"✅ Ready in {time.perf_counter() - _T0:.2f} s ({model_registry.startup_report()})")
+
+    # --- Audio callback (producer) ---
+    def audio_callback(self, indata, frames, time_info, status):
+        if status:
+            print("Audio status:", status, file=sys.stderr)
+        self.audio_ring.write(indata[:, 0])
+
+    # --- Stage functions ---
+    def detect_language(self, audio):
+        if isinstance(self.model, ASRProcess):
+            return self.model.detect(audio)
+        return whisper_detect(self.model, audio)
+
+    def transcribe(self, segment):
+        started = time.perf_counter()
+        model, options = self.model, {}
+        if self.quality is not None:
+            options = self.quality.profile.decode_options()
+            model = self.model_for(self.quality.profile)
+        language = self.languages.language_for(segment.audio)
+        result = model.transcribe(segment.audio, fp16=self.fp16, language=language, **options)
+        self.languages.observe(result)
+        elapsed = time.perf_counter() - started
+        rtf = elapsed / max(segment.duration, 1e-3)
+        self.metrics.observe("asr_rtf", rtf)
+        self.metrics.observe("asr_audio_seconds", segment.duration)
+        if self.quality is not None:
+            self.quality.observe(rtf, elapsed, self.pipeline.depths().get("asr", 0))
+        return result.get("text", "").strip() or None
+
+    # --- Adaptive quality ---
+    def model_for(self, profile):
+        """Whisper model of `profile`; until it is loaded (in the background)
+        the current one keeps decoding."""
+        args = self.args
+        if isinstance(self.model, ASRProcess) or profile.model == args.model:
+            return self.model
+        if model_registry.has_whisper(profile.model, args.device, args.dtype):
+            return model_registry.get_whisper(profile.model, args.device, args.dtype)
+        if profile.model not in self._loading:
+            self._loading.add(profile.model)
+            threading.Thread(target=model_registry.warm_up_whisper, daemon=True,
+                             args=(profile.model, args.device, args.dtype)).start()
+        return self.model
+
+    def apply_profile(self, old, new):
+        if self.segmenter is not None:
+            self.segmenter.set_max_segment(new.max_segment_seconds)
+        if new.model != old.model:
+            self.model_for(new)     # start loading it now
+
+    def show_text(self, text):
+        """Print (and save) an utterance; returns (message key or None, text)."""
+        print(f"📝 Original: {text}" if self.translate else f">>> {text}")
+        key = None
+        if self.writer is not None:
+            key = self.writer.record_utterance(text, language=self.languages.language,
+                                               owner_id=self.owner_id, group_id=self.args.group)
+        return key, text
+
+    async def translate_text(self, utterance):
+        key, text = utterance
+        translated = await asyncio.wrap_future(self.translations.submit(text, self.args.target))
+        if self.writer is not None and translated:
+            self.writer.record_translation(key, self.languages.language, self.args.target, text, translated,
+                                           user_id=self.owner_id, source_hash=text_hash(normalize_text(text)))
+        return translated
+
+    def show_translation(self, text):
+        print(f"🌐 Translated ({self.args.target}): {text}\n")
+        return text
+
+    def synthesize(self, text):
+        # pyttsx3 is fine to drive from a single dedicated thread (the stage's pool).
+        started = time.perf_counter()
+        audio, sample_rate = self.synthesizer.render(text)
+        self.metrics.observe("tts_synthesis_seconds", time.perf_counter() - started)
+        return audio, sample_rate
+
+    def play_audio(self, rendered):
+        # Returns as soon as the phrase is queued behind the one playing;
+        # blocks (back-pressure) only when --tts-queue phrases are waiting.
+        audio, sample_rate = rendered
+        self.player.play(audio, sample_rate)
+        self.metrics.observe("tts_audio_seconds", len(audio) / sample_rate)
+
+    def asr_stages(self):
+        if not self.args.streaming:
+            segmenter = self.segmenter = VadSegmenter(sample_rate=SAMPLE_RATE)
+            if self.quality is not None:
+                segmenter.set_max_segment(self.quality.profile.max_segment_seconds)
+            return [
+                Stage("segment", segmenter.push, mode=INLINE, flat=True, maxsize=64,
+                      on_close=lambda: [segmenter.flush()]),
+                Stage("asr", self.transcribe, mode=THREAD),
+            ]
+
+        # Streaming: one stage buffers speech and re-decodes it, emitting
+        # committed text while the speaker is still talking.
+        committed = []
+
+        def interim(text):
+            if text:
+                print(f"… {text}", file=sys.stderr)
+
+        segmenter = VadSegmenter(sample_rate=SAMPLE_RATE)
+        frontend = None
+        if self.args.incremental_mel and not isinstance(self.model, ASRProcess):
+            frontend = IncrementalLogMel(n_mels=self.model.dims.n_mels)
+        transcriber = StreamingTranscriber(self.model, on_commit=committed.append, on_interim=interim,
+                                           sample_rate=SAMPLE_RATE, language=self.languages.language,
+                                           frontend=frontend, fp16=self.fp16, on_result=self.languages.observe)
+
+        def stream_step(block):
+            ended = segmenter.push(block)
+            # Only speech is buffered; silence between utterances is dropped.
+            if segmenter.in_speech or ended:
+                transcriber.insert_audio(block)
+            if (ended or transcriber.ready()) and not self.languages.locked:
+                transcriber.language = self.languages.language_for(transcriber.audio)
+            if ended:
+                transcriber.finish()      # utterance over: commit the tail now
+            elif transcriber.ready():
+                transcriber.process()
+            texts = committed[:]
+            committed.clear()
+            return texts
+
+        def stream_close():
+            transcriber.finish()
+            return committed
+
+        return [Stage("asr", stream_step, mode=THREAD, flat=True, maxsize=64, on_close=stream_close)]
+
+    def build_pipeline(self):
+        stages = self.asr_stages() + [Stage("print", self.show_text, mode=INLINE)]
+        if self.translate:
+            # Enough items in flight for the micro-batcher to fill its batches.
+            in_flight = self.args.batch_size * self.args.max_in_flight
+            stages += [
+                Stage("translate", self.translate_text, mode=ASYNC, concurrency=in_flight, maxsize=in_flight),
+                Stage("print-translation", self.show_translation, mode=INLINE),
+            ]
+        if self.speak:
+            stages += [
+                Stage("tts-synth", self.synthesize, mode=THREAD),
+                Stage("tts-play", self.play_audio, mode=THREAD, maxsize=2),
+            ]
+        return Pipeline(stages, metrics=self.metrics, sample_interval=self.args.metrics_interval,
+                        samplers=[self.sample_capture])
+
+    def sample_capture(self):
+        stats = self.audio_ring.stats()
+        self.metrics.set_gauge("capture_buffered_seconds", stats["buffered"] / SAMPLE_RATE)
+        self.metrics.set_gauge("capture_overruns", stats["overruns"])
+        self.metrics.set_gauge("capture_dropped_samples", stats["dropped_newest"] + stats["dropped_oldest"])
+        if self.args.metrics:
+            self.metrics.dump(self.args.metrics)
+
+    def stop(self):
+        """First Ctrl+C: stop capturing and let the pipeline drain. Second: abort."""
+        if self.audio_ring.closed:
+            self.pipeline.stop()
+            return
+        print("\n🛑 Stopping (Ctrl+C pressed)...")
+        self.audio_ring.close()
+
+    async def run_async(self):
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGINT, self.stop)
+        except (NotImplementedError, RuntimeError):
+            pass    # Windows: Ctrl+C raises KeyboardInterrupt and cancels the pipeline
+        await self.pipeline.run(ring_source(self.audio_ring))
+
+    # --- Main: start stream and pipeline ---
+    def run(self):
+        import sounddevice as sd
+
+        self.load()
+        self.pipeline = self.build_pipeline()
+        stream = sd.InputStream(
+            samplerate=SAMPLE_RATE,
+            channels=CHANNELS,
+            callback=self.audio_callback,
+            blocksize=int(SAMPLE_RATE * BLOCK_DURATION),
+        )
+        print("▶️ Starting audio stream. Press Ctrl+C to stop.")
+        try:
+            with stream:
+                asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            print("\n🛑 Stopped (Ctrl+C pressed).")
+        finally:
+            if self.player is not None:
+                self.player.close()
+                print("📊 TTS phrase cache:", self.synthesizer.cache.stats())
+            if self.tts_engine is not None:
+                try:
+                    self.tts_engine.stop()
+                except Exception:
+                    pass
+            print("📊 Capture buffer:", self.audio_ring.stats())
+            print("📊 Stages:", self.pipeline.stats())
+            latency = self.metrics.snapshot()["histograms"].get("pipeline_latency_seconds")
+            if latency:
+                print(f"📊 End-to-end latency: p50 {latency['p50']:.2f} s, p95 {latency['p95']:.2f} s")
+            if self.args.metrics:
+                self.metrics.dump(self.args.metrics)
+                print(f"📊 Metrics written to {self.args.metrics}")
+            print("📊 Language:", self.languages.stats())
+            if self.quality is not None:
+                print("📊 ASR quality:", self.quality.stats())
+            if isinstance(self.model, ASRProcess):
+                print("📊 ASR worker:", self.model.stats())
+                self.model.close()
+            if self.translations is not None:
+                self.translations.close()
+                print("📊 Translation:", self.translations.stats())
+            if self.writer is not None:
+                self.writer.close()
+                print("📊 Saved:", self.writer.stats())
+            print("✅ All stopped. Goodbye.")
+
+
+def open_translation_store(db_path):
+    """Persistent cache tier on the backend's `translations` table."""
+    sys.path.insert(0, os.path.abspath(BACKEND_APP_DIR))
+    from translation_store import TranslationStore
+
+    return TranslationStore.from_url(f"sqlite:///{db_path}")
+
+
+def open_writer(db_path, user=None):
+    """Write-behind writer on the backend DB, and the id of `user` (or None)."""
+    sys.path.insert(0, os.path.abspath(BACKEND_APP_DIR))
+    from persistence import WriteBehindWriter, resolve_user_id
+
+    writer = WriteBehindWriter.from_url(f"sqlite:///{db_path}", journal_path=db_path + ".writebehind.jsonl")
+    owner_id = resolve_user_id(writer.engine, user)
+    if user is not None and owner_id is None:
+        print(f"⚠️ Unknown user {user}, messages are saved without an owner")
+    return writer, owner_id
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Live speech transcription / translation / TTS.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--model", default="tiny", help="Whisper model: tiny, base, small, ...")
+    common.add_argument("--device", default=None, help="torch device (default: auto)")
+    common.add_argument("--dtype", choices=("float32", "float16", "int8"), default="float32",
+                        help="int8: quantized CPU inference, cached on disk (quantize.py)")
+    common.add_argument("--language", default=None, help="spoken language, skips detection (e.g. 'en')")
+    common.add_argument("--user", help="user id or name; seeds the language from their preferred_language")
+    common.add_argument("--save", action="store_true", help="save transcripts/translations to the backend DB")
+    common.add_argument("--group", type=int, default=None, help="group id of saved messages (with --save)")
+    common.add_argument("--streaming", action="store_true", help="commit words while the speaker is talking")
+    common.add_argument("--asr-process", action="store_true", help="run Whisper in a separate worker process")
+    common.add_argument("--no-incremental-mel", dest="incremental_mel", action="store_false",
+                        help="with --streaming, recompute the whole log-mel on every re-decode")
+    common.add_argument("--adaptive", action="store_true",
+                        help="step model size / decode settings down (and back up) to meet --latency-budget")
+    common.add_argument("--latency-budget", type=float, default=3.0, help="seconds, used with --adaptive")
+    common.add_argument("--min-model", default="tiny", help="smallest model --adaptive may fall back to")
+    common.add_argument("--ring-seconds", type=float, default=RING_SECONDS, help="capture buffer length")
+    common.add_argument("--no-warmup", dest="warmup", action="store_false", help="skip the dummy warm-up decode")
+    common.add_argument("--metrics", help="write metrics here periodically and on exit (.json, else Prometheus text)")
+    common.add_argument("--metrics-interval", type=float, default=5.0, help="seconds between metric samples")
+
+    target = argparse.ArgumentParser(add_help=False)
+    target.add_argument("--target", default="fr", help="translation target, e.g. fr, es, de, hi")
+    target.add_argument("--cache-size", type=int, default=10000, help="in-memory translation cache entries")
+    target.add_argument("--cache-ttl", type=float, default=None, help="seconds before a cached translation expires")
+    target.add_argument("--batch-size", type=int, default=16, help="max texts per translate call")
+    target.add_argument("--batch-wait-ms", type=float, default=50, help="max time to wait for a batch to fill")
+    target.add_argument("--max-in-flight", type=int, default=4, help="concurrent translate calls")
+    target.add_argument("--db", help="SQLite DB (backend dunno.db) used as persistent translation cache")
+    target.add_argument("--fuzzy-threshold", type=float, default=None,
+                        help="reuse the translation of a near-duplicate text scoring at least this "
+                             "(trigram Jaccard, e.g. 0.8); off by default")
+
+    voice = argparse.ArgumentParser(add_help=False)
+    voice.add_argument("--tts-cache-mb", type=float, default=64, help="in-memory cache of rendered phrases")
+    voice.add_argument("--tts-cache-dir", help="also keep rendered phrases on disk here")
+    voice.add_argument("--tts-queue", type=int, default=8, help="rendered phrases allowed to wait for playback")
+
+    sub.add_parser("transcribe", parents=[common], help="print live transcription")
+    sub.add_parser("translate", parents=[common, target], help="transcribe and translate")
+    sub.add_parser("tts", parents=[common, target, voice], help="transcribe, translate and speak")
+    return parser
+
+
+def main(argv=None):
+    # --- Ensure UTF-8 output on Windows consoles ---
+    if os.name == "nt":
+        try:
+            sys.stdout.reconfigure(encoding="utf-8")
+        except Exception:
+            os.environ["PYTHONIOENCODING"] = "utf-8"
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.adaptive:
+        try:
+            ladder(args.model, args.min_model)
+        except ValueError as e:
+            parser.error(f"--adaptive: {e}")
+    LiveSession(args).run()
+
+
+if __name__ == "__main__":
+    main()
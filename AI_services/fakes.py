@@ -0,0 +1,113 @@
+"""
+fakes.py
+Deterministic local stand-ins for network / device services, for benchmarks
+and offline runs. They mimic the small part of the real APIs we use.
+"""
+
+import time
+import wave
+
+import numpy as np
+
+
+class FakeTranslated:
+    def __init__(self, text, src, dest, origin):
+        self.text = text
+        self.src = src
+        self.dest = dest
+        self.origin = origin
+
+
+class FakeTranslator:
+    """googletrans.Translator look-alike: "[fr] hello" for translate("hello", dest="fr").
+
+    `latency` simulates the network round trip paid once per call, and
+    `per_item` the extra cost of every text in a batched call.
+    """
+
+    def __init__(self, latency=0.0, per_item=0.0, src="en"):
+        self.latency = latency
+        self.per_item = per_item
+        self.src = src
+        self.calls = 0
+        self.items = 0
+
+    def translate(self, text, dest="en", src="auto"):
+        texts = text if isinstance(text, list) else [text]
+        self.calls += 1
+        self.items += len(texts)
+        if self.latency or self.per_item:
+            time.sleep(self.latency + self.per_item * len(texts))
+        source = self.src if src == "auto" else src
+        results = [FakeTranslated(f"[{dest}] {t}", source, dest, t) for t in texts]
+        return results if isinstance(text, list) else results[0]
+
+
+class FakeTTSEngine:
+    """pyttsx3 engine look-alike. runAndWait() "speaks" the queued text by
+    sleeping `seconds_per_char` per character (0 = instant); save_to_file()
+    renders a quiet tone lasting `audio_seconds_per_char` per character."""
+
+    def __init__(self, seconds_per_char=0.0, rate=200, audio_seconds_per_char=0.06, sample_rate=22050):
+        self.seconds_per_char = seconds_per_char
+        self.audio_seconds_per_char = audio_seconds_per_char
+        self.sample_rate = sample_rate
+        self.properties = {"rate": rate, "volume": 1.0, "voice": "fake", "voices": []}
+        self.spoken = []
+        self._queued = []
+        self._files = []
+
+    def getProperty(self, name):
+        return self.properties.get(name)
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def say(self, text):
+        self._queued.append(text)
+
+    def save_to_file(self, text, path):
+        self._files.append((text, path))
+
+    def runAndWait(self):
+        for text in self._queued:
+            if self.seconds_per_char:
+                time.sleep(self.seconds_per_char * len(text))
+            self.spoken.append(text)
+        self._queued = []
+        for text, path in self._files:
+            n = int(self.sample_rate * self.audio_seconds_per_char * max(len(text), 1))
+            tone = 0.1 * np.sin(2 * np.pi * 220 * np.arange(n) / self.sample_rate)
+            with wave.open(path, "wb") as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(self.sample_rate)
+                w.writeframes((tone * 32767).astype("<i2").tobytes())
+        self._files = []
+
+    def stop(self):
+        self._queued = []
+        self._files = []
+
+
+class FakePlayer:
+    """tts.Player look-alike without an audio device. With `realtime`, play()
+    takes as long as the audio lasts."""
+
+    def __init__(self, realtime=False):
+        self.realtime = realtime
+        self.played_seconds = 0.0
+        self.phrases = 0
+
+    def play(self, audio, sample_rate):
+        duration = len(audio) / sample_rate
+        if self.realtime:
+            time.sleep(duration)
+        self.played_seconds += duration
+        self.phrases += 1
+
+    def wait_idle(self, timeout=None):
+        return True
+
+    def close(self):
+        pass
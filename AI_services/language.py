@@ -0,0 +1,138 @@
+"""
+language.py
+Session-level spoken-language lock for Whisper.
+
+Without `language=`, every transcribe() call runs language detection (an
+extra decoder pass on the first 30 s window) and may flip language between
+utterances. LanguageManager detects only until it is confident, then pins
+the language for all following decodes:
+
+ - seed       : a known language (e.g. User.preferred_language) is pinned
+                from the start, but can still be revised
+ - detection  : detect_language() on each utterance until one reaches
+                `min_probability`, or the best average after `max_detections`
+ - re-detect  : after `max_strikes` consecutive decodes that look like the
+                wrong language (speech, but avg_logprob below threshold)
+ - fixed      : --language on the command line; never re-detected
+"""
+
+import os
+import sqlite3
+from urllib.request import pathname2url
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def preferred_language_from_db(db_path, user):
+    """User.preferred_language for a user id or username, or None."""
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"No database at {db_path}")
+    # Read-only: a wrong path must not leave an empty database behind.
+    with sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True) as conn:
+        column = "id" if str(user).isdigit() else "username"
+        row = conn.execute(f"SELECT preferred_language FROM users WHERE {column} = ?", (user,)).fetchone()
+    return row[0] if row and row[0] else None
+
+
+def whisper_detect(model, audio):
+    """Run Whisper's language detection on (up to) the first 30 s of audio:
+    returns {language: probability}."""
+    import whisper
+
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels).to(model.device)
+    _, probs = model.detect_language(mel)
+    return probs
+
+
+class LanguageManager:
+    def __init__(self, model=None, seed=None, fixed=False, min_probability=0.8, max_detections=3,
+                 min_audio_seconds=1.0, logprob_threshold=-1.0, no_speech_threshold=0.6, max_strikes=3,
+                 detect=None, metrics=None):
+        self.model = model
+        self.fixed = fixed and seed is not None
+        self.min_probability = min_probability
+        self.max_detections = max_detections
+        self.min_audio_seconds = min_audio_seconds
+        self.logprob_threshold = logprob_threshold
+        self.no_speech_threshold = no_speech_threshold
+        self.max_strikes = max_strikes
+        self.detect = detect or (lambda audio: whisper_detect(self.model, audio))
+        self.metrics = metrics
+
+        self.language = seed          # pinned language, None while detecting
+        self._previous = seed
+        self.source = "fixed" if self.fixed else ("seed" if seed else None)
+        self.detections = 0
+        self.switches = 0
+        self._votes = {}
+        self._rounds = 0
+        self._strikes = 0
+
+    @property
+    def locked(self):
+        return self.language is not None
+
+    def language_for(self, audio):
+        """Language to decode `audio` with: the pinned one, or the current best
+        guess while still detecting (None lets Whisper detect by itself)."""
+        if self.language is not None:
+            return self.language
+        if len(audio) < self.min_audio_seconds * SAMPLE_RATE:
+            return self._best()
+
+        probs = self.detect(np.asarray(audio, dtype=np.float32))
+        self.detections += 1
+        self._rounds += 1
+        if self.metrics is not None:
+            self.metrics.inc("language_detections")
+        for lang, p in probs.items():
+            self._votes[lang] = self._votes.get(lang, 0.0) + p
+
+        best = max(probs, key=probs.get)
+        if probs[best] >= self.min_probability:
+            self._pin(best, "detected")
+        elif self._rounds >= self.max_detections:
+            self._pin(self._best(), "voted")
+        return best
+
+    def observe(self, result):
+        """Feed a transcribe() result back; repeated poor decodes of speech
+        unpin the language so the next utterances are detected again."""
+        if self.fixed or self.language is None:
+            return
+        segments = result.get("segments") or []
+        if not segments:
+            return
+        logprob = float(np.mean([s.get("avg_logprob", 0.0) for s in segments]))
+        no_speech = float(np.mean([s.get("no_speech_prob", 0.0) for s in segments]))
+        if logprob < self.logprob_threshold and no_speech < self.no_speech_threshold:
+            self._strikes += 1
+            if self._strikes >= self.max_strikes:
+                print(f"🔁 Low confidence in '{self.language}' (avg_logprob {logprob:.2f}), re-detecting language")
+                self.language = None
+                self.source = None
+                self._votes = {}
+                self._rounds = 0
+                self._strikes = 0
+        else:
+            self._strikes = 0
+
+    def stats(self):
+        return {"language": self.language, "source": self.source,
+                "detections": self.detections, "switches": self.switches}
+
+    # --- Internal helpers ---
+    def _best(self):
+        return max(self._votes, key=self._votes.get) if self._votes else None
+
+    def _pin(self, language, source):
+        if self._previous is not None and language != self._previous:
+            self.switches += 1
+            if self.metrics is not None:
+                self.metrics.inc("language_switches")
+        print(f"🌍 Language locked: {language} ({source})")
+        self.language = self._previous = language
+        self.source = source
+        self._strikes = 0
@@ -0,0 +1,155 @@
+"""
+mel_frontend.py
+Incremental log-mel frontend for the streaming transcriber.
+
+whisper.transcribe() recomputes the log-mel spectrogram of the whole buffer,
+padded with 30 s of zeros, on every call, although the streaming buffer only
+grew by `step` seconds since the previous one. IncrementalLogMel keeps the
+log10 mel frames of the rolling buffer and, as samples arrive, computes only
+the frames whose 400-sample STFT window is now complete (one vectorized
+NumPy rfft + mel projection per block). A decode window is then a slice of
+the cache plus the one or two tail frames that still see the end of the
+buffer, with Whisper's dynamic-range clamp and normalization applied per
+window.
+
+Frames follow whisper.audio.log_mel_spectrogram (n_fft 400, hop 160,
+periodic Hann window, power spectrum, log10, max - 8 dB clamp, (x + 4) / 4).
+Like whisper.transcribe, the window is padded to 30 s with zeros after
+normalization. The only difference is at the left edge of a window that
+starts inside the buffer: its first frames see the real preceding audio
+instead of a reflected copy.
+
+whisper_words_from_mel() decodes such a window with whisper.decode and gets
+word times from whisper.timing.find_alignment, so StreamingTranscriber can
+use it in place of model.transcribe(word_timestamps=True).
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+N_FFT = 400
+HOP_LENGTH = 160
+N_FRAMES = 3000            # 30 s, Whisper's input length
+LOG_FLOOR = -10.0          # log10 of the 1e-10 clamp, i.e. the value of zero padding
+
+
+def whisper_mel_filters(n_mels=80):
+    from whisper.audio import mel_filters
+
+    return mel_filters("cpu", n_mels).numpy()
+
+
+class IncrementalLogMel:
+    """Log-mel frame cache over a rolling audio buffer.
+
+    append(samples) as audio arrives, trim(n) when the oldest n samples are
+    dropped, reset() when the buffer starts over, window(n) for the log-mel
+    input (n_mels, 3000) covering the newest n samples.
+    """
+
+    def __init__(self, filters=None, n_mels=80):
+        self.filters = np.asarray(filters if filters is not None else whisper_mel_filters(n_mels), dtype=np.float32)
+        self.n_mels = self.filters.shape[0]
+        self.window_fn = np.hanning(N_FFT + 1)[:-1].astype(np.float32)     # periodic, like torch.hann_window
+        self.frames_computed = 0
+        self.reset()
+
+    def reset(self):
+        self._samples = np.zeros(0, dtype=np.float32)
+        self._offset = 0                                        # absolute index of _samples[0]
+        self._frames = np.zeros((0, self.n_mels), dtype=np.float32)
+        self._frame0 = 0                                        # absolute index of _frames[0]
+
+    @property
+    def end(self):
+        return self._offset + len(self._samples)
+
+    def append(self, samples):
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        self._samples = np.concatenate([self._samples, samples])
+        # Frame t is centred on sample t * HOP; it is final once its right half is in.
+        last = (self.end - N_FFT // 2) // HOP_LENGTH
+        first = self._frame0 + len(self._frames)
+        if last >= first:
+            self._frames = np.concatenate([self._frames, self._log_mel(first, last + 1)])
+
+    def trim(self, n_samples):
+        """Forget the oldest n samples (and the frames before them)."""
+        n_samples = min(n_samples, len(self._samples))
+        self._samples = self._samples[n_samples:]
+        self._offset += n_samples
+        # Keep the samples the pending frames still need on their left.
+        drop = max(0, -(-(self._offset) // HOP_LENGTH) - self._frame0)
+        self._frames = self._frames[drop:]
+        self._frame0 += drop
+
+    def window(self, n_samples):
+        """Normalized log-mel (n_mels, N_FRAMES) of the newest `n_samples`,
+        padded like whisper.transcribe; returns (mel, n_frames)."""
+        t0 = int(round((self.end - n_samples) / HOP_LENGTH))
+        n_frames = min(n_samples // HOP_LENGTH, N_FRAMES)
+        t1 = t0 + n_frames
+        t0 = max(t0, self._frame0)
+
+        cached_end = self._frame0 + len(self._frames)
+        parts = [self._frames[t0 - self._frame0:min(t1, cached_end) - self._frame0]]
+        if t1 > cached_end:
+            parts.append(self._log_mel(max(t0, cached_end), t1))
+        log_spec = np.concatenate(parts) if parts else np.zeros((0, self.n_mels), dtype=np.float32)
+
+        # As in whisper.transcribe: clamp/normalize the content, then pad the
+        # window to 30 s with zeros (pad_or_trim on the normalized mel).
+        mel = np.zeros((self.n_mels, N_FRAMES), dtype=np.float32)
+        if len(log_spec):
+            log_spec = np.maximum(log_spec, max(log_spec.max(), LOG_FLOOR) - 8.0)
+            mel[:, :len(log_spec)] = ((log_spec + 4.0) / 4.0).T
+        return mel, len(log_spec)
+
+    # --- Internal helpers ---
+    def _log_mel(self, t0, t1):
+        """log10 mel frames t0..t1-1 (absolute indexes) from the sample buffer:
+        reflect padding before the buffer start, zeros after its end."""
+        start = t0 * HOP_LENGTH - N_FFT // 2 - self._offset
+        stop = (t1 - 1) * HOP_LENGTH + N_FFT // 2 - self._offset
+        audio = self._samples[max(start, 0):max(min(stop, len(self._samples)), 0)]
+        left, right = max(0, -start), max(0, stop - len(self._samples))
+        if left:
+            reflect = audio[1:left + 1][::-1]
+            audio = np.concatenate([np.pad(reflect, (left - len(reflect), 0)), audio])
+        if right:
+            audio = np.concatenate([audio, np.zeros(right, dtype=np.float32)])
+
+        frames = sliding_window_view(audio, N_FFT)[::HOP_LENGTH][:t1 - t0]
+        power = np.abs(np.fft.rfft(frames * self.window_fn, axis=1)) ** 2
+        self.frames_computed += len(frames)
+        return np.log10(np.maximum(power.astype(np.float32) @ self.filters.T, 1e-10))
+
+
+def whisper_words_from_mel(model, mel, n_frames, prompt="", language=None, fp16=False, on_result=None):
+    """Decode a (n_mels, 3000) window; returns [(start, end, word), ...] in
+    seconds from the start of the window. `on_result` gets the decode's
+    confidence as a transcribe()-like {"segments": [...]} dict."""
+    import torch
+    import whisper
+    from whisper.timing import find_alignment
+    from whisper.tokenizer import get_tokenizer
+
+    mel = torch.from_numpy(mel).to(model.device)
+    options = whisper.DecodingOptions(language=language, prompt=prompt or None, fp16=fp16,
+                                      without_timestamps=True, temperature=0.0)
+    result = whisper.decode(model, mel, options)
+    if on_result is not None:
+        on_result({"language": result.language, "segments": [
+            {"avg_logprob": result.avg_logprob, "no_speech_prob": result.no_speech_prob}]})
+    if result.no_speech_prob > 0.6 and result.avg_logprob < -1.0:
+        return []
+
+    tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                              language=result.language, task="transcribe")
+    text_tokens = [t for t in result.tokens if t < tokenizer.eot]
+    if not text_tokens:
+        return []
+    if fp16:
+        mel = mel.half()
+    timings = find_alignment(model, tokenizer, text_tokens, mel, n_frames)
+    return [(float(w.start), float(w.end), w.word) for w in timings if w.word.strip()]
@@ -0,0 +1,202 @@
+"""
+metrics.py
+Lightweight in-process latency / throughput metrics for the speech pipeline.
+
+ - Histogram : rolling window of recent observations with p50/p95/p99
+ - Trace     : per-item record of queue wait and service time per stage,
+               carried from capture to the last stage
+ - Metrics   : registry of histograms, counters and gauges (optionally
+               labelled), dumpable as JSON or Prometheus text format
+
+Usage:
+    metrics = Metrics()
+    metrics.observe("asr_rtf", 0.21)
+    metrics.inc("capture_overruns")
+    metrics.snapshot()              # dict, for code
+    metrics.to_prometheus()         # str, for a textfile collector / scrape
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    def __init__(self, window=2048):
+        self.values = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self, qs=QUANTILES):
+        if not self.values:
+            return {q: None for q in qs}
+        points = np.quantile(np.fromiter(self.values, dtype=np.float64), qs)
+        return dict(zip(qs, points.tolist()))
+
+    def summary(self):
+        q = self.quantiles()
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "p50": q[0.5],
+            "p95": q[0.95],
+            "p99": q[0.99],
+            "max": max(self.values) if self.values else None,
+        }
+
+
+_trace_ids = itertools.count(1)
+
+
+class Trace:
+    """Timeline of one item through the pipeline. `start` is the capture time
+    (time.time()) of the audio that produced it."""
+
+    def __init__(self, start=None, trace_id=None):
+        self.id = trace_id or next(_trace_ids)
+        self.start = time.time() if start is None else start
+        self.stages = []
+        self.end = None
+
+    def child(self):
+        """Trace for an output derived from this item (e.g. a segment from a block)."""
+        trace = Trace(self.start, self.id)
+        trace.stages = list(self.stages)
+        return trace
+
+    def record(self, stage, wait, service):
+        self.stages.append((stage, wait, service))
+
+    @property
+    def latency(self):
+        return None if self.end is None else self.end - self.start
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "start": self.start,
+            "latency": self.latency,
+            "stages": [{"stage": s, "wait": round(w, 6), "service": round(t, 6)} for s, w, t in self.stages],
+        }
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+class Metrics:
+    def __init__(self, window=2048, keep_traces=256):
+        self.window = window
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.traces = deque(maxlen=keep_traces)
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            key = _key(name, labels)
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram(self.window)
+            hist.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            key = _key(name, labels)
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+
+    def finish_trace(self, trace):
+        trace.end = time.time()
+        self.observe("pipeline_latency_seconds", trace.latency)
+        with self._lock:
+            self.traces.append(trace)
+
+    # --- Export ---
+    def snapshot(self):
+        with self._lock:
+            def flat(key):
+                name, labels = key
+                return name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+
+            return {
+                "histograms": {flat(k): h.summary() for k, h in self.histograms.items()},
+                "counters": {flat(k): v for k, v in self.counters.items()},
+                "gauges": {flat(k): v for k, v in self.gauges.items()},
+            }
+
+    def to_json(self, include_traces=False):
+        data = self.snapshot()
+        if include_traces:
+            data["traces"] = [t.to_dict() for t in list(self.traces)]
+        return json.dumps(data, indent=2)
+
+    def to_prometheus(self, prefix="dunno_"):
+        lines = []
+        typed = set()
+
+        def declare(metric, kind):
+            # One TYPE line per metric family, however many label sets it has.
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+
+        with self._lock:
+            for (name, labels), hist in sorted(self.histograms.items()):
+                metric = prefix + name
+                declare(metric, "summary")
+                for q, value in hist.quantiles().items():
+                    if value is not None:
+                        lines.append(f"{metric}{_labels(labels, quantile=q)} {value:.6g}")
+                lines.append(f"{metric}_sum{_labels(labels)} {hist.total:.6g}")
+                lines.append(f"{metric}_count{_labels(labels)} {hist.count}")
+            for (name, labels), value in sorted(self.counters.items()):
+                declare(prefix + name, "counter")
+                lines.append(f"{prefix}{name}{_labels(labels)} {value}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                declare(prefix + name, "gauge")
+                lines.append(f"{prefix}{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """Write JSON (.json) or Prometheus text (anything else) atomically."""
+        text = self.to_json(include_traces=True) if path.endswith(".json") else self.to_prometheus()
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+def _labels(labels, **extra):
+    items = list(labels) + [(k, v) for k, v in extra.items()]
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Timer:
+    """with Timer() as t: ...; t.elapsed"""
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._start
+        return False
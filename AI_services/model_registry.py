@@ -0,0 +1,120 @@
+"""
+model_registry.py
+Lazily loaded, process-wide shared models.
+
+Nothing heavy is imported or loaded at import time: Whisper, googletrans and
+pyttsx3 are only touched the first time a caller asks for them, and each
+instance is cached per key, e.g. ("whisper", name, device, dtype). Load and
+warm-up times are recorded so entry points can report how long cold start
+took.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+_lock = threading.Lock()
+_key_locks = {}
+_instances = {}
+timings = {}          # "<kind>:<name>" -> {"load": s, "warmup": s}
+
+
+def _get(key, loader):
+    """Return the cached instance for `key`, loading it once under a per-key lock."""
+    if key in _instances:
+        return _instances[key]
+    with _lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        if key not in _instances:
+            started = time.perf_counter()
+            _instances[key] = loader()
+            timings.setdefault(_label(key), {})["load"] = time.perf_counter() - started
+    return _instances[key]
+
+
+def _label(key):
+    return ":".join(str(part) for part in key if part is not None)
+
+
+# --- Whisper ---
+def get_whisper(name="base", device=None, dtype="float32"):
+    """dtype: float32, float16 (GPU) or int8 (CPU, see quantize.py)."""
+    def load():
+        if dtype == "int8":
+            from quantize import load_quantized
+
+            return load_quantized(name)
+        import whisper
+
+        model = whisper.load_model(name, device=device)
+        if dtype == "float16":
+            model = model.half()
+        return model
+
+    return _get(("whisper", name, device, dtype), load)
+
+
+def has_whisper(name="base", device=None, dtype="float32"):
+    return ("whisper", name, device, dtype) in _instances
+
+
+def warm_up_whisper(name="base", device=None, dtype="float32", language="en"):
+    """Run one dummy decode so the first real utterance does not pay for
+    lazy kernel initialisation and allocator growth."""
+    model = get_whisper(name, device, dtype)
+    started = time.perf_counter()
+    model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), fp16=(dtype == "float16"), language=language)
+    timings.setdefault(_label(("whisper", name, device, dtype)), {})["warmup"] = time.perf_counter() - started
+    return model
+
+
+# --- Translation ---
+def get_translator():
+    def load():
+        from googletrans import Translator
+
+        return Translator()
+
+    return _get(("googletrans",), load)
+
+
+# --- Text to speech ---
+def get_tts_engine(rate_scale=0.95, language=None):
+    """pyttsx3 engine, slightly slower than default, with a best-effort voice
+    matching `language`. Drive it from a single thread only."""
+    def load():
+        import pyttsx3
+
+        engine = pyttsx3.init()
+        rate = engine.getProperty("rate")
+        engine.setProperty("rate", int(rate * rate_scale))
+        if language:
+            for v in engine.getProperty("voices"):
+                name_lower = (v.name or "").lower()
+                langs = getattr(v, "languages", None) or []
+                lang_hint = ",".join([str(x).lower() for x in langs])
+                if language in name_lower or language in lang_hint:
+                    engine.setProperty("voice", v.id)
+                    break
+        return engine
+
+    return _get(("pyttsx3", rate_scale, language), load)
+
+
+def loaded():
+    """Labels of everything loaded so far."""
+    return [_label(key) for key in _instances]
+
+
+def startup_report():
+    parts = []
+    for label, t in timings.items():
+        detail = f"load {t.get('load', 0):.2f} s"
+        if "warmup" in t:
+            detail += f", warm-up {t['warmup']:.2f} s"
+        parts.append(f"{label} {detail}")
+    return "; ".join(parts)
@@ -0,0 +1,278 @@
+"""
+pipeline.py
+Declarative asyncio pipeline with bounded, back-pressured stages.
+
+    pipeline = Pipeline([
+        Stage("segment", segmenter.push, mode=INLINE, flat=True, on_close=segmenter.flush),
+        Stage("asr", transcribe, mode=THREAD),
+        Stage("translate", translate_async, mode=ASYNC, concurrency=16),
+    ])
+    asyncio.run(pipeline.run(ring_source(audio_ring)))
+
+Every stage reads from a bounded queue, so a slow stage blocks the ones in
+front of it instead of letting memory grow. Heavy stages run in their own
+thread pool (mode=THREAD), cheap ones directly on the loop (INLINE), and
+coroutine stages (ASYNC) may have several items in flight. Outputs always
+leave a stage in input order. A stage function returning None drops the
+item; with flat=True it returns an iterable of outputs (0..n per input).
+
+Every item travels in an envelope with a metrics.Trace, so when a Metrics
+registry is given the pipeline records queue wait and service time per
+stage, end-to-end latency at the last stage, and samples queue depths. A
+source yielding Captured(value, time) starts the trace at that capture time
+(ring_source does, with the time the block was written to the ring), so time
+spent waiting in the capture buffer counts in the latency.
+
+Shutdown: stop() ends the source, the end-of-stream marker flows through
+every stage (running each on_close hook, e.g. flushing the VAD) and run()
+returns once everything is drained. No polling, no sentinels in user code.
+"""
+
+import asyncio
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Trace
+
+INLINE = "inline"    # cheap, runs on the event loop
+THREAD = "thread"    # blocking / CPU-heavy, runs in the stage's own thread pool
+ASYNC = "async"      # coroutine function
+
+EOS = object()       # end-of-stream marker, internal
+_DROP = object()
+
+Captured = namedtuple("Captured", "value time")     # source item with its capture time (time.time())
+
+
+class _Envelope:
+    __slots__ = ("value", "trace", "enqueued")
+
+    def __init__(self, value, trace):
+        self.value = value
+        self.trace = trace
+        self.enqueued = time.perf_counter()
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, started, time.perf_counter() - started
+
+
+class Stage:
+    def __init__(self, name, fn, mode=THREAD, concurrency=1, maxsize=8, flat=False, on_close=None):
+        if mode not in (INLINE, THREAD, ASYNC):
+            raise ValueError(f"Unknown stage mode {mode!r}")
+        self.name = name
+        self.fn = fn
+        self.mode = mode
+        self.concurrency = concurrency
+        self.maxsize = maxsize
+        self.flat = flat
+        self.on_close = on_close
+        self.processed = 0
+        self.errors = 0
+        self.queue = None
+        self._executor = None
+
+    def __repr__(self):
+        return f"<Stage {self.name} ({self.mode}, x{self.concurrency})>"
+
+    async def call(self, fn, *args):
+        """Run fn(*args) in this stage's mode; returns (result, started, elapsed)
+        measured where the work actually runs (so executor backlog counts as wait)."""
+        if self.mode == ASYNC:
+            started = time.perf_counter()
+            result = await fn(*args)
+            return result, started, time.perf_counter() - started
+        if self.mode == INLINE:
+            return _timed(fn, *args)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=self.name)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, _timed, fn, *args)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class Pipeline:
+    """`metrics`: optional metrics.Metrics; `samplers`: callables run every
+    `sample_interval` seconds (e.g. to publish capture-buffer counters)."""
+
+    def __init__(self, stages, metrics=None, sample_interval=1.0, samplers=()):
+        self.stages = list(stages)
+        self.metrics = metrics
+        self.sample_interval = sample_interval
+        self.samplers = list(samplers)
+        self._feed_task = None
+        self._stopping = False
+
+    def stop(self):
+        """Graceful stop: end the source, let every stage drain. Thread-unsafe;
+        from another thread use loop.call_soon_threadsafe(pipeline.stop)."""
+        self._stopping = True
+        if self._feed_task is not None:
+            self._feed_task.cancel()
+
+    def depths(self):
+        """Current input-queue depth per stage."""
+        return {s.name: (s.queue.qsize() if s.queue is not None else 0) for s in self.stages}
+
+    async def run(self, source):
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(maxsize=stage.maxsize)
+        outputs = [s.queue for s in self.stages[1:]] + [None]
+
+        self._feed_task = asyncio.create_task(self._feed(source, self.stages[0].queue))
+        tasks = [asyncio.create_task(self._run_stage(stage, out)) for stage, out in zip(self.stages, outputs)]
+        sampler = asyncio.create_task(self._sample()) if self.metrics is not None else None
+        if self._stopping:
+            self._feed_task.cancel()
+        try:
+            await asyncio.gather(self._feed_task_guard(), *tasks)
+        except BaseException:
+            for task in tasks + [self._feed_task]:
+                task.cancel()
+            raise
+        finally:
+            if sampler is not None:
+                sampler.cancel()
+                self.sample()
+            for stage in self.stages:
+                stage.shutdown()
+
+    def stats(self):
+        return {s.name: {"processed": s.processed, "errors": s.errors} for s in self.stages}
+
+    def sample(self):
+        for name, depth in self.depths().items():
+            self.metrics.set_gauge("queue_depth", depth, stage=name)
+            self.metrics.observe("queue_depth_samples", depth, stage=name)
+        for sampler in self.samplers:
+            sampler()
+
+    # --- Internal helpers ---
+    async def _feed_task_guard(self):
+        try:
+            await self._feed_task
+        except asyncio.CancelledError:
+            if not self._stopping:
+                raise
+
+    async def _feed(self, source, out):
+        try:
+            async for item in source:
+                if isinstance(item, Captured):
+                    await out.put(_Envelope(item.value, Trace(item.time)))
+                else:
+                    await out.put(_Envelope(item, Trace()))
+        finally:
+            await asyncio.shield(out.put(EOS))
+
+    async def _run_stage(self, stage, out):
+        slots = asyncio.Semaphore(stage.concurrency)
+        inflight = asyncio.Queue()
+
+        async def dispatch():
+            while True:
+                envelope = await stage.queue.get()
+                if envelope is EOS:
+                    break
+                # Bounded: an item starts only once one of the `concurrency`
+                # slots is free; emit() frees it when the result has left.
+                await slots.acquire()
+                task = asyncio.ensure_future(self._process(stage, stage.fn, envelope.value))
+                await inflight.put((envelope, task))
+            await inflight.put(EOS)
+
+        async def emit():
+            while True:
+                entry = await inflight.get()
+                if entry is EOS:
+                    break
+                envelope, task = entry
+                result, started, service = await task
+                wait = started - envelope.enqueued
+                envelope.trace.record(stage.name, wait, service)
+                if self.metrics is not None:
+                    self.metrics.observe("stage_queue_wait_seconds", wait, stage=stage.name)
+                    self.metrics.observe("stage_service_seconds", service, stage=stage.name)
+                if out is None:
+                    # Last stage: the item's journey ends here.
+                    if self.metrics is not None and result is not _DROP:
+                        self.metrics.finish_trace(envelope.trace)
+                else:
+                    await self._forward(stage, result, envelope.trace, out)
+                slots.release()
+            if stage.on_close is not None:
+                result, _, _ = await self._process(stage, stage.on_close)
+                if out is not None:
+                    await self._forward(stage, result, Trace(), out)
+            if out is not None:
+                await out.put(EOS)
+
+        await asyncio.gather(dispatch(), emit())
+
+    async def _process(self, stage, fn, *args):
+        started, service = time.perf_counter(), 0.0
+        try:
+            result, started, service = await stage.call(fn, *args)
+            stage.processed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stage.errors += 1
+            if self.metrics is not None:
+                self.metrics.inc("stage_errors", stage=stage.name)
+            print(f"Error in stage '{stage.name}':", e)
+            traceback.print_exc()
+            result = _DROP
+        return result, started, service
+
+    async def _forward(self, stage, result, trace, out):
+        if result is None or result is _DROP:
+            return
+        results = [r for r in (result if stage.flat else (result,)) if r is not None]
+        for item in results:
+            await out.put(_Envelope(item, trace.child() if len(results) > 1 else trace))
+
+    async def _sample(self):
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            self.sample()
+
+
+async def ring_source(ring):
+    """Async source over a RingBuffer: yields Captured(copy of the newly
+    captured samples, capture time of the first one) until the ring is
+    closed and drained. Sleeps on an asyncio.Event that the
+    producer sets (ring.on_data, through loop.call_soon_threadsafe) after each
+    write and on close."""
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+
+    def wake():
+        try:
+            loop.call_soon_threadsafe(ready.set)
+        except RuntimeError:
+            pass                        # loop already closed: nobody is waiting
+
+    ring.on_data = wake
+    try:
+        while not ring.closed or ring.available():
+            start, view = ring.peek()
+            if len(view):
+                block = view.copy()
+                captured = ring.capture_time(start)
+                ring.advance(len(block))
+                yield Captured(block, captured)
+                continue
+            ready.clear()
+            if not ring.available() and not ring.closed:     # re-check: a write may have raced the clear
+                await ready.wait()
+    finally:
+        ring.on_data = None
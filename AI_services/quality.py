@@ -0,0 +1,140 @@
+"""
+quality.py
+Adaptive ASR quality: step between decode profiles to stay within a latency
+budget.
+
+A Profile bundles everything that trades accuracy for speed: Whisper model
+size, temperature fallback (re-decoding a poor segment at higher
+temperatures) and the longest segment the VAD may emit. Decoding is greedy
+in every profile, as in whisper.transcribe() by default.
+Profiles are ordered best-first; the controller starts at the top and
+
+ - steps down as soon as the estimated backlog latency ((queue depth + 1) x
+   decode time) exceeds the budget, or the real-time factor passes `max_rtf`
+ - steps back up only after `upgrade_after` seconds of sustained headroom
+   (latency under half the budget and RTF under `min_rtf`)
+
+Both directions have a cooldown so it does not oscillate. Every switch is
+printed with its trigger and counted in metrics.
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+MODEL_SIZES = ["tiny", "base", "small", "medium", "large"]
+TEMPERATURE_FALLBACK = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)    # whisper.transcribe's default
+
+
+@dataclass
+class Profile:
+    name: str
+    model: str
+    temperature_fallback: bool = True
+    max_segment_seconds: float = 15.0
+
+    def decode_options(self):
+        return {"temperature": TEMPERATURE_FALLBACK if self.temperature_fallback else 0.0}
+
+
+def model_size(model):
+    """Size of a Whisper model name: "base.en" -> "base", "large-v3" and
+    "turbo" (large-v3-turbo) -> "large"."""
+    name = model.split(".")[0]
+    if name == "turbo" or name.startswith("large"):
+        return "large"
+    if name not in MODEL_SIZES:
+        raise ValueError(f"Unknown Whisper model '{model}': expected {', '.join(MODEL_SIZES)}, "
+                         f"a .en variant, large-v1/v2/v3 or turbo")
+    return name
+
+
+def ladder(top_model="base", bottom_model="tiny"):
+    """Default profiles from `top_model` down to `bottom_model`: for each size
+    Whisper's default decode (greedy + temperature fallback), then one
+    without fallback and with shorter segments. The two given models are used
+    for their own sizes; sizes in between are English-only when `top_model`
+    is (e.g. "medium.en" -> "small.en" -> "tiny")."""
+    top, bottom = model_size(top_model), model_size(bottom_model)
+    if MODEL_SIZES.index(top) < MODEL_SIZES.index(bottom):
+        top, bottom, top_model, bottom_model = bottom, top, bottom_model, top_model
+    suffix = ".en" if top_model.endswith(".en") else ""
+    profiles = []
+    for size in reversed(MODEL_SIZES[MODEL_SIZES.index(bottom):MODEL_SIZES.index(top) + 1]):
+        model = {bottom: bottom_model, top: top_model}.get(size) or size + (suffix if size != "large" else "")
+        profiles.append(Profile(model, model, temperature_fallback=True, max_segment_seconds=15.0))
+        profiles.append(Profile(f"{model}-fast", model, temperature_fallback=False, max_segment_seconds=8.0))
+    return profiles
+
+
+class AdaptiveController:
+    def __init__(self, profiles, latency_budget=3.0, max_rtf=0.8, min_rtf=0.3, window=8,
+                 cooldown=10.0, upgrade_after=30.0, metrics=None, on_switch=None):
+        self.profiles = list(profiles)
+        self.latency_budget = latency_budget
+        self.max_rtf = max_rtf
+        self.min_rtf = min_rtf
+        self.cooldown = cooldown
+        self.upgrade_after = upgrade_after
+        self.metrics = metrics
+        self.on_switch = on_switch
+        self.index = 0
+        self.history = []                # (time, from, to, reason)
+        self._rtf = deque(maxlen=window)
+        self._latency = deque(maxlen=window)
+        self._last_switch = time.monotonic()
+        self._healthy_since = None
+
+    @property
+    def profile(self):
+        return self.profiles[self.index]
+
+    def observe(self, rtf, decode_seconds, queue_depth=0):
+        """Feed one decode; may switch profile (effective from the next decode)."""
+        latency = (queue_depth + 1) * decode_seconds
+        self._rtf.append(rtf)
+        self._latency.append(latency)
+        if self.metrics is not None:
+            self.metrics.observe("asr_backlog_latency_seconds", latency)
+        now = time.monotonic()
+        if len(self._rtf) < 3 or now - self._last_switch < self.cooldown:
+            return
+
+        avg_rtf = float(np.mean(self._rtf))
+        p90_latency = float(np.percentile(self._latency, 90))
+        if p90_latency > self.latency_budget or avg_rtf > self.max_rtf:
+            self._healthy_since = None
+            if self.index + 1 < len(self.profiles):
+                trigger = (f"latency p90 {p90_latency:.2f} s > budget {self.latency_budget:.2f} s"
+                           if p90_latency > self.latency_budget else f"rtf {avg_rtf:.2f} > {self.max_rtf:.2f}")
+                self._switch(self.index + 1, trigger, now)
+        elif p90_latency < self.latency_budget / 2 and avg_rtf < self.min_rtf:
+            if self._healthy_since is None:
+                self._healthy_since = now
+            elif now - self._healthy_since >= self.upgrade_after and self.index > 0:
+                self._switch(self.index - 1, f"headroom for {now - self._healthy_since:.0f} s "
+                                             f"(rtf {avg_rtf:.2f}, latency p90 {p90_latency:.2f} s)", now)
+        else:
+            self._healthy_since = None
+
+    def stats(self):
+        return {"profile": self.profile.name, "switches": len(self.history)}
+
+    # --- Internal helpers ---
+    def _switch(self, index, trigger, now):
+        old, new = self.profile, self.profiles[index]
+        direction = "down" if index > self.index else "up"
+        print(f"⚙️ ASR quality {direction}: {old.name} -> {new.name} ({trigger})")
+        self.history.append((time.time(), old.name, new.name, trigger))
+        self.index = index
+        self._last_switch = now
+        self._healthy_since = None
+        self._rtf.clear()
+        self._latency.clear()
+        if self.metrics is not None:
+            self.metrics.inc("asr_quality_switches", direction=direction)
+            self.metrics.set_gauge("asr_quality_profile", index)
+        if self.on_switch is not None:
+            self.on_switch(old, new)
@@ -0,0 +1,201 @@
+"""
+quantize.py
+int8 Whisper for CPU-only hosts.
+
+Dynamic quantization stores the weights of every Linear layer (attention
+projections and MLPs, most of Whisper's compute) as int8 and quantizes
+activations on the fly, so matrix multiplies run on int8 kernels and the
+weights take ~4x less memory. Convolutions, embeddings and layer norms stay
+float32.
+
+The quantized module is cached on disk, so only the first start pays for
+quantizing:
+
+    model_registry.get_whisper("base", dtype="int8")    # cli.py --dtype int8
+
+Comparison against float32 on local WAV fixtures (a `<name>.txt` next to a
+WAV is used as its reference transcript; otherwise float32's output is):
+
+    python quantize.py compare ../output.wav --model base
+    python quantize.py build --model small      # pre-build the cache
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "dunno", "whisper-int8")
+
+
+def cache_path(name):
+    import torch
+
+    # Pickled quantized modules are tied to the torch version that wrote them.
+    return os.path.join(CACHE_DIR, f"{name}-torch{torch.__version__.split('+')[0]}.pt")
+
+
+def quantize_whisper(model):
+    """Return `model` (float32, CPU) with its Linear layers dynamically quantized."""
+    import torch
+    import whisper.model
+
+    model = model.float().cpu().eval()
+    # whisper.model.Linear only overrides forward() to cast weights to the input
+    # dtype; quantize_dynamic matches exact types, so turn them back into nn.Linear.
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_quantized(name="base", rebuild=False):
+    """int8 Whisper `name`, from the disk cache when possible."""
+    import torch
+    import whisper
+
+    path = cache_path(name)
+    if not rebuild and os.path.exists(path):
+        try:
+            return torch.load(path, map_location="cpu", weights_only=False)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable quantized cache {path}:", e)
+
+    print(f"⏳ Quantizing Whisper '{name}' to int8 (cached for next time)...")
+    model = quantize_whisper(whisper.load_model(name, device="cpu"))
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    torch.save(model, tmp)
+    os.replace(tmp, path)
+    return model
+
+
+def model_size_mb(model):
+    """Serialized size of the weights (int8 packed params included)."""
+    import torch
+
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+# --- WER ---
+def _words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """(edit distance in words, reference length)."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (r != h))
+    return row[len(hyp)], len(ref)
+
+
+def wer(references, hypotheses):
+    errors = total = 0
+    for ref, hyp in zip(references, hypotheses):
+        e, n = word_errors(ref, hyp)
+        errors += e
+        total += n
+    return errors / total if total else 0.0
+
+
+# --- Comparison tool ---
+def _decode_all(model, clips, language, repeat):
+    texts, seconds = [], []
+    model.transcribe(np.zeros(16000, dtype=np.float32), fp16=False, language=language or "en")   # warm-up
+    for _ in range(repeat):
+        texts = []
+        started = time.perf_counter()
+        for audio in clips:
+            texts.append(model.transcribe(audio, fp16=False, language=language, temperature=0.0)["text"].strip())
+        seconds.append(time.perf_counter() - started)
+    return texts, min(seconds)
+
+
+def compare(paths, name="base", language=None, repeat=3):
+    import whisper
+
+    from batch_transcribe import to_float_mono, wav_memmap
+
+    clips, references = [], []
+    for path in paths:
+        frames, sample_rate = wav_memmap(path)
+        clips.append(to_float_mono(frames, sample_rate))
+        ref_path = os.path.splitext(path)[0] + ".txt"
+        if os.path.exists(ref_path):
+            with open(ref_path, encoding="utf-8") as f:
+                references.append(f.read().strip())
+        else:
+            references.append(None)
+    audio_seconds = sum(len(c) for c in clips) / 16000
+
+    started = time.perf_counter()
+    fp32 = whisper.load_model(name, device="cpu")
+    fp32_load = time.perf_counter() - started
+    fp32_texts, fp32_seconds = _decode_all(fp32, clips, language, repeat)
+    fp32_size = model_size_mb(fp32)
+    del fp32
+
+    started = time.perf_counter()
+    int8 = load_quantized(name)
+    int8_load = time.perf_counter() - started
+    int8_texts, int8_seconds = _decode_all(int8, clips, language, repeat)
+    int8_size = model_size_mb(int8)
+
+    # Without a reference transcript, float32's output is the reference.
+    refs = [r if r is not None else t for r, t in zip(references, fp32_texts)]
+    report = {
+        "model": name,
+        "files": paths,
+        "audio_seconds": round(audio_seconds, 2),
+        "references": sum(r is not None for r in references),
+        "float32": {"load_seconds": round(fp32_load, 2), "decode_seconds": round(fp32_seconds, 3),
+                    "rtf": round(fp32_seconds / audio_seconds, 4), "weights_mb": round(fp32_size, 1),
+                    "wer": round(wer(refs, fp32_texts), 4)},
+        "int8": {"load_seconds": round(int8_load, 2), "decode_seconds": round(int8_seconds, 3),
+                 "rtf": round(int8_seconds / audio_seconds, 4), "weights_mb": round(int8_size, 1),
+                 "wer": round(wer(refs, int8_texts), 4)},
+    }
+    report["speedup"] = round(fp32_seconds / int8_seconds, 2)
+    report["memory_saving"] = round(1 - int8_size / fp32_size, 3)
+    report["wer_delta"] = round(report["int8"]["wer"] - report["float32"]["wer"], 4)
+    report["mismatches"] = [{"file": p, "float32": a, "int8": b}
+                            for p, a, b in zip(paths, fp32_texts, int8_texts) if _words(a) != _words(b)]
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="int8 Whisper: build the cache or compare with float32.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="quantize a model and cache it on disk")
+    build.add_argument("--model", default="base")
+    cmp_ = sub.add_parser("compare", help="speed / memory / WER of int8 vs float32")
+    cmp_.add_argument("paths", nargs="+", help="WAV fixtures (optional <name>.txt references)")
+    cmp_.add_argument("--model", default="base")
+    cmp_.add_argument("--language", default=None)
+    cmp_.add_argument("--repeat", type=int, default=3, help="timed runs, the fastest counts")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        load_quantized(args.model, rebuild=True)
+        print(f"✅ Cached at {cache_path(args.model)}")
+        return
+
+    report = compare(args.paths, args.model, args.language, args.repeat)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"📊 {args.model}: int8 is {report['speedup']:.2f}x faster, {report['memory_saving']:.0%} smaller, "
+          f"WER {report['float32']['wer']:.2%} -> {report['int8']['wer']:.2%}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
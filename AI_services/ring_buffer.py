@@ -0,0 +1,200 @@
+"""
+ring_buffer.py
+Preallocated single-producer / single-consumer ring buffer for mic capture.
+
+The PortAudio callback writes samples in place (no allocation, no locks on
+the hot path) and the worker thread reads zero-copy views. The storage is
+"mirrored": every sample is written twice, `capacity` slots apart, so any
+window of up to `capacity` samples is one contiguous slice and readers never
+have to stitch two halves together.
+
+Only the producer moves the write counter and only the consumer moves the
+read counter, so no lock is needed between them. Memory is bounded: when
+the consumer falls behind, the overflow policy decides what is lost and the
+overrun counters record it.
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+DROP_OLDEST = "drop_oldest"   # overwrite unread audio (keep the most recent)
+DROP_NEWEST = "drop_newest"   # discard the incoming block (keep the backlog)
+BLOCK = "block"               # wait for the consumer (never use in a real-time callback)
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class RingBuffer:
+    def __init__(self, capacity, policy=DROP_OLDEST, block_timeout=1.0, dtype=np.float32):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}, expected one of {POLICIES}")
+        self.capacity = int(capacity)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._data = np.zeros(2 * self.capacity, dtype=dtype)
+        self._write = 0        # total samples written (producer only)
+        self._read = 0         # total samples consumed (consumer only)
+        self._closed = False
+        self._data_ready = threading.Event()
+        self._space_ready = threading.Event()
+        self.on_data = None        # called from the producer's thread after each write and on close
+        self._stamps = deque(maxlen=4096)   # (stream offset, time.time()) of each write, oldest first
+
+        # Overrun counters
+        self.overruns = 0          # producer: writes that did not fit
+        self.dropped_newest = 0    # producer: incoming samples discarded
+        self.dropped_oldest = 0    # consumer: unread samples found overwritten
+
+    # --- Producer side ---
+    def write(self, samples, captured=None):
+        """Copy a 1-D block into the ring. Returns the number of samples kept.
+        `captured`: capture time (time.time()) of the block, default now."""
+        captured = time.time() if captured is None else captured
+        n = len(samples)
+        free = self.capacity - (self._write - self._read)
+        if n > free:
+            self.overruns += 1
+            if self.policy == BLOCK:
+                free = self._wait_for_space(n)
+            if self.policy != DROP_OLDEST and n > free:
+                self.dropped_newest += n - max(free, 0)
+                n = max(free, 0)
+                samples = samples[:n]
+        # A block larger than the ring: only its tail can be kept, but the
+        # stream offset still advances past the part that was dropped.
+        write = self._write
+        if n > self.capacity:
+            write += n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+        if n == 0:
+            return 0
+
+        cap = self.capacity
+        pos = write % cap
+        k = min(n, cap - pos)
+        self._data[pos:pos + k] = samples[:k]
+        self._data[pos + cap:pos + cap + k] = samples[:k]
+        if n > k:
+            self._data[:n - k] = samples[k:]
+            self._data[cap:cap + n - k] = samples[k:]
+
+        self._stamps.append((write, captured))
+        self._write = write + n   # publish only after the data is in place
+        self._data_ready.set()
+        if self.on_data is not None:
+            self.on_data()
+        return n
+
+    def close(self):
+        """No more writes: wakes up a waiting consumer."""
+        self._closed = True
+        self._data_ready.set()
+        if self.on_data is not None:
+            self.on_data()
+
+    # --- Consumer side ---
+    @property
+    def closed(self):
+        return self._closed
+
+    def available(self):
+        return min(self._write - self._read, self.capacity)
+
+    def wait(self, n=1, timeout=None):
+        """Block until at least `n` samples are readable or the ring is closed."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.available() < n and not self._closed:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._data_ready.clear()
+            if self.available() >= n or self._closed:
+                break
+            self._data_ready.wait(remaining)
+        return self.available() >= n
+
+    def peek(self, n=None):
+        """Return (start, view) for up to `n` unread samples without copying.
+
+        `start` is the stream offset of view[0]. The view stays valid until
+        the producer wraps around onto it; use `still_valid(start)` after
+        processing if the policy is drop_oldest and the consumer is slow.
+        """
+        self._skip_overwritten()
+        avail = min(self._write - self._read, self.capacity)
+        if n is None or n > avail:
+            n = avail
+        pos = self._read % self.capacity
+        return self._read, self._data[pos:pos + n]
+
+    def capture_time(self, offset):
+        """Capture time of the write that contains stream offset `offset`
+        (e.g. the `start` returned by peek()), or None if unknown."""
+        stamps = self._stamps
+        # Consumer side: forget the writes that end before `offset`.
+        while len(stamps) > 1 and stamps[1][0] <= offset:
+            stamps.popleft()
+        return stamps[0][1] if stamps and stamps[0][0] <= offset else None
+
+    def advance(self, n):
+        """Mark `n` samples as consumed."""
+        self._read += n
+        self._space_ready.set()
+
+    def read(self, n=None):
+        """Copying convenience read: returns a new array and advances."""
+        start, view = self.peek(n)
+        out = view.copy()
+        self.advance(len(out))
+        return out
+
+    def blocks(self, min_samples=1, timeout=0.1, stop_event=None):
+        """Yield zero-copy views of new audio until the ring is closed and
+        drained (or `stop_event` is set). Each view is consumed once the loop
+        body that received it moves on."""
+        while stop_event is None or not stop_event.is_set():
+            if not self.wait(min_samples, timeout) and not self._closed:
+                continue
+            start, view = self.peek()
+            if len(view):
+                yield view
+                self.advance(len(view))
+            if self._closed and not self.available():
+                return
+
+    def still_valid(self, start):
+        return self._write - start <= self.capacity
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "buffered": self.available(),
+            "overruns": self.overruns,
+            "dropped_newest": self.dropped_newest,
+            "dropped_oldest": self.dropped_oldest,
+        }
+
+    # --- Internal helpers ---
+    def _skip_overwritten(self):
+        lag = self._write - self._read
+        if lag > self.capacity:
+            self.dropped_oldest += lag - self.capacity
+            self._read = self._write - self.capacity
+
+    def _wait_for_space(self, n):
+        deadline = time.monotonic() + self.block_timeout
+        free = self.capacity - (self._write - self._read)
+        while free < n and not self._closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._space_ready.clear()
+            free = self.capacity - (self._write - self._read)
+            if free >= n:
+                break
+            self._space_ready.wait(remaining)
+            free = self.capacity - (self._write - self._read)
+        return free
@@ -0,0 +1,216 @@
+"""
+streaming.py
+Incremental (sliding-window) Whisper transcription.
+
+Instead of transcribing each utterance once it is complete, the streaming
+transcriber keeps a rolling audio buffer and re-decodes it every `step`
+seconds. A word is committed once two consecutive hypotheses agree on it
+(local agreement), so the first words are emitted while the speaker is still
+talking. After every commit the buffer is trimmed to the last committed word
+(minus `overlap` seconds), so each re-decode only covers the unconfirmed
+tail plus a little audio context; the committed text goes in the prompt.
+
+With a mel_frontend.IncrementalLogMel, the log-mel frames of the buffer are
+computed once as audio arrives instead of on every re-decode.
+"""
+
+import re
+
+import numpy as np
+
+from mel_frontend import whisper_words_from_mel
+
+SAMPLE_RATE = 16000
+
+
+def _norm(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def whisper_words(model, audio, prompt="", language=None, on_result=None):
+    """Decode `audio` with Whisper and return [(start, end, word), ...] with
+    times in seconds relative to the start of `audio`; `on_result` gets the
+    transcribe() result."""
+    result = model.transcribe(
+        audio,
+        fp16=False,
+        language=language,
+        initial_prompt=prompt or None,
+        word_timestamps=True,
+        condition_on_previous_text=False,
+    )
+    if on_result is not None:
+        on_result(result)
+    words = []
+    for segment in result.get("segments", []):
+        for w in segment.get("words", []):
+            words.append((w["start"], w["end"], w["word"]))
+    return words
+
+
+class HypothesisBuffer:
+    """Local-agreement bookkeeping for consecutive decodes of the same audio."""
+
+    def __init__(self):
+        self.committed = []        # words confirmed so far (absolute times)
+        self.previous = []         # last hypothesis, not yet confirmed
+        self.current = []          # hypothesis being inserted
+        self.last_committed_time = 0.0
+
+    def insert(self, words, offset):
+        # Shift to stream time and drop words that end before what we already committed.
+        words = [(s + offset, e + offset, w) for s, e, w in words]
+        self.current = [x for x in words if x[0] > self.last_committed_time - 0.1]
+
+        # Whisper often repeats the last committed words at the start of the
+        # new hypothesis; strip an n-gram overlap (up to 5 words).
+        if self.current and self.committed and abs(self.current[0][0] - self.last_committed_time) < 1:
+            for n in range(min(len(self.committed), len(self.current), 5), 0, -1):
+                tail = [_norm(x[2]) for x in self.committed[-n:]]
+                head = [_norm(x[2]) for x in self.current[:n]]
+                if tail == head:
+                    self.current = self.current[n:]
+                    break
+
+    def flush(self):
+        """Commit the longest common prefix of the previous and current hypothesis."""
+        agreed = []
+        for new, old in zip(self.current, self.previous):
+            if _norm(new[2]) != _norm(old[2]):
+                break
+            agreed.append(new)
+        if agreed:
+            self.last_committed_time = agreed[-1][1]
+            self.committed.extend(agreed)
+        self.previous = self.current[len(agreed):]
+        self.current = []
+        return agreed
+
+    def pending(self):
+        return self.previous
+
+    def commit_pending(self):
+        """Commit the unconfirmed hypothesis as it is (its audio is about to
+        be dropped)."""
+        words, self.previous = self.previous, []
+        if words:
+            self.last_committed_time = words[-1][1]
+            self.committed.extend(words)
+        return words
+
+
+class StreamingTranscriber:
+    """Rolling-buffer transcriber with stable-prefix commit.
+
+    - on_commit(text)  : called with newly confirmed text (e.g. text_queue.put)
+    - on_interim(text) : called with the current unconfirmed tail
+    - step             : seconds of new audio between re-decodes
+    - overlap          : seconds kept before the last committed word when trimming
+    - max_buffer       : longest uncommitted audio; beyond it the pending
+                         hypothesis is committed as is, then trimmed
+    - decode           : (audio, prompt) -> [(start, end, word)], defaults to Whisper
+    - frontend         : optional IncrementalLogMel kept in sync with the buffer;
+                         the default decode then runs on its cached frames
+    - on_result        : called with each default decode's transcribe()-like
+                         result (segments with avg_logprob / no_speech_prob),
+                         e.g. LanguageManager.observe
+    """
+
+    def __init__(self, model=None, on_commit=None, on_interim=None, sample_rate=SAMPLE_RATE,
+                 step=0.5, max_buffer=12.0, language=None, decode=None, frontend=None, fp16=False,
+                 on_result=None, overlap=0.5):
+        self.sample_rate = sample_rate
+        self.step = step
+        self.max_buffer = max_buffer
+        self.overlap = overlap
+        self.language = language
+        self.on_commit = on_commit
+        self.on_interim = on_interim
+        self.frontend = frontend
+        if decode is None and frontend is not None:
+            decode = lambda audio, prompt: whisper_words_from_mel(model, *frontend.window(len(audio)), prompt,
+                                                                  self.language, fp16, on_result)
+        elif decode is None:
+            decode = lambda audio, prompt: whisper_words(model, audio, prompt, self.language, on_result)
+        self.decode = decode
+        self.reset()
+
+    def reset(self):
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.buffer_offset = 0.0       # stream time of self.audio[0]
+        self.hypothesis = HypothesisBuffer()
+        self._new_samples = 0
+        if self.frontend is not None:
+            self.frontend.reset()
+
+    @property
+    def buffered_seconds(self):
+        return len(self.audio) / self.sample_rate
+
+    def insert_audio(self, samples):
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        self.audio = np.concatenate([self.audio, samples])
+        self._new_samples += len(samples)
+        if self.frontend is not None:
+            self.frontend.append(samples)
+
+    def ready(self):
+        return self._new_samples >= self.step * self.sample_rate
+
+    def process(self):
+        """Re-decode the buffer and commit whatever two hypotheses agree on."""
+        self._new_samples = 0
+        if not len(self.audio):
+            return ""
+
+        words = self.decode(self.audio, self._prompt())
+        self.hypothesis.insert(words, self.buffer_offset)
+        committed = self.hypothesis.flush()
+        end = self.buffer_offset + self.buffered_seconds
+        if end - self.hypothesis.last_committed_time > self.max_buffer:
+            # Nothing agreed on for max_buffer seconds: keep the latest
+            # hypothesis rather than lose it with the audio dropped below.
+            committed += self.hypothesis.commit_pending()
+        text = "".join(w for _, _, w in committed).strip()
+        if text and self.on_commit:
+            self.on_commit(text)
+        if self.on_interim:
+            self.on_interim("".join(w for _, _, w in self.hypothesis.pending()).strip())
+
+        if committed:
+            self._trim(self.hypothesis.last_committed_time - self.overlap)
+        if self.buffered_seconds > self.max_buffer:
+            # Still too long: no words at all were decoded in it (noise);
+            # drop the oldest audio so the buffer (and decode cost) stays bounded.
+            self._trim(end - self.max_buffer / 2)
+        return text
+
+    def finish(self):
+        """End of utterance: commit the remaining tail and start over."""
+        if self._new_samples:
+            self.process()
+        tail = "".join(w for _, _, w in self.hypothesis.pending()).strip()
+        if tail and self.on_commit:
+            self.on_commit(tail)
+        if self.on_interim:
+            self.on_interim("")
+        end = self.buffer_offset + self.buffered_seconds
+        self.reset()
+        self.buffer_offset = end
+        return tail
+
+    # --- Internal helpers ---
+    def _prompt(self):
+        # Committed words that have scrolled out of the buffer give the decoder context.
+        words = [w for _, end, w in self.hypothesis.committed if end <= self.buffer_offset]
+        return "".join(words)[-200:]
+
+    def _trim(self, time):
+        """Drop the audio before stream time `time`."""
+        cut = int((time - self.buffer_offset) * self.sample_rate)
+        if cut <= 0:
+            return
+        self.audio = self.audio[cut:]
+        self.buffer_offset += cut / self.sample_rate
+        if self.frontend is not None:
+            self.frontend.trim(cut)
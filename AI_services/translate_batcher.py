@@ -0,0 +1,179 @@
+"""
+translate_batcher.py
+Micro-batching for translation requests.
+
+Texts submitted while a burst of speech comes in are coalesced into one
+translate([...]) call (up to `max_items` texts, or whatever arrived within
+`max_wait_ms` of the first one). Up to `max_in_flight` batches run
+concurrently; while they are all busy new texts keep accumulating, so
+batches grow under load instead of requests queueing one by one. Each caller
+gets a Future, resolved with its own result.
+
+With googletrans, translate([...]) still sends one HTTP request per text, so
+a batch saves no network round trips there: what it brings is a bound on the
+requests in flight, duplicates in a batch translated once, and a single call
+for translators that do accept a list in one request.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from translation_cache import AUTO
+
+
+class MicroBatcher:
+    """Generic coalescer: batch_fn(list_of_items) -> list_of_results (same order)."""
+
+    def __init__(self, batch_fn, max_items=16, max_wait_ms=50, max_in_flight=4):
+        self.batch_fn = batch_fn
+        self.max_items = max_items
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="batch")
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def submit(self, item):
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._pending.put((item, future))
+        return future
+
+    def close(self):
+        """Flush what is pending and wait for in-flight batches."""
+        self._closed = True
+        self._pending.put(None)
+        self._collector.join()
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+    # --- Internal helpers ---
+    def _collect(self):
+        while True:
+            first = self._pending.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(batch) < self.max_items:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+
+            # Wait for a free slot; meanwhile new items accumulate for the next batch.
+            self._slots.acquire()
+            self.batches += 1
+            self.items += len(batch)
+            self._executor.submit(self._run_batch, batch)
+            if stop:
+                return
+
+    def _run_batch(self, batch):
+        try:
+            results = self.batch_fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+
+class BatchedTranslator:
+    """Cache-aware, micro-batched translate: submit(text, dest) -> Future[str].
+
+    In-memory cache hits resolve immediately; everything else is looked up in
+    the persistent store and the fuzzy memory from the batch's worker thread
+    (never on the caller's event loop), and what is still missing is
+    translated per target language in one translator.translate([...],
+    dest=...) call, identical texts once, and stored back in the cache.
+    """
+
+    def __init__(self, translator, cache=None, max_items=16, max_wait_ms=50, max_in_flight=4, metrics=None):
+        self.translator = translator
+        self.cache = cache
+        self.metrics = metrics
+        self.translator_calls = 0
+        self.translated = 0                 # texts sent to the translator
+        self._lock = threading.Lock()
+        self.batcher = MicroBatcher(self._translate_batch, max_items, max_wait_ms, max_in_flight)
+
+    def submit(self, text, dest, src=AUTO):
+        if self.cache is not None:
+            cached = self.cache.lookup_memory(text, dest, src)
+            if cached is not None:
+                future = Future()
+                future.set_result(cached)
+                return future
+        return self.batcher.submit((text, dest, src))
+
+    def close(self):
+        self.batcher.close()
+
+    def stats(self):
+        stats = self.batcher.stats()
+        stats.update(translator_calls=self.translator_calls, translated=self.translated)
+        if self.cache is not None:
+            # The batcher calls the translator itself, not through cache.translate().
+            stats["cache"] = dict(self.cache.stats(), translator_calls=self.translator_calls)
+        return stats
+
+    def _translate_batch(self, items):
+        results = [None] * len(items)
+        groups = {}                          # (dest, src) -> {cache key: [item indexes]}
+        for index, (text, dest, src) in enumerate(items):
+            key = self.cache.key(text, dest, src) if self.cache is not None else (text, src, dest)
+            groups.setdefault((dest, src), {}).setdefault(key, []).append(index)
+
+        for (dest, src), texts in groups.items():
+            missing = []
+            for indexes in texts.values():
+                text = items[indexes[0]][0]
+                cached = self.cache.lookup_stored(text, dest, src) if self.cache is not None else None
+                if cached is None:
+                    missing.append(indexes)
+                for i in indexes:
+                    results[i] = cached
+            if not missing:
+                continue
+            batch = [items[indexes[0]][0] for indexes in missing]
+            started = time.perf_counter()
+            translated = self.translator.translate(batch, dest=dest, src=src)
+            with self._lock:
+                self.translator_calls += 1
+                self.translated += len(batch)
+            if self.metrics is not None:
+                self.metrics.observe("translation_rtt_seconds", time.perf_counter() - started)
+                self.metrics.observe("translation_batch_size", len(batch))
+            for text, indexes, result in zip(batch, missing, translated):
+                for i in indexes:
+                    results[i] = result.text
+                if self.cache is not None:
+                    self.cache.remember(text, dest, result.text, src, getattr(result, "src", None))
+        return results
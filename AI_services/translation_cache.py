@@ -0,0 +1,172 @@
+"""
+translation_cache.py
+Two-tier cache in front of the translator.
+
+ - tier 1: in-process LRU keyed on (normalized text, source_lang, target_lang)
+           with size and TTL eviction and hit/miss counters
+ - tier 2: optional persistent store (backend/app/translation_store.py), i.e.
+           the `translations` table looked up by a hash of the normalized text
+ - fuzzy : optional translation memory (translation_memory.py) serving the
+           translation of a near-duplicate text above a similarity score
+
+Repeated phrases ("hello", "can you hear me") are answered from memory or the
+database and never reach the network.
+"""
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+AUTO = "auto"
+
+
+def normalize_text(text):
+    """Canonical form used for cache keys: NFC, case-folded, single spaces,
+    without the trailing full stops / commas that ASR adds inconsistently."""
+    text = unicodedata.normalize("NFC", text).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(".…,;: ")
+
+
+def text_hash(normalized):
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe LRU with optional per-entry TTL (seconds)."""
+
+    def __init__(self, maxsize=10000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires = entry
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class TranslationCache:
+    """Cached translate(text, dest, src) in front of a googletrans-like translator.
+
+    `store` is anything with get(text_hash, target_lang, source_lang) -> str|None
+    and put(text_hash, source_lang, target_lang, original, translated).
+    `fuzzy` is a TranslationMemory consulted when both exact tiers miss.
+    `store_writes=False` only reads the store, for callers that already save
+    every translation with its source_hash (the CLI's write-behind writer).
+    """
+
+    def __init__(self, translator, maxsize=10000, ttl=None, store=None, fuzzy=None, store_writes=True):
+        self.translator = translator
+        self.memory = LRUCache(maxsize, ttl)
+        self.store = store
+        self.store_writes = store_writes
+        self.fuzzy = fuzzy
+        self.store_hits = 0
+        self.fuzzy_hits = 0
+        self.translator_calls = 0
+        self.store_errors = 0
+
+    def key(self, text, dest, src=AUTO):
+        return normalize_text(text), src or AUTO, dest
+
+    def lookup(self, text, dest, src=AUTO):
+        """Cached translation or None; never calls the translator."""
+        cached = self.lookup_memory(text, dest, src)
+        return cached if cached is not None else self.lookup_stored(text, dest, src)
+
+    def lookup_memory(self, text, dest, src=AUTO):
+        """Tier 1 only: no I/O, safe to call from an event loop."""
+        key = self.key(text, dest, src)
+        if not key[0]:
+            return text
+        return self.memory.get(key)
+
+    def lookup_stored(self, text, dest, src=AUTO):
+        """The persistent store, then the fuzzy memory (blocks on the DB)."""
+        key = self.key(text, dest, src)
+        if self.store is not None:
+            stored = None
+            try:
+                stored = self.store.get(text_hash(key[0]), dest, None if key[1] == AUTO else key[1])
+            except Exception:
+                self.store_errors += 1
+            if stored is not None:
+                self.store_hits += 1
+                self.memory.put(key, stored)
+                return stored
+        if self.fuzzy is not None:
+            match = self.fuzzy.lookup(text, dest, key[1])
+            if match is not None:
+                self.fuzzy_hits += 1
+                return match[0]
+        return None
+
+    def remember(self, text, dest, translated, src=AUTO, detected_src=None):
+        """Record a fresh translation in both tiers."""
+        key = self.key(text, dest, src)
+        self.memory.put(key, translated)
+        if self.fuzzy is not None:
+            self.fuzzy.add(text, dest, translated, detected_src or key[1])
+        if self.store is not None and self.store_writes:
+            try:
+                self.store.put(text_hash(key[0]), detected_src or key[1], dest, text, translated)
+            except Exception:
+                self.store_errors += 1
+
+    def translate(self, text, dest, src=AUTO):
+        cached = self.lookup(text, dest, src)
+        if cached is not None:
+            return cached
+        self.translator_calls += 1
+        result = self.translator.translate(text, dest=dest, src=src or AUTO)
+        self.remember(text, dest, result.text, src, getattr(result, "src", None))
+        return result.text
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats.update(store_hits=self.store_hits, fuzzy_hits=self.fuzzy_hits,
+                     translator_calls=self.translator_calls, store_errors=self.store_errors)
+        return stats
@@ -0,0 +1,276 @@
+"""
+translation_memory.py
+Fuzzy translation memory: reuse the translation of a near-duplicate text.
+
+Live ASR output varies between repetitions of the same sentence, so the
+exact cache keys of translation_cache.py miss. TranslationMemory indexes
+previously translated texts by their character trigrams:
+
+ - signature : MinHash of the trigram set (num_perm hashes, NumPy)
+ - index     : LSH, the signature cut into `bands` bands; texts sharing a
+               band land in the same bucket and become candidates
+ - score     : exact Jaccard similarity of the trigram sets of the query
+               and the candidates sharing the most bands (at most
+               `max_candidates`); the best one above `threshold` is served
+ - guard     : a candidate is only served if its numbers and negation words
+               are exactly those of the query ("at 5 pm" never answers
+               "at 6 pm", "I will come" never answers "I will not come")
+
+At the default threshold of 0.8, case and punctuation variants ("Can you
+hear me?" for "can you hear me", score 1.0) and small slips in longer
+sentences ("the quarterly numbers looks good", 0.85) are served. Short
+sentences with a misheard word or swapped words are not: "can you here me"
+scores 0.58 and "you can hear me" 0.76 against "can you hear me".
+
+A lookup hashes one short text and reads a few buckets, well under a
+millisecond. With 16 bands of 4 rows, pairs with Jaccard 0.8 are candidates
+with probability > 0.999, pairs below 0.3 rarely are.
+
+Replay transcripts (one utterance per line) to measure what it saves:
+    python translation_memory.py replay transcript.txt [--threshold 0.8] [--target fr]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict, defaultdict
+from urllib.request import pathname2url
+
+import numpy as np
+
+from translation_cache import AUTO, normalize_text
+
+PRIME = (1 << 31) - 1
+NUMBER = re.compile(r"\d+(?:[.,:]\d+)*")
+# Negations of the languages the pipeline translates most (after fuzzy_text:
+# lower case, apostrophes split, so "don't" gives "don t").
+NEGATIONS = frozenset("""
+    not no never nothing nobody none nor t cannot
+    ne pas jamais rien personne non ni
+    nunca nada nadie tampoco
+    nicht kein keine keinen keiner nie niemals nichts
+    nao nunca
+    mai niente nessuno
+    nahin nahi mat
+""".split())
+
+
+def fuzzy_text(text):
+    """normalize_text() without punctuation: what the trigrams are taken from."""
+    return " ".join(re.sub(r"[^\w\s]", " ", normalize_text(text)).split())
+
+
+def guard_tokens(fuzzy):
+    """What must match exactly for a fuzzy hit: the numbers, in order, and
+    the negation words of a fuzzy_text()."""
+    words = fuzzy.split()
+    return tuple(NUMBER.findall(fuzzy)), frozenset(w for w in words if w in NEGATIONS)
+
+
+def shingles(text, n=3):
+    """Set of character n-grams of an already normalized text (padded with
+    spaces so that word starts and ends count)."""
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class MinHasher:
+    """num_perm hash functions h(x) = (a*x + b) mod p over crc32 shingle ids."""
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, grams):
+        ids = np.fromiter((zlib.crc32(g.encode("utf-8")) % PRIME for g in grams), dtype=np.uint64, count=len(grams))
+        return ((ids[:, None] * self.a + self.b) % PRIME).min(axis=0)
+
+
+class TranslationMemory:
+    """lookup(text, target_lang) -> (translated, score, matched original) or None."""
+
+    def __init__(self, threshold=0.8, num_perm=64, bands=16, ngram=3, min_chars=6, max_entries=100000,
+                 max_candidates=32):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram = ngram
+        self.min_chars = min_chars          # shorter texts ("yes", "no") only match exactly
+        self.max_entries = max_entries
+        self.max_candidates = max_candidates
+        self.hasher = MinHasher(num_perm)
+        self._entries = OrderedDict()       # (fuzzy text, target) -> (grams, signature, guard, src, translated, original)
+        self._buckets = defaultdict(list)   # (target, band, band bytes) -> [entry key]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.lookup_seconds = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, text, target_lang, translated, source_lang=AUTO):
+        fuzzy = fuzzy_text(text)
+        if len(fuzzy) < self.min_chars or not translated:
+            return
+        key = (fuzzy, target_lang)
+        grams = shingles(fuzzy, self.ngram)
+        signature = self.hasher.signature(grams)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = (grams, signature, guard_tokens(fuzzy), source_lang or AUTO, translated, text)
+            for bucket in self._band_keys(signature, target_lang):
+                self._buckets[bucket].append(key)
+            while len(self._entries) > self.max_entries:
+                self._evict()
+
+    def lookup(self, text, target_lang, source_lang=AUTO):
+        started = time.perf_counter()
+        try:
+            fuzzy = fuzzy_text(text)
+            if len(fuzzy) < self.min_chars:
+                self.misses += 1
+                return None
+            grams = shingles(fuzzy, self.ngram)
+            signature = self.hasher.signature(grams)
+            guard = guard_tokens(fuzzy)
+            best, best_score = None, self.threshold
+            with self._lock:
+                # Shared bands estimate the similarity: verify the likeliest first.
+                shared = Counter(k for bucket in self._band_keys(signature, target_lang)
+                                 for k in self._buckets.get(bucket, ()))
+                for key, _ in shared.most_common(self.max_candidates):
+                    entry_grams, _, entry_guard, entry_src, translated, original = self._entries[key]
+                    if source_lang not in (None, AUTO) and entry_src not in (AUTO, source_lang):
+                        continue
+                    if entry_guard != guard:
+                        continue
+                    score = jaccard(grams, entry_grams)
+                    if score >= best_score:
+                        best, best_score = (translated, score, original), score
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return best
+        finally:
+            self.lookup_seconds += time.perf_counter() - started
+
+    def load_from_db(self, db_path, target_lang=None, limit=None):
+        """Index the stored translations of the backend DB (most recent first
+        when `limit` is set); returns the number of rows read. Raises
+        FileNotFoundError or ValueError (no translations table)."""
+        query = "SELECT original_text, target_lang, translated_text, source_lang FROM translations"
+        params = []
+        if target_lang:
+            query += " WHERE target_lang = ?"
+            params.append(target_lang)
+        query += " ORDER BY id DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"No database at {db_path}")
+        # Read-only: a wrong path must not leave an empty database behind.
+        with sqlite3.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True) as conn:
+            found = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'translations'")
+            if found.fetchone() is None:
+                raise ValueError(f"{db_path} has no translations table")
+            rows = conn.execute(query, params).fetchall()
+        for original, target, translated, source in reversed(rows):
+            self.add(original, target, translated, source)
+        return len(rows)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "avg_lookup_ms": round(self.lookup_seconds / lookups * 1000, 3) if lookups else 0.0,
+        }
+
+    # --- Internal helpers ---
+    def _band_keys(self, signature, target_lang):
+        return [(target_lang, band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def _evict(self):
+        key, (_, signature, _, _, _, _) = self._entries.popitem(last=False)
+        for bucket in self._band_keys(signature, key[1]):
+            keys = self._buckets[bucket]
+            keys.remove(key)
+            if not keys:
+                del self._buckets[bucket]
+
+
+# --- Replay report ---
+def replay(lines, target, threshold, latency):
+    """Translate `lines` through an exact cache, then through the exact cache
+    plus the translation memory; returns both runs' numbers."""
+    from fakes import FakeTranslator
+    from translation_cache import TranslationCache
+
+    runs = {}
+    for name, memory in (("exact", None), ("exact+fuzzy", TranslationMemory(threshold))):
+        translator = FakeTranslator()
+        cache = TranslationCache(translator, fuzzy=memory)
+        lookups = []      # per utterance, translator included (instant fake)
+        for line in lines:
+            started = time.perf_counter()
+            cache.translate(line, target)
+            lookups.append(time.perf_counter() - started)
+        runs[name] = {
+            "utterances": len(lines),
+            "translator_calls": translator.calls,
+            "cache": cache.stats(),
+            "translate_ms_p50": round(statistics.median(lookups) * 1000, 3) if lookups else 0.0,
+            "network_seconds": round(translator.calls * latency, 1),
+        }
+        if memory is not None:
+            runs[name]["memory"] = memory.stats()
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay transcripts through the fuzzy translation memory.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    replay_parser = sub.add_parser("replay", help="hit rates and saved translate calls on transcripts")
+    replay_parser.add_argument("paths", nargs="+", help="text files, one utterance per line")
+    replay_parser.add_argument("--target", default="fr")
+    replay_parser.add_argument("--threshold", type=float, default=0.8, help="minimum trigram Jaccard score")
+    replay_parser.add_argument("--latency", type=float, default=0.15,
+                               help="translate round trip (s) used to estimate the time saved")
+    args = parser.parse_args()
+
+    lines = []
+    for path in args.paths:
+        with open(path, encoding="utf-8") as f:
+            lines.extend(line.strip() for line in f if line.strip())
+    runs = replay(lines, args.target, args.threshold, args.latency)
+    for name, run in runs.items():
+        print(f"📊 {name}:", run)
+    saved = runs["exact"]["translator_calls"] - runs["exact+fuzzy"]["translator_calls"]
+    print(f"✅ Fuzzy memory avoided {saved} of {runs['exact']['translator_calls']} translate calls "
+          f"(~{saved * args.latency:.1f}s of network time at {args.latency * 1000:.0f} ms per call)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+tts.py
+Pipelined text-to-speech: synthesis to PCM buffers ahead of playback.
+
+ - Synthesizer     : renders a phrase to float32 PCM with pyttsx3's
+                     save_to_file (no audio device involved), through a
+                     PhraseAudioCache so repeated phrases cost nothing. The
+                     file is read by its content: WAV (espeak, SAPI5) or
+                     AIFF (the macOS driver, whatever the extension), other
+                     formats through afconvert when it is installed
+ - PhraseAudioCache: bounded in-memory LRU + optional on-disk store of
+                     rendered phrases, keyed by (text, voice, rate)
+ - Player          : one long-lived output stream fed from a queue of
+                     buffers, so consecutive phrases play back to back
+
+While one phrase plays, the next ones are already being rendered, so a
+backlog no longer adds whole utterance durations to latency.
+"""
+
+import hashlib
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import wave
+from collections import OrderedDict
+
+import numpy as np
+
+
+def read_wav(path):
+    """Read a PCM WAV file into (mono float32, sample_rate)."""
+    with wave.open(path, "rb") as w:
+        sample_rate = w.getframerate()
+        width = w.getsampwidth()
+        channels = w.getnchannels()
+        raw = w.readframes(w.getnframes())
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+    audio = np.frombuffer(raw, dtype=dtype).astype(np.float32)
+    if width == 1:
+        audio = (audio - 128.0) / 128.0
+    else:
+        audio /= float(2 ** (8 * width - 1))
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio, sample_rate
+
+
+def read_aiff(path):
+    """Read an uncompressed AIFF / AIFF-C file into (mono float32, sample_rate)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    form = data[8:12]
+    if data[:4] != b"FORM" or form not in (b"AIFF", b"AIFC"):
+        raise ValueError(f"{path} is not an AIFF file")
+    chunks, pos = {}, 12
+    while pos + 8 <= len(data):
+        name, size = data[pos:pos + 4], struct.unpack(">I", data[pos + 4:pos + 8])[0]
+        chunks[name] = data[pos + 8:pos + 8 + size]
+        pos += 8 + size + (size & 1)           # chunks are padded to an even length
+    if b"COMM" not in chunks or b"SSND" not in chunks:
+        raise ValueError(f"{path}: AIFF file without COMM or SSND chunk")
+    comm, ssnd = chunks[b"COMM"], chunks[b"SSND"]
+    channels, frames, bits = struct.unpack(">hIh", comm[:8])
+    sample_rate = int(round(_extended(comm[8:18])))
+    compression = comm[18:22] if form == b"AIFC" else b"NONE"
+    width = (bits + 7) // 8
+    if compression in (b"fl32", b"FL32"):
+        dtype, width, scale = ">f4", 4, 1.0
+    elif compression in (b"NONE", b"twos", b"sowt") and width in (1, 2, 4):
+        order = "<" if compression == b"sowt" else ">"
+        dtype, scale = f"{order}i{width}", float(2 ** (8 * width - 1))
+    else:
+        raise ValueError(f"{path}: unsupported AIFF sample format ({bits} bits, {compression!r})")
+    offset = struct.unpack(">I", ssnd[:4])[0]
+    raw = ssnd[8 + offset:8 + offset + frames * channels * width]
+    audio = np.frombuffer(raw, dtype=dtype).astype(np.float32) / scale
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio, sample_rate
+
+
+def read_audio(path):
+    """read_wav() or read_aiff(), chosen by the file's header."""
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic == b"RIFF":
+        return read_wav(path)
+    if magic == b"FORM":
+        return read_aiff(path)
+    raise ValueError(f"{path}: neither WAV nor AIFF (header {magic!r})")
+
+
+def write_wav(path, audio, sample_rate):
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+
+
+def resample(audio, source_rate, target_rate):
+    if source_rate == target_rate or not len(audio):
+        return audio
+    n_out = int(round(len(audio) * target_rate / source_rate))
+    return np.interp(np.linspace(0, len(audio) - 1, n_out), np.arange(len(audio)), audio).astype(np.float32)
+
+
+def _extended(raw):
+    """80-bit IEEE extended float (AIFF sample rates)."""
+    exponent = int.from_bytes(raw[:2], "big") & 0x7FFF
+    mantissa = int.from_bytes(raw[2:10], "big")
+    return mantissa * 2.0 ** (exponent - 16383 - 63) if exponent or mantissa else 0.0
+
+
+class PhraseAudioCache:
+    """LRU of rendered phrases bounded by `max_bytes` in memory; with
+    `disk_dir`, phrases are also kept as WAV files (bounded by `max_disk_bytes`)
+    and survive restarts."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None, max_disk_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key(text, voice, rate):
+        return hashlib.sha1(f"{voice}\x00{rate}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry
+        path = self._path(key)
+        if path and os.path.exists(path):
+            entry = read_wav(path)
+            os.utime(path)       # keep recently used files on disk
+            self.disk_hits += 1
+            self._remember(key, entry)
+            return entry
+        self.misses += 1
+        return None
+
+    def put(self, key, audio, sample_rate):
+        self._remember(key, (audio, sample_rate))
+        path = self._path(key)
+        if path and not os.path.exists(path):
+            write_wav(path, audio, sample_rate)
+            self._trim_disk()
+
+    def stats(self):
+        return {"items": len(self._memory), "bytes": self._bytes, "hits": self.hits,
+                "disk_hits": self.disk_hits, "misses": self.misses}
+
+    # --- Internal helpers ---
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key + ".wav") if self.disk_dir else None
+
+    def _remember(self, key, entry):
+        with self._lock:
+            if key in self._memory:
+                return
+            self._memory[key] = entry
+            self._bytes += entry[0].nbytes
+            while self._bytes > self.max_bytes and len(self._memory) > 1:
+                _, (old, _) = self._memory.popitem(last=False)
+                self._bytes -= old.nbytes
+
+    def _trim_disk(self):
+        files = [os.path.join(self.disk_dir, f) for f in os.listdir(self.disk_dir) if f.endswith(".wav")]
+        stats = sorted(((os.stat(f).st_mtime, os.stat(f).st_size, f) for f in files))
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in stats:
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+class Synthesizer:
+    """Render text to (float32 PCM, sample_rate) without playing it.
+    Call from a single thread (pyttsx3 engines are not thread-safe)."""
+
+    def __init__(self, engine, cache=None):
+        self.engine = engine
+        self.cache = cache
+        self._tmp_dir = tempfile.mkdtemp(prefix="dunno-tts-")
+
+    def render(self, text):
+        key = None
+        if self.cache is not None:
+            key = PhraseAudioCache.key(text, self.engine.getProperty("voice"), self.engine.getProperty("rate"))
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        path = os.path.join(self._tmp_dir, "phrase.wav")
+        self.engine.save_to_file(text, path)
+        self.engine.runAndWait()
+        try:
+            audio, sample_rate = self._read(path)
+        finally:
+            os.remove(path)
+
+        if self.cache is not None:
+            self.cache.put(key, audio, sample_rate)
+        return audio, sample_rate
+
+    # --- Internal helpers ---
+    def _read(self, path):
+        try:
+            return read_audio(path)
+        except ValueError:
+            if shutil.which("afconvert") is None:
+                raise
+        # A format read_audio() does not know (e.g. compressed AIFF-C): let
+        # macOS convert it to 16-bit PCM WAV.
+        converted = path + ".pcm.wav"
+        subprocess.run(["afconvert", "-f", "WAVE", "-d", "LEI16", path, converted], check=True,
+                       capture_output=True)
+        try:
+            return read_wav(converted)
+        finally:
+            os.remove(converted)
+
+
+class Player:
+    """Gapless playback: a single output stream whose callback pulls the next
+    queued buffer as soon as the current one ends. play() blocks only when
+    `max_queued` phrases are already waiting (back-pressure)."""
+
+    def __init__(self, max_queued=8, blocksize=1024):
+        self.max_queued = max_queued
+        self.blocksize = blocksize
+        self.sample_rate = None
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._current = None
+        self._pos = 0
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stream = None
+        self.underruns = 0
+
+    def play(self, audio, sample_rate):
+        if self._stream is None:
+            self._open(sample_rate)
+        self._idle.clear()
+        self._queue.put(resample(audio, sample_rate, self.sample_rate))
+
+    def wait_idle(self, timeout=None):
+        return self._idle.wait(timeout)
+
+    def close(self):
+        if self._stream is not None:
+            self.wait_idle(timeout=30)
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    # --- Internal helpers ---
+    def _open(self, sample_rate):
+        import sounddevice as sd
+
+        self.sample_rate = sample_rate
+        self._stream = sd.OutputStream(samplerate=sample_rate, channels=1, dtype="float32",
+                                       blocksize=self.blocksize, callback=self._callback)
+        self._stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        if status:
+            self.underruns += 1
+        out = outdata[:, 0]
+        filled = 0
+        while filled < frames:
+            if self._current is None:
+                try:
+                    self._current = self._queue.get_nowait()
+                    self._pos = 0
+                except queue.Empty:
+                    out[filled:] = 0
+                    self._idle.set()
+                    return
+            n = min(frames - filled, len(self._current) - self._pos)
+            out[filled:filled + n] = self._current[self._pos:self._pos + n]
+            filled += n
+            self._pos += n
+            if self._pos >= len(self._current):
+                self._current = None
@@ -0,0 +1,182 @@
+"""
+vad.py
+Streaming voice-activity segmenter.
+
+Audio arrives in small blocks from the microphone callback. The segmenter
+cuts it into short frames, classifies all frames of a block at once with a
+vectorized energy + spectral-flatness test, and emits one Segment per
+utterance as soon as the speaker stops. Silent frames are dropped, so
+Whisper only ever sees speech.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+@dataclass
+class Segment:
+    """One utterance: `start` is the offset (in samples) of its first sample
+    in the stream, `audio` the mono float32 samples."""
+    start: int
+    audio: np.ndarray
+    sample_rate: int = SAMPLE_RATE
+
+    @property
+    def end(self):
+        return self.start + len(self.audio)
+
+    @property
+    def duration(self):
+        return len(self.audio) / self.sample_rate
+
+
+def frame_features(frames):
+    """Return (energy_db, spectral_flatness) for a 2-D array of frames.
+
+    Speech is loud and tonal (low flatness); background noise is either quiet
+    or spectrally flat, so the two features together are a cheap detector.
+    """
+    energy = np.mean(frames * frames, axis=1)
+    energy_db = 10.0 * np.log10(energy + 1e-10)
+
+    window = np.hanning(frames.shape[1]).astype(np.float32)
+    power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2 + 1e-10
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return energy_db, flatness
+
+
+class VadSegmenter:
+    """Turn a stream of audio blocks into utterance-bounded segments.
+
+    - frame_ms        : analysis frame length
+    - threshold_db    : how far above the tracked noise floor a frame must be
+    - max_flatness    : frames flatter than this are treated as noise
+    - hangover_ms     : silence tolerated inside an utterance before it ends
+    - pre_roll_ms     : audio kept before the first speech frame (soft onsets)
+    - min_segment_ms  : utterances with less speech than this (clicks, coughs)
+                        are discarded
+    - max_segment_ms  : long monologues are force-split at this length
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=30, threshold_db=12.0,
+                 max_flatness=0.5, hangover_ms=400, pre_roll_ms=150,
+                 min_segment_ms=300, max_segment_ms=15000, min_energy_db=-60.0):
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.max_flatness = max_flatness
+        self.min_energy_db = min_energy_db
+        self.hangover_frames = max(1, int(hangover_ms / frame_ms))
+        self.pre_roll_frames = int(pre_roll_ms / frame_ms)
+        self.min_frames = max(1, int(min_segment_ms / frame_ms))
+        self.max_frames = max(self.min_frames, int(max_segment_ms / frame_ms))
+
+        self.noise_floor_db = None
+        self._pending = np.zeros(0, dtype=np.float32)   # samples not yet framed
+        self._position = 0                               # stream offset of _pending[0]
+        self._pre_roll = []                              # recent silent frames
+        self._frames = []                                # frames of the open segment
+        self._start = None                               # stream offset of the open segment
+        self._silent_run = 0                             # trailing silent frames in segment
+        self._voiced = 0                                 # speech frames in segment
+
+    def set_max_segment(self, seconds):
+        """Change the force-split length; applies to the open segment too."""
+        frame_ms = 1000 * self.frame_len / self.sample_rate
+        self.max_frames = max(self.min_frames, int(seconds * 1000 / frame_ms))
+
+    @property
+    def in_speech(self):
+        return self._start is not None
+
+    def classify(self, frames):
+        """Vectorized speech/non-speech decision for a (n, frame_len) array."""
+        energy_db, flatness = frame_features(frames)
+        if self.noise_floor_db is None:
+            self.noise_floor_db = float(np.percentile(energy_db, 10))
+
+        speech = ((energy_db > self.noise_floor_db + self.threshold_db)
+                  & (energy_db > self.min_energy_db)
+                  & (flatness < self.max_flatness))
+
+        # Track the noise floor on non-speech frames only: fall fast, rise slowly.
+        quiet = energy_db[~speech]
+        if quiet.size:
+            level = float(np.median(quiet))
+            rate = 0.5 if level < self.noise_floor_db else 0.05
+            self.noise_floor_db += rate * (level - self.noise_floor_db)
+        return speech
+
+    def push(self, samples):
+        """Feed a block of samples; return the list of finished segments."""
+        # Copy: frames are kept across calls and the caller may reuse its buffer.
+        samples = np.array(samples, dtype=np.float32).reshape(-1)
+        if self._pending.size:
+            samples = np.concatenate([self._pending, samples])
+
+        n_frames = len(samples) // self.frame_len
+        used = n_frames * self.frame_len
+        self._pending = samples[used:].copy()
+        if n_frames == 0:
+            return []
+
+        frames = samples[:used].reshape(n_frames, self.frame_len)
+        speech = self.classify(frames)
+
+        segments = []
+        base = self._position
+        for i in range(n_frames):
+            offset = base + i * self.frame_len
+            segment = self._step(frames[i], bool(speech[i]), offset)
+            if segment is not None:
+                segments.append(segment)
+        self._position = base + used
+        return segments
+
+    def flush(self):
+        """End of stream: close the open utterance, if any."""
+        self._pending = np.zeros(0, dtype=np.float32)
+        return self._close()
+
+    # --- Internal state machine (one step per frame) ---
+    def _step(self, frame, is_speech, offset):
+        if self._start is None:
+            if not is_speech:
+                self._pre_roll.append(frame)
+                if len(self._pre_roll) > self.pre_roll_frames:
+                    self._pre_roll.pop(0)
+                return None
+            self._start = offset - len(self._pre_roll) * self.frame_len
+            self._frames = self._pre_roll + [frame]
+            self._pre_roll = []
+            self._silent_run = 0
+            self._voiced = 1
+            return None
+
+        self._frames.append(frame)
+        self._silent_run = 0 if is_speech else self._silent_run + 1
+        self._voiced += is_speech
+        if self._silent_run >= self.hangover_frames or len(self._frames) >= self.max_frames:
+            return self._close()
+        return None
+
+    def _close(self):
+        if self._start is None:
+            return None
+        # Trim trailing silence beyond a short tail (keep ~half the hangover).
+        keep_tail = self.hangover_frames // 2
+        frames = self._frames
+        if self._silent_run > keep_tail:
+            frames = frames[:len(frames) - (self._silent_run - keep_tail)]
+        voiced = self._voiced
+        start = self._start
+        self._start = None
+        self._frames = []
+        self._silent_run = 0
+        self._voiced = 0
+        if voiced < self.min_frames:
+            return None
+        return Segment(start=start, audio=np.concatenate(frames), sample_rate=self.sample_rate)
@@ -0,0 +1,338 @@
+#archive.py
+
+"""Move old messages, with their translations and speech data, out of dunno.db.
+
+Messages created before a cutoff are moved into one SQLite database per
+month (archive/dunno-YYYY-MM.db, ATTACHed while it is written), together
+with the translations and speech_data rows that belong to them, in batches
+of `batch_size` messages, so the live writers only ever wait for one small
+batch. A commit spanning the main and an attached WAL database is not
+atomic, so each batch is copied and committed in the archive first, checked
+row by row against the main database, and only then deleted from it in a
+second transaction. An interrupted run resumes where it stopped: rows
+already copied are verified instead of copied again.
+
+SQLite hands the highest id out again once it is deleted, so the message
+holding the highest id of messages, translations or speech_data is never
+archived; an id in the archive is never reused in the main database.
+
+`archive_index` stays in the main database: one row per archived message
+(id, month, group, owner, created_at). get_message() and group_history()
+use it to read archived rows transparently, attaching the right month on
+demand.
+
+Deleted rows become free pages inside dunno.db; the report shows them, and
+--vacuum (a full rewrite, long exclusive lock) or incremental auto_vacuum
+gives them back to the file system. Translation-cache rows (no message) stay
+in the main database, and audio files are not moved.
+
+    python archive.py run --db dunno.db --older-than-days 180 [--batch 500] [--vacuum]
+    python archive.py get --db dunno.db 1234
+"""
+
+import argparse
+import datetime
+import os
+import time
+
+from sqlalchemy import text
+
+ARCHIVE_DIR = "archive"
+TABLES = (("translations", "message_id"), ("speech_data", "message_id"), ("messages", "id"))
+
+
+def ensure_index(conn):
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS archive_index ("
+        "message_id INTEGER PRIMARY KEY, month TEXT NOT NULL, group_id INTEGER, owner_id INTEGER, "
+        "created_at DATETIME)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_archive_group_created ON archive_index (group_id, created_at)"
+    )
+
+
+class Archiver:
+    def __init__(self, engine, archive_dir=None, batch_size=500, pause=0.05):
+        self.engine = engine
+        database = engine.url.database
+        self.archive_dir = archive_dir or os.path.join(os.path.dirname(os.path.abspath(database)), ARCHIVE_DIR)
+        self.batch_size = batch_size
+        self.pause = pause                  # seconds between batches: lets the live writers in
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+    def month_path(self, month):
+        return os.path.join(self.archive_dir, f"dunno-{month}.db")
+
+    # --- Archiving ---
+    def run(self, cutoff, vacuum=False):
+        """Archive every message created before `cutoff` (a datetime); returns
+        a report with the rows moved and the space freed."""
+        started = time.perf_counter()
+        before = self.space()
+        moved = {table: 0 for table, _ in TABLES}
+        months = set()
+        with self.engine.connect() as conn:
+            ensure_index(conn)
+            conn.commit()
+        while True:
+            with self.engine.connect() as conn:
+                month = conn.execute(text(
+                    "SELECT strftime('%Y-%m', MIN(created_at)) FROM messages "
+                    f"WHERE created_at < :cutoff AND id NOT IN ({_pinned(conn)})"
+                ), {"cutoff": _timestamp(cutoff)}).scalar()
+            if month is None:
+                break
+            months.add(month)
+            counts = self._archive_month(month, cutoff)
+            for table, n in counts.items():
+                moved[table] += n
+        if vacuum:
+            with self.engine.connect() as conn:
+                conn.exec_driver_sql("VACUUM")
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        after = self.space()
+        return {
+            "moved": moved,
+            "months": sorted(months),
+            "seconds": round(time.perf_counter() - started, 1),
+            "file_bytes_before": before["file_bytes"],
+            "file_bytes_after": after["file_bytes"],
+            "free_bytes": after["free_bytes"],      # reusable pages; returned to the OS by VACUUM
+            "reclaimed_bytes": before["used_bytes"] - after["used_bytes"],
+        }
+
+    def _archive_month(self, month, cutoff):
+        counts = {table: 0 for table, _ in TABLES}
+        synced = False
+        while True:
+            # One connection per batch: with the production profile it is the
+            # only write connection, and the live writers get it in between.
+            with self.engine.connect() as conn:
+                schema = self._attach(conn, month)
+                try:
+                    if not synced:
+                        for table, _ in TABLES:
+                            self._sync_table(conn, schema, table)
+                        conn.commit()
+                        synced = True
+                    batch = self._archive_batch(conn, schema, month, cutoff)
+                finally:
+                    self._detach(conn, schema)
+            if batch is None:
+                break
+            for table, n in batch.items():
+                counts[table] += n
+            if self.pause:
+                time.sleep(self.pause)
+        print(f"📦 {month}: {counts['messages']} messages, {counts['translations']} translations, "
+              f"{counts['speech_data']} speech rows archived")
+        return counts
+
+    def _archive_batch(self, conn, schema, month, cutoff):
+        """Move the oldest `batch_size` messages of `month`; returns
+        {table: rows moved}, or None when done."""
+        ids = conn.execute(text(
+            "SELECT id FROM messages WHERE created_at < :cutoff AND strftime('%Y-%m', created_at) = :month "
+            f"AND id NOT IN ({_pinned(conn)}) ORDER BY created_at, id LIMIT :n"
+        ), {"cutoff": _timestamp(cutoff), "month": month, "n": self.batch_size}).scalars().all()
+        conn.commit()
+        if not ids:
+            return None
+        marks = ",".join(str(int(i)) for i in ids)
+
+        # 1. Copy into the archive (rows left there by an interrupted run are
+        #    kept) and commit there.
+        with conn.begin():
+            for table, key in TABLES:
+                columns = ", ".join(self._columns(conn, "main", table))
+                conn.exec_driver_sql(
+                    f"INSERT INTO {schema}.{table} ({columns}) SELECT {columns} FROM main.{table} "
+                    f"WHERE {key} IN ({marks}) AND id NOT IN (SELECT id FROM {schema}.{table})"
+                )
+
+        # 2. Every row about to be deleted must be in the archive, identical.
+        expected = {}
+        for table, key in TABLES:
+            same = " AND ".join(f"a.{c} IS m.{c}" for c in self._columns(conn, "main", table))
+            live = conn.exec_driver_sql(f"SELECT COUNT(*) FROM main.{table} WHERE {key} IN ({marks})").scalar()
+            copied = conn.exec_driver_sql(
+                f"SELECT COUNT(*) FROM main.{table} m JOIN {schema}.{table} a ON a.id = m.id AND {same} "
+                f"WHERE m.{key} IN ({marks})").scalar()
+            if copied != live:
+                conn.rollback()
+                raise RuntimeError(f"{table}: {live - copied} row(s) of messages {ids[0]}..{ids[-1]} differ from "
+                                   f"the copy in {self.month_path(month)}; nothing was deleted")
+            expected[table] = live
+        conn.commit()
+
+        # 3. Delete from the main database, with the lookup rows, in one
+        #    main-only transaction.
+        with conn.begin():
+            conn.exec_driver_sql(
+                "INSERT INTO archive_index (message_id, month, group_id, owner_id, created_at) "
+                f"SELECT id, '{month}', group_id, owner_id, created_at FROM messages WHERE id IN ({marks})"
+            )
+            counts = {}
+            for table, key in TABLES:
+                counts[table] = conn.exec_driver_sql(
+                    f"DELETE FROM main.{table} WHERE {key} IN ({marks})").rowcount
+                if counts[table] != expected[table]:
+                    raise RuntimeError(f"{table}: deleted {counts[table]} rows, verified {expected[table]}")
+        return counts
+
+    def _sync_table(self, conn, schema, table):
+        """Create the archive table from the main one (no foreign keys: users
+        and groups stay in the main database), or add columns added since."""
+        exists = conn.exec_driver_sql(
+            f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (table,)).scalar()
+        if not exists:
+            conn.exec_driver_sql(f"CREATE TABLE {schema}.{table} AS SELECT * FROM main.{table} WHERE 0")
+            conn.exec_driver_sql(f"CREATE UNIQUE INDEX {schema}.ux_{table}_id ON {table} (id)")
+            if table == "messages":
+                conn.exec_driver_sql(f"CREATE INDEX {schema}.ix_messages_group_created "
+                                     "ON messages (group_id, created_at)")
+            else:
+                conn.exec_driver_sql(f"CREATE INDEX {schema}.ix_{table}_message ON {table} (message_id)")
+            return
+        archived = set(self._columns(conn, schema, table))
+        for column in self._columns(conn, "main", table):
+            if column not in archived:
+                conn.exec_driver_sql(f"ALTER TABLE {schema}.{table} ADD COLUMN {column}")
+
+    @staticmethod
+    def _columns(conn, schema, table):
+        return [row[1] for row in conn.exec_driver_sql(f"PRAGMA {schema}.table_info({table})")]
+
+    def space(self):
+        with self.engine.connect() as conn:
+            page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+            pages = conn.exec_driver_sql("PRAGMA page_count").scalar()
+            free = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        # With WAL most recent writes sit in the -wal file until a checkpoint;
+        # both count as space on disk.
+        database = self.engine.url.database
+        files = [path for path in (database, database + "-wal") if os.path.exists(path)]
+        return {"file_bytes": sum(os.path.getsize(path) for path in files),
+                "used_bytes": (pages - free) * page_size, "free_bytes": free * page_size}
+
+    # --- Reading ---
+    def get_message(self, message_id):
+        """Message row (dict) with its translations, live or archived; None
+        if unknown."""
+        with self.engine.connect() as conn:
+            message = self._read_message(conn, "main", message_id)
+            if message is not None:
+                return message
+            month = conn.execute(text("SELECT month FROM archive_index WHERE message_id = :id"),
+                                 {"id": message_id}).scalar()
+            if month is None:
+                return None
+            schema = self._attach(conn, month)
+            try:
+                return self._read_message(conn, schema, message_id)
+            finally:
+                self._detach(conn, schema)
+
+    def group_history(self, group_id, before=None, limit=50):
+        """Latest `limit` messages of a group created before `before` (dicts,
+        newest first), continuing into the archives when the live table runs
+        out."""
+        before = _timestamp(before or datetime.datetime.max)
+        with self.engine.connect() as conn:
+            rows = self._read_group(conn, "main", group_id, before, limit)
+            if len(rows) < limit:
+                months = conn.execute(text(
+                    "SELECT DISTINCT month FROM archive_index WHERE group_id = :g AND created_at < :before "
+                    "ORDER BY month DESC"), {"g": group_id, "before": before}).scalars().all()
+                for month in months:
+                    schema = self._attach(conn, month)
+                    try:
+                        rows += self._read_group(conn, schema, group_id, before, limit - len(rows))
+                    finally:
+                        self._detach(conn, schema)
+                    if len(rows) >= limit:
+                        break
+        return rows
+
+    def _read_message(self, conn, schema, message_id):
+        row = conn.execute(text(f"SELECT * FROM {schema}.messages WHERE id = :id"), {"id": message_id}).mappings().first()
+        if row is None:
+            return None
+        message = dict(row)
+        message["translations"] = [dict(t) for t in conn.execute(text(
+            f"SELECT target_lang, translated_text FROM {schema}.translations WHERE message_id = :id"),
+            {"id": message_id}).mappings()]
+        message["archived"] = schema != "main"
+        return message
+
+    def _read_group(self, conn, schema, group_id, before, limit):
+        rows = conn.execute(text(
+            f"SELECT * FROM {schema}.messages WHERE group_id = :g AND created_at < :before "
+            "ORDER BY created_at DESC, id DESC LIMIT :n"), {"g": group_id, "before": before, "n": limit}).mappings()
+        return [dict(r, archived=schema != "main") for r in rows]
+
+    def _attach(self, conn, month):
+        # ATTACH / DETACH cannot run inside a transaction.
+        schema = "arch_" + month.replace("-", "_")
+        conn.commit()
+        conn.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (self.month_path(month),))
+        conn.commit()
+        return schema
+
+    def _detach(self, conn, schema):
+        conn.rollback()
+        conn.exec_driver_sql(f"DETACH DATABASE {schema}")
+        conn.commit()
+
+
+def _pinned(conn):
+    """SQL list of the messages that must stay: the one with the highest id,
+    and the owners of the highest translation and speech_data ids."""
+    ids = conn.exec_driver_sql(
+        "SELECT MAX(id) FROM messages UNION "
+        "SELECT message_id FROM translations WHERE id = (SELECT MAX(id) FROM translations) UNION "
+        "SELECT message_id FROM speech_data WHERE id = (SELECT MAX(id) FROM speech_data)"
+    ).scalars().all()
+    return ",".join(str(int(i)) for i in ids if i is not None) or "NULL"
+
+
+def _timestamp(value):
+    """Datetime as stored by SQLAlchemy's SQLite DateTime (string comparisons)."""
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def main():
+    from db import make_engine
+
+    parser = argparse.ArgumentParser(description="Archive old messages into per-month databases.")
+    parser.add_argument("--db", default="dunno.db")
+    parser.add_argument("--archive-dir", help="default: archive/ next to the database")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="move old messages to the monthly archives")
+    cutoff = run_parser.add_mutually_exclusive_group(required=True)
+    cutoff.add_argument("--before", type=datetime.datetime.fromisoformat, help="e.g. 2026-01-01")
+    cutoff.add_argument("--older-than-days", type=int)
+    run_parser.add_argument("--batch", type=int, default=500, help="messages per transaction")
+    run_parser.add_argument("--pause", type=float, default=0.05, help="seconds between batches")
+    run_parser.add_argument("--vacuum", action="store_true", help="give the freed pages back (exclusive lock)")
+    get_parser = sub.add_parser("get", help="print a message, live or archived")
+    get_parser.add_argument("message_id", type=int)
+    args = parser.parse_args()
+
+    engine = make_engine(f"sqlite:///{args.db}", "production")
+    archiver = Archiver(engine, args.archive_dir, batch_size=getattr(args, "batch", 500),
+                        pause=getattr(args, "pause", 0.05))
+    if args.command == "run":
+        cutoff = args.before or datetime.datetime.utcnow() - datetime.timedelta(days=args.older_than_days)
+        report = archiver.run(cutoff, vacuum=args.vacuum)
+        print("📊 Archive:", report)
+        print(f"✅ Reclaimed {report['reclaimed_bytes'] / 1e6:.1f} MB in {args.db} "
+              f"({report['file_bytes_before'] / 1e6:.1f} -> {report['file_bytes_after'] / 1e6:.1f} MB on disk)")
+    else:
+        print(archiver.get_message(args.message_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#bench_db.py
+
+"""Insert / read throughput of the SQLite engine profiles under concurrency.
+
+For each profile, a fresh database gets N writer threads inserting messages
+one per transaction (like per-utterance commits) and M reader threads
+fetching a user's latest messages, for a fixed duration. Run from backend/app:
+
+    python bench_db.py --writers 4 --readers 4 --seconds 10
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import OperationalError
+
+from db import PROFILES, make_engine
+from models.base import Base
+from models.message import Message
+from models.user import User
+
+N_USERS = 20
+
+
+def run_profile(profile, writers, readers, seconds, seed_rows):
+    directory = tempfile.mkdtemp(prefix="dunno-bench-")
+    try:
+        return _run_profile(os.path.join(directory, "bench.db"), profile, writers, readers, seconds, seed_rows)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _run_profile(path, profile, writers, readers, seconds, seed_rows):
+    url = f"sqlite:///{path}"
+    write_engine = make_engine(url, profile, role="write")
+    read_engine = make_engine(url, profile, role="read")
+    write_engine.echo = read_engine.echo = False      # measure the database, not the logging
+
+    Base.metadata.create_all(bind=write_engine)
+    with write_engine.begin() as conn:
+        conn.execute(insert(User), [{"username": f"user{i}", "email": f"user{i}@example.com"}
+                                    for i in range(1, N_USERS + 1)])
+        conn.execute(insert(Message), [{"content": f"seed message {i}", "owner_id": 1 + i % N_USERS}
+                                       for i in range(seed_rows)])
+    with write_engine.connect() as conn:
+        effective = {name: conn.execute(text(f"PRAGMA {name}")).scalar()
+                     for name in ("journal_mode", "synchronous", "cache_size", "mmap_size", "busy_timeout")}
+
+    stop = threading.Event()
+    counts = {"inserts": 0, "reads": 0, "rows_read": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def bump_rows(n):
+        with lock:
+            counts["rows_read"] += n
+
+    def writer(n):
+        rng = random.Random(n)
+        while not stop.is_set():
+            try:
+                with write_engine.begin() as conn:
+                    conn.execute(insert(Message).values(content=f"utterance from writer {n}",
+                                                        owner_id=rng.randint(1, N_USERS)))
+                bump("inserts")
+            except OperationalError:
+                bump("errors")
+
+    def reader(n):
+        rng = random.Random(1000 + n)
+        while not stop.is_set():
+            query = (select(Message.id, Message.content).where(Message.owner_id == rng.randint(1, N_USERS))
+                     .order_by(Message.created_at.desc()).limit(50))
+            try:
+                with read_engine.connect() as conn:
+                    rows = conn.execute(query).all()
+                bump("reads")
+                bump_rows(len(rows))
+            except OperationalError:
+                bump("errors")
+
+    threads = ([threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+               + [threading.Thread(target=reader, args=(i,)) for i in range(readers)])
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    with read_engine.connect() as conn:
+        total = conn.execute(select(func.count()).select_from(Message)).scalar()
+    write_engine.dispose()
+    read_engine.dispose()
+    return {
+        "profile": profile,
+        "pragmas": effective,
+        "inserts_per_s": counts["inserts"] / elapsed,
+        "reads_per_s": counts["reads"] / elapsed,
+        "rows_per_read": counts["rows_read"] / max(counts["reads"], 1),
+        "errors": counts["errors"],
+        "rows": total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite engine profiles of db.py.")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--seed-rows", type=int, default=20000, help="messages inserted before the run")
+    args = parser.parse_args()
+
+    results = [run_profile(p, args.writers, args.readers, args.seconds, args.seed_rows) for p in args.profiles]
+    for r in results:
+        print(f"{r['profile']:>12}: {r['inserts_per_s']:8.0f} inserts/s  {r['reads_per_s']:8.0f} reads/s  "
+              f"({r['rows_per_read']:.0f} rows each)  {r['errors']} errors  pragmas {r['pragmas']}")
+    if len(results) > 1:
+        base, best = results[0], results[-1]
+        print(f"{best['profile']} vs {base['profile']}: "
+              f"inserts x{best['inserts_per_s'] / max(base['inserts_per_s'], 1e-9):.1f}, "
+              f"reads x{best['reads_per_s'] / max(base['reads_per_s'], 1e-9):.1f}")
+
+
+if __name__ == "__main__":
+    main()
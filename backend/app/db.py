@@ -1,25 +1,74 @@
 #db.py
 
-from sqlalchemy import create_engine, event
+import os
+
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker
-from models.base import Base 
+from models.base import Base
+
+DATABASE_URL = os.environ.get("DUNNO_DATABASE_URL", "sqlite:///dunno.db")
+# "development" (SQL echo, default SQLite settings) or "production"
+DB_PROFILE = os.environ.get("DUNNO_DB_PROFILE", "development")
+
+# Engine profiles. Pragmas are applied to every new SQLite connection.
+PROFILES = {
+    "development": {
+        "echo": True,
+        "pragmas": {"foreign_keys": "ON"},
+        "write_pool": {},                   # SQLAlchemy defaults
+        "read_pool": {},
+    },
+    "production": {
+        "echo": False,
+        "pragmas": {
+            "foreign_keys": "ON",
+            "journal_mode": "WAL",          # readers never block the writer (and vice versa)
+            "synchronous": "NORMAL",        # fsync at checkpoints only; safe with WAL
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,       # negative = KiB, i.e. 64 MiB page cache
+            "busy_timeout": 5000,           # ms to wait for a lock instead of failing
+            "temp_store": "MEMORY",
+        },
+        # SQLite has one writer at a time: writing threads queue for the single
+        # connection instead of failing with "database is locked".
+        "write_pool": {"pool_size": 1, "max_overflow": 0, "pool_timeout": 30},
+        "read_pool": {"pool_size": 8, "max_overflow": 8},
+    },
+}
+
+
+def make_engine(url=DATABASE_URL, profile=DB_PROFILE, role="write"):
+    """Engine for `profile` and `role`: "write" (the default, used for
+    everything in development) or "read" (query-only connections)."""
+    settings = PROFILES[profile]
+    pool = settings["write_pool"] if role == "write" else settings["read_pool"]
+    engine = create_engine(
+        url,
+        echo=settings["echo"],
+        connect_args={"check_same_thread": False},  # nécessaire pour SQLite
+        **(pool if url.startswith("sqlite:///") and url != "sqlite:///:memory:" else {}),
+    )
+    pragmas = dict(settings["pragmas"])
+    if role == "read":
+        pragmas["query_only"] = "ON"
 
-DATABASE_URL = "sqlite:///dunno.db"
+    # Active les clés étrangères (et les autres pragmas du profil) dans SQLite
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,
-    connect_args={"check_same_thread": False}  # nécessaire pour SQLite
-)
+    return engine
 
-# Active les clés étrangères dans SQLite
-@event.listens_for(engine, "connect")
-def enable_foreign_keys(dbapi_connection, connection_record):
-    cursor = dbapi_connection.cursor()
-    cursor.execute("PRAGMA foreign_keys=ON")
-    cursor.close()
+
+engine = make_engine()
+read_engine = make_engine(role="read") if DB_PROFILE == "production" else engine
 
 SessionLocal = sessionmaker(bind=engine)
+# Sessions for read-only request paths (feeds, search); same engine in development.
+ReadSessionLocal = sessionmaker(bind=read_engine)
 
 
 def init_db():
@@ -27,7 +76,30 @@ def init_db():
 
     This keeps table creation explicit (not automatic on import).
     """
-    from models.base import Base
+    upgrade_schema(engine)
 
-    Base.metadata.create_all(bind=engine)
 
+# Columns and indexes added after the first release: (table, column, DDL type).
+ADDED_COLUMNS = [
+    ("translations", "source_hash", "VARCHAR(64)"),
+    ("speech_data", "sample_rate", "INTEGER"),
+]
+ADDED_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_translation_hash_target ON translations (source_hash, target_lang, source_lang)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_group_created ON messages (group_id, created_at)",
+]
+
+
+def upgrade_schema(engine):
+    """Create the tables, and add the columns and indexes added since to
+    databases created before them (create_all does not alter existing tables).
+    Idempotent; every standalone process that writes calls it on start."""
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+    missing = [(table, column, ddl_type) for table, column, ddl_type in ADDED_COLUMNS
+               if column not in {c["name"] for c in inspector.get_columns(table)}]
+    with engine.begin() as conn:
+        for table, column, ddl_type in missing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+        for statement in ADDED_INDEXES:
+            conn.execute(text(statement))
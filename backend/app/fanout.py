@@ -0,0 +1,344 @@
+#fanout.py
+
+"""Translate group messages once per target language of the group's members.
+
+MembershipIndex keeps, for every group, the members who want translations
+(`translate_enabled`) grouped by their `preferred_language`:
+
+    {group_id: {"fr": {3, 7}, "es": {12}}}
+
+It is loaded with two queries and then kept current by Session events: the
+membership changes (User.groups / Group.members) and the preference changes
+flushed by a session are kept with the transaction that flushed them and
+applied when the outermost transaction commits. A released SAVEPOINT hands
+its changes to the enclosing transaction, a rolled back one drops only its
+own, and a rollback of the outermost transaction drops them all. Core
+statements that bypass the ORM (e.g. insert(user_groups)) are not seen:
+call add_member()/remove_member()/set_preferences() or reload().
+
+FanoutPlanner uses it to translate a batch of messages with one translator
+call per (target language, source language) and to bulk-insert one
+Translation row per message and language, so the cost depends on the
+number of languages in the group, not on the number of members.
+
+    index = MembershipIndex()
+    index.load(session)
+    index.listen(SessionLocal)
+    planner = FanoutPlanner(index, translator, engine)
+    planner.fanout([message_id, ...])
+"""
+
+import argparse
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import event, insert, inspect, select
+from sqlalchemy.orm import sessionmaker
+
+from models.group import Group
+from models.membership import user_groups
+from models.message import Message
+from models.translation import Translation
+from models.user import User
+
+AUTO = "auto"
+
+
+class MembershipIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups = defaultdict(lambda: defaultdict(set))   # group -> language -> member ids
+        self._members = defaultdict(set)                        # group -> member ids
+        self._user_groups = defaultdict(set)                    # user -> group ids
+        self._prefs = {}                                        # user -> (language, translate_enabled)
+
+    # --- Loading ---
+    def load(self, session):
+        """(Re)build the index from the database (memberships, then preferences)."""
+        rows = session.execute(
+            select(user_groups.c.group_id, User.id, User.preferred_language, User.translate_enabled)
+            .join(User, User.id == user_groups.c.user_id)
+        ).all()
+        prefs = session.execute(select(User.id, User.preferred_language, User.translate_enabled)).all()
+        with self._lock:
+            self._groups.clear()
+            self._members.clear()
+            self._user_groups.clear()
+            self._prefs = {user_id: (language, bool(enabled)) for user_id, language, enabled in prefs}
+            for group_id, user_id, _, _ in rows:
+                self._add_member(group_id, user_id)
+
+    reload = load
+
+    # --- Lookups ---
+    def targets(self, group_id, exclude_language=None):
+        """{language: frozenset(member ids)} of the members of `group_id` who
+        want translations, without `exclude_language` (the message's own)."""
+        with self._lock:
+            languages = self._groups.get(group_id, {})
+            return {language: frozenset(members) for language, members in languages.items()
+                    if members and language != exclude_language}
+
+    def languages(self, group_id):
+        return set(self.targets(group_id))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "groups": len(self._members),
+                "memberships": sum(len(m) for m in self._members.values()),
+                "users": len(self._prefs),
+                "group_languages": sum(len([l for l, m in g.items() if m]) for g in self._groups.values()),
+            }
+
+    # --- Updates ---
+    def add_member(self, group_id, user_id):
+        with self._lock:
+            self._add_member(group_id, user_id)
+
+    def remove_member(self, group_id, user_id):
+        with self._lock:
+            self._remove_member(group_id, user_id)
+
+    def set_preferences(self, user_id, language, translate_enabled):
+        with self._lock:
+            self._set_preferences(user_id, language, translate_enabled)
+
+    def remove_user(self, user_id):
+        with self._lock:
+            for group_id in list(self._user_groups.get(user_id, ())):
+                self._remove_member(group_id, user_id)
+            self._prefs.pop(user_id, None)
+            self._user_groups.pop(user_id, None)
+
+    def remove_group(self, group_id):
+        with self._lock:
+            for user_id in list(self._members.get(group_id, ())):
+                self._remove_member(group_id, user_id)
+            self._groups.pop(group_id, None)
+            self._members.pop(group_id, None)
+
+    # --- Session events ---
+    def listen(self, target):
+        """Follow the ORM changes committed through `target` (a sessionmaker,
+        Session class or Session)."""
+        event.listen(target, "after_flush", self._collect)
+        event.listen(target, "after_commit", self._apply)
+        event.listen(target, "after_rollback", self._discard)
+        event.listen(target, "after_transaction_end", self._merge)
+
+    @staticmethod
+    def _owner(session):
+        """The transaction changes flushed now belong to: the innermost
+        SAVEPOINT, else the session's outermost transaction."""
+        return session.get_nested_transaction() or session.get_transaction()
+
+    def _collect(self, session, flush_context):
+        pending = session.info.setdefault("membership_changes", {})     # transaction -> [change]
+        changes = pending.setdefault(self._owner(session), [])
+        for obj in session.new | session.dirty:
+            state = inspect(obj)
+            if isinstance(obj, User):
+                attrs = state.attrs
+                if obj in session.new or attrs.preferred_language.history.has_changes() \
+                        or attrs.translate_enabled.history.has_changes():
+                    changes.append(("prefs", obj.id, obj.preferred_language, obj.translate_enabled))
+                history = attrs.groups.history
+                changes += [("add", g.id, obj.id) for g in history.added]
+                changes += [("remove", g.id, obj.id) for g in history.deleted]
+            elif isinstance(obj, Group):
+                history = state.attrs.members.history
+                changes += [("add", obj.id, u.id) for u in history.added]
+                changes += [("remove", obj.id, u.id) for u in history.deleted]
+        for obj in session.deleted:
+            if isinstance(obj, User):
+                changes.append(("remove_user", obj.id))
+            elif isinstance(obj, Group):
+                changes.append(("remove_group", obj.id))
+
+    def _apply(self, session):
+        if self._owner(session).nested:
+            return                      # released SAVEPOINT: _merge() passes its changes on
+        pending = session.info.pop("membership_changes", {})
+        for change in [c for changes in pending.values() for c in changes]:
+            kind, args = change[0], change[1:]
+            if kind == "prefs":
+                self.set_preferences(*args)
+            elif kind == "add":
+                self.add_member(*args)
+            elif kind == "remove":
+                self.remove_member(*args)
+            elif kind == "remove_user":
+                self.remove_user(*args)
+            else:
+                self.remove_group(*args)
+
+    def _discard(self, session):
+        owner = self._owner(session)
+        if owner.nested:
+            session.info.get("membership_changes", {}).pop(owner, None)
+        else:
+            session.info.pop("membership_changes", None)
+
+    def _merge(self, session, transaction):
+        """A SAVEPOINT ended without being rolled back: its changes now belong
+        to the enclosing SAVEPOINT or outermost transaction."""
+        pending = session.info.get("membership_changes")
+        if not transaction.nested or not pending or transaction not in pending:
+            return
+        parent = transaction.parent
+        while parent.parent is not None and not parent.nested:
+            parent = parent.parent
+        pending.setdefault(parent, []).extend(pending.pop(transaction))
+
+    # --- Internal helpers (lock held) ---
+    def _add_member(self, group_id, user_id):
+        self._members[group_id].add(user_id)
+        self._user_groups[user_id].add(group_id)
+        language, enabled = self._prefs.get(user_id, ("en", False))
+        if enabled and language:
+            self._groups[group_id][language].add(user_id)
+
+    def _remove_member(self, group_id, user_id):
+        self._members.get(group_id, set()).discard(user_id)
+        self._user_groups.get(user_id, set()).discard(group_id)
+        language, _ = self._prefs.get(user_id, (None, False))
+        if group_id in self._groups and language in self._groups[group_id]:
+            self._groups[group_id][language].discard(user_id)
+
+    def _set_preferences(self, user_id, language, enabled):
+        old_language, old_enabled = self._prefs.get(user_id, (None, False))
+        self._prefs[user_id] = (language, bool(enabled))
+        for group_id in self._user_groups.get(user_id, ()):
+            if old_enabled and old_language:
+                self._groups[group_id][old_language].discard(user_id)
+            if enabled and language:
+                self._groups[group_id][language].add(user_id)
+
+
+class FanoutPlanner:
+    """`translator`: googletrans-like, translate([texts], dest=, src=) ->
+    [result with .text]."""
+
+    def __init__(self, index, translator, engine):
+        self.index = index
+        self.translator = translator
+        self.engine = engine
+        self.messages = 0
+        self.translator_calls = 0
+        self.rows = 0
+        self.deliveries = 0       # (message, member) pairs translated for
+
+    def plan(self, messages, existing=()):
+        """{(target, source): [message row]} for message rows (id, group_id,
+        content, language), without the (message id, target) pairs in
+        `existing` (translations already stored)."""
+        plan = defaultdict(list)
+        for message in messages:
+            source = message.language or AUTO
+            for language, members in self.index.targets(message.group_id, message.language).items():
+                if (message.id, language) in existing:
+                    continue
+                plan[(language, source)].append(message)
+                self.deliveries += len(members)
+        return plan
+
+    def fanout(self, message_ids):
+        """Translate and store the messages `message_ids` for their groups;
+        returns {message_id: {language: translated text}}."""
+        with self.engine.connect() as conn:
+            messages = conn.execute(
+                select(Message.id, Message.group_id, Message.content, Message.language)
+                .where(Message.id.in_(message_ids), Message.group_id.is_not(None))
+            ).all()
+            existing = set(conn.execute(
+                select(Translation.message_id, Translation.target_lang)
+                .where(Translation.message_id.in_(message_ids))
+            ).all())
+        self.messages += len(messages)
+
+        results = defaultdict(dict)
+        rows = []
+        for (target, source), batch in self.plan(messages, existing).items():
+            self.translator_calls += 1
+            translated = self.translator.translate([m.content for m in batch], dest=target, src=source)
+            for message, result in zip(batch, translated):
+                results[message.id][target] = result.text
+                rows.append({"message_id": message.id, "source_lang": getattr(result, "src", None) or source,
+                             "target_lang": target, "original_text": message.content,
+                             "translated_text": result.text})
+        if rows:
+            with self.engine.begin() as conn:
+                conn.execute(insert(Translation).prefix_with("OR IGNORE", dialect="sqlite"), rows)
+                conn.execute(Message.__table__.update().where(Message.id.in_(list(results)))
+                             .values(is_translated=True))
+            self.rows += len(rows)
+        return dict(results)
+
+    def stats(self):
+        return {"messages": self.messages, "translator_calls": self.translator_calls,
+                "rows": self.rows, "deliveries": self.deliveries}
+
+
+# --- Demo: per-member resolution vs the planner ---
+class _CountingTranslator:
+    def __init__(self):
+        self.calls = 0
+        self.texts = 0
+
+    def translate(self, texts, dest="en", src=AUTO):
+        self.calls += 1
+        self.texts += len(texts)
+        return [type("Translated", (), {"text": f"[{dest}] {t}", "src": src})() for t in texts]
+
+
+def main():
+    from db import make_engine
+    from models.base import Base
+
+    parser = argparse.ArgumentParser(description="Compare per-member translation with the fan-out planner.")
+    parser.add_argument("--members", type=int, default=500)
+    parser.add_argument("--languages", type=int, default=5)
+    parser.add_argument("--messages", type=int, default=200)
+    args = parser.parse_args()
+
+    languages = ["fr", "es", "de", "hi", "it", "pt", "ja", "ar"][:args.languages]
+    results = {}
+    for approach in ("per-member", "planner"):
+        engine = make_engine("sqlite:///:memory:", "production")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as session:
+            group = Group(name="demo")
+            group.members = [User(username=f"u{i}", email=f"u{i}@example.com", translate_enabled=True,
+                                  preferred_language=languages[i % len(languages)]) for i in range(args.members)]
+            session.add(group)
+            session.flush()
+            session.add_all([Message(content=f"message {i}", language="en", owner_id=group.members[0].id,
+                                     group_id=group.id) for i in range(args.messages)])
+            session.commit()
+            group_id = group.id
+
+        translator = _CountingTranslator()
+        started = time.perf_counter()
+        if approach == "per-member":
+            with Session() as session:
+                for message in session.scalars(select(Message).where(Message.group_id == group_id)):
+                    for member in session.get(Group, group_id).members:
+                        if member.translate_enabled and member.preferred_language != message.language:
+                            translator.translate([message.content], dest=member.preferred_language, src="en")
+        else:
+            index = MembershipIndex()
+            with Session() as session:
+                index.load(session)
+                ids = session.scalars(select(Message.id).where(Message.group_id == group_id)).all()
+            FanoutPlanner(index, translator, engine).fanout(ids)
+        results[approach] = (time.perf_counter() - started, translator.calls, translator.texts)
+
+    for approach, (seconds, calls, texts) in results.items():
+        print(f"{approach:>10}: {seconds * 1000:8.1f} ms  {calls:6d} translate calls  {texts:7d} texts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#feeds.py
+
+"""Message feeds for a group or a user, newest first, with keyset pagination.
+
+Pages are cut on (created_at, id) instead of OFFSET: the next page starts
+right after the last row of the previous one, found by a range scan on
+`ix_messages_group_created` / `ix_messages_owner_created` (the id tie-breaker
+is the rowid every SQLite index already carries), so page 1000 costs the
+same as page 1.
+
+Each page is one round-trip: the owner and the translation into the
+viewer's language are joined in (`joinedload` with a target_lang filter on
+the relationship); any other lazy relationship access raises instead of
+quietly issuing one query per message.
+
+    from db import ReadSessionLocal
+    with ReadSessionLocal() as session:
+        page = group_feed(session, group_id=1, language="fr")
+        older = group_feed(session, group_id=1, language="fr", cursor=page.next_cursor)
+"""
+
+import base64
+import datetime
+from dataclasses import dataclass, field
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import joinedload, raiseload
+
+from models.message import Message
+from models.translation import Translation
+from models.user import User
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+@dataclass
+class FeedPage:
+    items: list = field(default_factory=list)
+    next_cursor: str = None        # None on the last page
+
+
+def encode_cursor(created_at, message_id):
+    raw = f"{created_at.isoformat()}|{message_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, message_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii").split("|")
+        return datetime.datetime.fromisoformat(created_at), int(message_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"invalid feed cursor {cursor!r}") from e
+
+
+def group_feed(session, group_id, language=None, cursor=None, limit=PAGE_SIZE):
+    """Messages of a group; `language`: the viewer's preferred_language."""
+    return _feed(session, Message.group_id == group_id, language, cursor, limit)
+
+
+def user_feed(session, owner_id, language=None, cursor=None, limit=PAGE_SIZE):
+    """Messages written by a user."""
+    return _feed(session, Message.owner_id == owner_id, language, cursor, limit)
+
+
+def viewer_language(session, viewer_id):
+    return session.execute(select(User.preferred_language).where(User.id == viewer_id)).scalar()
+
+
+def _feed(session, condition, language, cursor, limit):
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = select(Message).where(condition)
+    if cursor:
+        query = query.where(tuple_(Message.created_at, Message.id) < tuple_(*decode_cursor(cursor)))
+
+    options = [joinedload(Message.owner)]
+    if language:
+        # At most one row per message (uq_translation_message_target).
+        options.append(joinedload(Message.translations.and_(Translation.target_lang == language)))
+    options.append(raiseload("*"))
+    query = (query.options(*options)
+             .order_by(Message.created_at.desc(), Message.id.desc())
+             .limit(limit + 1))       # one extra row tells whether there is a next page
+
+    messages = session.execute(query).unique().scalars().all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    items = [_serialize(m, language) for m in messages]
+    next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id) if has_more else None
+    return FeedPage(items, next_cursor)
+
+
+def _serialize(message, language):
+    translation = message.translations[0] if language and message.translations else None
+    return {
+        "id": message.id,
+        "content": message.content,
+        "language": message.language,
+        "created_at": message.created_at.isoformat() if message.created_at else None,
+        "group_id": message.group_id,
+        "owner": {"id": message.owner.id, "username": message.owner.username} if message.owner else None,
+        "translation": translation.translated_text if translation else None,
+        "is_translated": bool(message.is_translated),
+    }
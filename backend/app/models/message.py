@@ -28,4 +28,6 @@ class Message(Base):
 # Index to support queries like: messages by owner ordered by created_at
 from sqlalchemy import Index
 Index("ix_messages_owner_created", Message.__table__.c.owner_id, Message.__table__.c.created_at)
+# Same for group conversations (feeds.group_feed keyset pagination)
+Index("ix_messages_group_created", Message.__table__.c.group_id, Message.__table__.c.created_at)
 
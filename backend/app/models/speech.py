@@ -12,6 +12,7 @@ class SpeechData(Base):
     message_id = Column(Integer, ForeignKey("messages.id"), nullable=True, index=True)
     audio_path = Column(String, nullable=False)
     duration = Column(Float, nullable=True)
+    sample_rate = Column(Integer, nullable=True)
     language = Column(String, nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
 
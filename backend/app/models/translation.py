@@ -14,6 +14,8 @@ class Translation(Base):
     target_lang = Column(String, nullable=False, index=True)
     original_text = Column(Text, nullable=False)
     translated_text = Column(Text, nullable=False)
+    # sha256 of the normalized original text, used as a translation-cache lookup key
+    source_hash = Column(String(64), nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
 
     user = relationship("User", back_populates="translations")
@@ -22,6 +24,7 @@ class Translation(Base):
     __table_args__ = (
         UniqueConstraint("message_id", "target_lang", name="uq_translation_message_target"),
         Index("ix_translation_message_target", "message_id", "target_lang"),
+        Index("ix_translation_hash_target", "source_hash", "target_lang", "source_lang"),
     )
 
     def __repr__(self):
@@ -0,0 +1,271 @@
+#persistence.py
+
+"""Write-behind persistence of transcripts, translations and speech metadata.
+
+The speech pipeline only calls `record_utterance()` / `record_translation()`,
+which put a dict on an in-memory queue and return immediately. A background
+thread appends every record to a small JSON-lines journal, buffers it, and
+flushes the buffer to `messages`, `speech_data` and `translations` in one
+transaction with bulk Core inserts once `max_batch` records are waiting or
+the oldest has waited `max_delay` seconds. After a successful commit the
+journal is truncated; on start, records left in it by a crash are replayed.
+
+Delivery is at-least-once: a crash between a commit and the journal
+truncation replays that batch. The writer thread takes every record already
+queued at once, appends them to the journal and fsyncs it, so journaled
+records survive a power loss too. What a crash loses is what never reached
+the journal: records still in the in-memory queue, i.e. queued while the
+thread was busy (at worst for the duration of one database flush).
+
+record_utterance() returns a unique key (a uuid) and record_translation()
+takes it back: the translation is linked to that message, found first in
+the same batch and then among recently flushed messages.
+
+A batch that keeps failing (`max_attempts` flushes in a row, or once when
+replaying the journal) is written record by record; the records that still
+fail are moved to `<journal>.failed.jsonl` so one bad record (e.g. an
+unknown user id) cannot block every later write.
+"""
+
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from sqlalchemy import insert, select
+
+from db import make_engine, upgrade_schema
+from models.message import Message
+from models.speech import SpeechData
+from models.translation import Translation
+from models.user import User
+
+UTTERANCE = "utterance"
+TRANSLATION = "translation"
+_STOP = object()
+
+
+def resolve_user_id(engine, user):
+    """User id for an existing user id or username (None if unknown)."""
+    if user is None:
+        return None
+    column = User.id if str(user).isdigit() else User.username
+    value = int(user) if str(user).isdigit() else user
+    with engine.connect() as conn:
+        return conn.execute(select(User.id).where(column == value)).scalar()
+
+
+class WriteBehindWriter:
+    def __init__(self, engine, journal_path=None, max_batch=200, max_delay=2.0, remember=10000, max_attempts=3):
+        self.engine = engine
+        self.journal_path = journal_path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self._attempts = 0                     # consecutive failed flushes of the current buffer
+        self._queue = queue.SimpleQueue()
+        self._buffer = []
+        self._message_ids = OrderedDict()      # key -> messages.id of recently flushed utterances
+        self._remember = remember
+        self._journal = None
+        self.flushes = 0
+        self.written = 0
+        self.errors = 0
+        self.quarantined = 0
+        self.replayed = self._replay_journal() if journal_path else 0
+        self._thread = threading.Thread(target=self._run, daemon=True, name="write-behind")
+        self._thread.start()
+
+    @classmethod
+    def from_url(cls, database_url, profile="production", **kwargs):
+        engine = make_engine(database_url, profile)
+        upgrade_schema(engine)
+        return cls(engine, **kwargs)
+
+    # --- Producer side (never blocks) ---
+    def record_utterance(self, content, language=None, owner_id=None, group_id=None,
+                         audio_path=None, duration=None):
+        """Queue a message; returns the key to pass to record_translation()."""
+        key = uuid.uuid4().hex
+        self._queue.put({
+            "kind": UTTERANCE, "key": key, "content": content, "language": language,
+            "owner_id": owner_id, "group_id": group_id, "audio_path": audio_path, "duration": duration,
+            "created_at": datetime.datetime.utcnow().isoformat(),
+        })
+        return key
+
+    def record_translation(self, key, source_lang, target_lang, original_text, translated_text,
+                           user_id=None, source_hash=None):
+        self._queue.put({
+            "kind": TRANSLATION, "key": key, "source_lang": source_lang or "auto", "target_lang": target_lang,
+            "original_text": original_text, "translated_text": translated_text, "user_id": user_id,
+            "source_hash": source_hash, "created_at": datetime.datetime.utcnow().isoformat(),
+        })
+
+    def close(self):
+        """Flush everything still buffered and stop the writer thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        return {"written": self.written, "flushes": self.flushes, "buffered": len(self._buffer),
+                "errors": self.errors, "quarantined": self.quarantined, "replayed": self.replayed}
+
+    # --- Writer thread ---
+    def _run(self):
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                record = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+            stop = record is _STOP
+            records = [] if record is None or stop else [record]
+            while records and not stop and len(records) < self.max_batch:     # take what is already queued
+                try:
+                    more = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is _STOP:
+                    stop = True
+                else:
+                    records.append(more)
+            if records:
+                self._append_journal(records)
+                self._buffer.extend(records)
+                if deadline is None:
+                    deadline = time.monotonic() + self.max_delay
+            if stop:
+                self._flush(retry=False)      # last chance: write what can be written
+                if self._journal is not None:
+                    self._journal.close()
+                return
+            if self._buffer and (len(self._buffer) >= self.max_batch or time.monotonic() >= deadline):
+                self._flush()
+                # On failure the records stay buffered (and journaled) for the next attempt.
+                deadline = time.monotonic() + self.max_delay if self._buffer else None
+
+    def _flush(self, retry=True):
+        if not self._buffer:
+            return
+        batch = self._buffer
+        written = len(batch)
+        try:
+            with self.engine.begin() as conn:
+                self._remember_ids(self._write(conn, batch))
+        except Exception as e:
+            self.errors += 1
+            self._attempts += 1
+            if retry and self._attempts < self.max_attempts:
+                print(f"⚠️ Write-behind flush of {len(batch)} record(s) failed, will retry:", e)
+                return
+            print(f"⚠️ Write-behind flush of {len(batch)} record(s) failed ({e}), writing them one by one")
+            written = self._write_each(batch)
+        self._attempts = 0
+        self._buffer = []
+        self.flushes += 1
+        self.written += written
+        self._truncate_journal()
+
+    def _write_each(self, batch):
+        """Write records in their own transactions (utterances before the
+        translations that follow them); quarantine the failures. Returns the
+        number written."""
+        written = 0
+        for record in batch:
+            try:
+                with self.engine.begin() as conn:
+                    self._remember_ids(self._write(conn, [record]))
+                written += 1
+            except Exception as e:
+                self._quarantine(record, e)
+        return written
+
+    def _remember_ids(self, ids):
+        for key, message_id in ids:
+            self._message_ids[key] = message_id
+            self._message_ids.move_to_end(key)
+        while len(self._message_ids) > self._remember:
+            self._message_ids.popitem(last=False)
+
+    def _quarantine(self, record, error):
+        self.quarantined += 1
+        print(f"⚠️ Dropping {record['kind']} record {record['key']}: {error}")
+        if self.journal_path is not None:
+            with open(self.journal_path + ".failed.jsonl", "a", encoding="utf-8") as f:
+                f.write(json.dumps(dict(record, error=str(error)), ensure_ascii=False) + "\n")
+
+    def _write(self, conn, batch):
+        """Bulk-insert one batch inside the caller's transaction; returns
+        [(key, message id)] of the new messages."""
+        utterances = [r for r in batch if r["kind"] == UTTERANCE]
+        translations = [r for r in batch if r["kind"] == TRANSLATION]
+        ids = []
+        if utterances:
+            rows = [{"content": r["content"], "language": r["language"], "owner_id": r["owner_id"],
+                     "group_id": r["group_id"], "created_at": _timestamp(r["created_at"])} for r in utterances]
+            result = conn.execute(insert(Message).returning(Message.id, sort_by_parameter_order=True), rows)
+            ids = [(r["key"], message_id) for r, message_id in zip(utterances, result.scalars())]
+            speech = [{"user_id": r["owner_id"], "message_id": message_id, "audio_path": r["audio_path"],
+                       "duration": r["duration"], "language": r["language"],
+                       "created_at": _timestamp(r["created_at"])}
+                      for r, (_, message_id) in zip(utterances, ids) if r["audio_path"]]
+            if speech:
+                conn.execute(insert(SpeechData), speech)
+        if translations:
+            batch_ids = dict(ids)
+            rows = []
+            for r in translations:
+                message_id = batch_ids.get(r["key"], self._message_ids.get(r["key"]))
+                rows.append({"user_id": r["user_id"], "message_id": message_id,
+                             "source_lang": r["source_lang"], "target_lang": r["target_lang"],
+                             "original_text": r["original_text"], "translated_text": r["translated_text"],
+                             "source_hash": r["source_hash"], "created_at": _timestamp(r["created_at"])})
+            conn.execute(insert(Translation), rows)
+            linked = {row["message_id"] for row in rows if row["message_id"] is not None}
+            if linked:
+                conn.execute(Message.__table__.update().where(Message.id.in_(linked)).values(is_translated=True))
+        return ids
+
+    # --- Journal ---
+    def _append_journal(self, records):
+        """Append a batch of records and fsync once for all of them."""
+        if self.journal_path is None:
+            return
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _truncate_journal(self):
+        if self._journal is not None:
+            self._journal.seek(0)
+            self._journal.truncate()
+
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_path):
+            return 0
+        records = []
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break        # torn last line from the crash
+        if not records:
+            return 0
+        print(f"♻️ Replaying {len(records)} journaled record(s) from {self.journal_path}")
+        self._buffer = records
+        self._flush(retry=False)
+        os.truncate(self.journal_path, 0)
+        return len(records)
+
+
+def _timestamp(value):
+    return datetime.datetime.fromisoformat(value)
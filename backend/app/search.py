@@ -0,0 +1,299 @@
+#search.py
+
+"""Full-text search over messages and stored translations (SQLite FTS5).
+
+Two external-content FTS5 tables index the existing rows without copying
+the text: `messages_fts` over messages.content and `translations_fts` over
+translations.original_text / translated_text (through the view
+`translations_search`, which adds the message's group). Both also index the
+group id, so a search in one group is a single MATCH on the index instead of
+every match of every group joined and filtered afterwards. The `unicode61`
+tokenizer with diacritics folding handles the Latin, Cyrillic, Greek...
+scripts the pipeline produces ("cafe" finds "café").
+
+After `install()`, triggers keep both indexes in sync with every insert,
+update of the text or group and delete, whatever the write path (ORM
+sessions, the write-behind writer's bulk inserts). The group of a
+translation is read from its message, so translations must be deleted
+before their message (as archive.py does). Rows that existed before the
+install are indexed by `rebuild()` in small committed batches, resumable:
+progress is kept in `search_state`, so an interrupted rebuild continues
+where it stopped. Run from backend/app:
+
+    python search.py install
+    python search.py rebuild [--batch 5000] [--full]
+    python search.py query --group 1 "bonjour"
+
+bm25 scores are only comparable within one index, so messages and
+translations are searched (and paged) separately. Pages are keyset-paged on
+(rank, id): pass a page's `next_cursor` as `after` to get the next one.
+"""
+
+import argparse
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import text
+
+TOKENIZER = "unicode61 remove_diacritics 2"
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+GROUP_COLUMN = "group_id"
+
+# source name -> (table, FTS content table or view, text columns)
+SOURCES = {
+    "messages": ("messages", "messages", ("content",)),
+    "translations": ("translations", "translations_search", ("original_text", "translated_text")),
+}
+
+
+@dataclass
+class SearchPage:
+    items: list = field(default_factory=list)
+    next_cursor: tuple = None      # (rank, id) of the last item; None on the last page
+
+
+# --- Schema ---
+def install(engine):
+    """Create the FTS tables, the sync triggers and the backfill state.
+    Idempotent; existing rows are left for rebuild(). An index created
+    without the group column is dropped and left for rebuild() too."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS search_state ("
+            "source TEXT PRIMARY KEY, indexed_upto INTEGER NOT NULL, backfill_upto INTEGER NOT NULL)"
+        ))
+        conn.execute(text(
+            "CREATE VIEW IF NOT EXISTS translations_search AS "
+            "SELECT t.id, t.original_text, t.translated_text, m.group_id "
+            "FROM translations t LEFT JOIN messages m ON m.id = t.message_id"
+        ))
+        for source, (table, content, columns) in SOURCES.items():
+            fts = f"{table}_fts"
+            _drop_outdated(conn, source, fts, columns)
+            cols = ", ".join(columns + (GROUP_COLUMN,))
+            group = ("{row}.group_id" if table == "messages"
+                     else "(SELECT group_id FROM messages WHERE id = {row}.message_id)")
+            new_cols = ", ".join([f"new.{c}" for c in columns] + [group.format(row="new")])
+            old_cols = ", ".join([f"old.{c}" for c in columns] + [group.format(row="old")])
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"{cols}, content='{content}', content_rowid='id', tokenize='{TOKENIZER}')"
+            ))
+            # Everything up to the current max id is the backfill's job; newer
+            # rows are indexed by the triggers.
+            conn.execute(text(
+                "INSERT OR IGNORE INTO search_state (source, indexed_upto, backfill_upto) "
+                f"SELECT :source, 0, COALESCE(MAX(id), 0) FROM {table}"
+            ), {"source": source})
+            # A 'delete' must carry the indexed values of a row that is in the
+            # index, so rows still waiting for the backfill are skipped.
+            indexed = _indexed(source, "old.id")
+            updated = ", ".join(columns + (("group_id",) if table == "messages" else ("message_id",)))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new_cols}); END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} WHEN {indexed} BEGIN "
+                f"INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {updated} ON {table} WHEN {indexed} BEGIN "
+                f"INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+                f"INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new_cols}); END"
+            ))
+        # A message moving to another group moves its indexed translations too.
+        cols = "original_text, translated_text, group_id"
+        indexed = _indexed("translations", "id")
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS translations_fts_group_au AFTER UPDATE OF group_id ON messages "
+            "WHEN old.group_id IS NOT new.group_id BEGIN "
+            f"INSERT INTO translations_fts (translations_fts, rowid, {cols}) "
+            f"SELECT 'delete', id, original_text, translated_text, old.group_id FROM translations "
+            f"WHERE message_id = old.id AND {indexed}; "
+            f"INSERT INTO translations_fts (rowid, {cols}) "
+            f"SELECT id, original_text, translated_text, new.group_id FROM translations "
+            f"WHERE message_id = new.id AND {indexed}; END"
+        ))
+
+
+def rebuild(engine, batch_size=5000, full=False):
+    """Index the rows that predate install(), `batch_size` rows per
+    transaction; returns {source: rows indexed}. `full` rebuilds both
+    indexes from scratch in one transaction (e.g. after a restore)."""
+    install(engine)
+    done = {}
+    for source, (table, content, columns) in SOURCES.items():
+        fts = f"{table}_fts"
+        cols = ", ".join(columns + (GROUP_COLUMN,))
+        if full:
+            with engine.begin() as conn:
+                conn.execute(text(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')"))
+                conn.execute(text("UPDATE search_state SET indexed_upto = backfill_upto WHERE source = :s"),
+                             {"s": source})
+                done[source] = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+            continue
+
+        done[source] = 0
+        while True:
+            with engine.begin() as conn:
+                indexed_upto, backfill_upto = conn.execute(text(
+                    "SELECT indexed_upto, backfill_upto FROM search_state WHERE source = :s"), {"s": source}).one()
+                if indexed_upto >= backfill_upto:
+                    break
+                upto = conn.execute(text(
+                    f"SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > :lo AND id <= :hi "
+                    "ORDER BY id LIMIT :n)"), {"lo": indexed_upto, "hi": backfill_upto, "n": batch_size}).scalar()
+                upto = upto if upto is not None else backfill_upto
+                result = conn.execute(text(
+                    f"INSERT INTO {fts} (rowid, {cols}) SELECT id, {cols} FROM {content} "
+                    "WHERE id > :lo AND id <= :hi"), {"lo": indexed_upto, "hi": upto})
+                conn.execute(text("UPDATE search_state SET indexed_upto = :upto WHERE source = :s"),
+                             {"upto": upto, "s": source})
+                done[source] += result.rowcount
+    return done
+
+
+def optimize(engine):
+    """Merge the FTS b-trees into one (fewer segments to scan per query)."""
+    with engine.begin() as conn:
+        for table, _, _ in SOURCES.values():
+            conn.execute(text(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('optimize')"))
+
+
+def _indexed(source, row_id):
+    """SQL condition: the row `row_id` of `source` is in the index (not still
+    waiting for the backfill)."""
+    return (f"({row_id} <= (SELECT indexed_upto FROM search_state WHERE source = '{source}') "
+            f"OR {row_id} > (SELECT backfill_upto FROM search_state WHERE source = '{source}'))")
+
+
+def _drop_outdated(conn, source, fts, columns):
+    """Drop an index whose columns are not (text columns, group_id) and reset
+    its backfill, so that it is recreated and rebuilt."""
+    existing = [row[1] for row in conn.execute(text(f"PRAGMA table_info({fts})"))]
+    if not existing or existing == list(columns + (GROUP_COLUMN,)):
+        return
+    for suffix in ("ai", "ad", "au", "group_au"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {fts}_{suffix}"))
+    conn.execute(text(f"DROP TABLE {fts}"))
+    conn.execute(text("DELETE FROM search_state WHERE source = :s"), {"s": source})
+
+
+# --- Queries ---
+def match_expression(query, columns=None, group_id=None):
+    """FTS5 query for free user text: every word must appear (prefix match on
+    the last one, for search-as-you-type) in one of `columns`; FTS operators
+    are not interpreted. `group_id` adds the group term."""
+    words = query.split()
+    if not words:
+        return None
+    terms = ['"' + w.replace('"', '""') + '"' for w in words]
+    terms[-1] += "*"
+    expression = " ".join(terms)
+    if columns:
+        expression = "{" + " ".join(columns) + "} : (" + expression + ")"
+    if group_id is not None:
+        expression += f' AND {GROUP_COLUMN} : "{int(group_id)}"'
+    return expression
+
+
+def search(conn, query, source="messages", group_id=None, language=None, limit=PAGE_SIZE, after=None):
+    """Rows of `source` ("messages" or "translations"), optionally of one
+    group, whose text matches `query`, best bm25 rank first. `language`
+    restricts translations to that target language. `after`: the
+    next_cursor of the previous page. `conn`: a Connection or Session."""
+    if source not in SOURCES:
+        raise ValueError(f"Unknown search source {source!r}, expected one of {tuple(SOURCES)}")
+    table, _, columns = SOURCES[source]
+    expression = match_expression(query, columns, group_id)
+    if expression is None:
+        return SearchPage()
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rank_after, id_after = after if after is not None else (float("-inf"), 0)
+    params = {"q": expression, "language": language, "limit": limit + 1,
+              "rank_after": rank_after, "id_after": id_after}
+    # The group column weighs nothing in the rank.
+    weights = ", ".join(["1.0"] * len(columns) + ["0.0"])
+    if source == "messages":
+        sql = f"""
+            SELECT m.id, m.id AS message_id, m.group_id, m.language,
+                   snippet(messages_fts, 0, '[', ']', '…', 12) AS snippet,
+                   bm25(messages_fts, {weights}) AS rank
+            FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid
+            WHERE messages_fts MATCH :q
+        """
+    else:
+        # Explicit columns: with -1, snippet() could pick the group column.
+        sql = f"""
+            SELECT t.id, t.message_id, t.target_lang AS language,
+                   snippet(translations_fts, 0, char(2), char(3), '…', 12) AS original_snippet,
+                   snippet(translations_fts, 1, char(2), char(3), '…', 12) AS translated_snippet,
+                   bm25(translations_fts, {weights}) AS rank
+            FROM translations_fts JOIN translations t ON t.id = translations_fts.rowid
+            WHERE translations_fts MATCH :q AND (:language IS NULL OR t.target_lang = :language)
+        """
+    rows = conn.execute(text(
+        f"SELECT * FROM ({sql}) WHERE (rank, id) > (:rank_after, :id_after) ORDER BY rank, id LIMIT :limit"
+    ), params).mappings().all()
+    items = [_item(source, r) for r in rows[:limit]]
+    last = items[-1] if len(rows) > limit else None
+    return SearchPage(items, (last["rank"], last["id"]) if last else None)
+
+
+def _item(source, row):
+    item = dict(row, source=source)
+    if source == "translations":
+        original, translated = item.pop("original_snippet"), item.pop("translated_snippet")
+        snippet = translated if "\x02" in translated else original
+        item["snippet"] = snippet.replace("\x02", "[").replace("\x03", "]")
+    return item
+
+
+def main():
+    from db import engine
+
+    parser = argparse.ArgumentParser(description="Full-text search index of messages and translations.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("install", help="create the FTS tables and sync triggers")
+    rebuild_parser = sub.add_parser("rebuild", help="index the rows that predate install")
+    rebuild_parser.add_argument("--batch", type=int, default=5000, help="rows per transaction")
+    rebuild_parser.add_argument("--full", action="store_true", help="rebuild both indexes from scratch")
+    sub.add_parser("optimize", help="merge the index segments")
+    query_parser = sub.add_parser("query", help="run a search")
+    query_parser.add_argument("text")
+    query_parser.add_argument("--source", choices=tuple(SOURCES), default=None, help="default: both, separately")
+    query_parser.add_argument("--group", type=int)
+    query_parser.add_argument("--language")
+    query_parser.add_argument("--limit", type=int, default=PAGE_SIZE)
+    query_parser.add_argument("--after", metavar="RANK:ID", help="cursor printed with the previous page")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "install":
+        install(engine)
+        print("✅ Search index installed; run `rebuild` to index existing rows.")
+    elif args.command == "rebuild":
+        done = rebuild(engine, args.batch, args.full)
+        print(f"✅ Indexed {done} in {time.perf_counter() - started:.1f}s")
+    elif args.command == "optimize":
+        optimize(engine)
+        print(f"✅ Optimized in {time.perf_counter() - started:.1f}s")
+    else:
+        after = None
+        if args.after:
+            rank, _, row_id = args.after.rpartition(":")
+            after = (float(rank), int(row_id))
+        for source in [args.source] if args.source else SOURCES:
+            with engine.connect() as conn:
+                page = search(conn, args.text, source, args.group, args.language, args.limit, after)
+            print(f"--- {source}")
+            for item in page.items:
+                print(f"#{item['message_id']} [{item['language']}] {item['snippet']}")
+            cursor = f"--after={page.next_cursor[0]!r}:{page.next_cursor[1]}" if page.next_cursor else "last page"
+            print(f"({len(page.items)} results in {(time.perf_counter() - started) * 1000:.1f} ms, {cursor})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#translation_store.py
+
+"""Persistent tier of the translation cache, backed by the `translations` table.
+
+Cache rows are ordinary Translation rows without a message (message_id NULL),
+found through `source_hash` (sha256 of the normalized original text) and the
+`ix_translation_hash_target` index.
+"""
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from db import make_engine, upgrade_schema
+from models.translation import Translation
+
+
+class TranslationStore:
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    @classmethod
+    def from_url(cls, database_url, profile="production"):
+        """Standalone store (own engine), e.g. for the AI_services processes."""
+        engine = make_engine(database_url, profile)
+        upgrade_schema(engine)
+        return cls(sessionmaker(bind=engine))
+
+    def get(self, source_hash, target_lang, source_lang=None):
+        """Most recent translation of this text into `target_lang`, or None."""
+        query = (
+            select(Translation.translated_text)
+            .where(Translation.source_hash == source_hash, Translation.target_lang == target_lang)
+            .order_by(Translation.id.desc())
+            .limit(1)
+        )
+        if source_lang:
+            query = query.where(Translation.source_lang == source_lang)
+        with self.session_factory() as session:
+            return session.execute(query).scalar()
+
+    def put(self, source_hash, source_lang, target_lang, original_text, translated_text, message_id=None):
+        with self.session_factory() as session:
+            session.add(Translation(
+                source_hash=source_hash,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                original_text=original_text,
+                translated_text=translated_text,
+                message_id=message_id,
+            ))
+            session.commit()
+
@@ -0,0 +1,26 @@
+#conftest.py
+
+"""The services are flat scripts run from their own directory (AI_services/,
+backend/app/): put both on sys.path so the tests import them the same way."""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ("AI_services", os.path.join("backend", "app")):
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Production-profile engine (WAL, foreign keys) on an empty dunno.db."""
+    from db import make_engine, upgrade_schema
+
+    engine = make_engine(f"sqlite:///{tmp_path / 'dunno.db'}", "production")
+    upgrade_schema(engine)
+    yield engine
+    engine.dispose()
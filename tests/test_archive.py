@@ -0,0 +1,96 @@
+import datetime
+import sqlite3
+
+import pytest
+from sqlalchemy import func, insert, select
+
+import archive
+from archive import Archiver
+from models.group import Group
+from models.message import Message
+from models.speech import SpeechData
+from models.translation import Translation
+
+OLD = datetime.datetime(2025, 3, 10, 12, 0)
+CUTOFF = datetime.datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def filled(engine):
+    """20 old messages in March 2025 and 2 recent ones in group 1, each with
+    a translation and a speech row."""
+    with engine.begin() as conn:
+        conn.execute(insert(Group), [{"name": "one"}])
+        rows = [{"content": f"old {i}", "group_id": 1, "created_at": OLD + datetime.timedelta(minutes=i)}
+                for i in range(20)]
+        rows += [{"content": f"new {i}", "group_id": 1, "created_at": datetime.datetime.utcnow()} for i in range(2)]
+        conn.execute(insert(Message), rows)
+        conn.execute(insert(Translation), [{"message_id": i, "source_lang": "en", "target_lang": "fr",
+                                            "original_text": f"old {i - 1}", "translated_text": f"vieux {i - 1}"}
+                                           for i in range(1, 23)])
+        conn.execute(insert(SpeechData), [{"message_id": i, "audio_path": f"{i}.wav"} for i in range(1, 23)])
+    return engine
+
+
+def counts(engine):
+    with engine.connect() as conn:
+        return [conn.execute(select(func.count()).select_from(model)).scalar()
+                for model in (Message, Translation, SpeechData)]
+
+
+def archived_ids(archiver, table="messages"):
+    with sqlite3.connect(archiver.month_path("2025-03")) as conn:
+        return [row[0] for row in conn.execute(f"SELECT id FROM {table} ORDER BY id")]
+
+
+def test_archived_messages_are_read_back(filled, tmp_path):
+    archiver = Archiver(filled, str(tmp_path / "archive"), batch_size=7, pause=0)
+    report = archiver.run(CUTOFF)
+    assert report["moved"] == {"translations": 20, "speech_data": 20, "messages": 20}
+    assert report["months"] == ["2025-03"]
+    assert counts(filled) == [2, 2, 2]
+
+    message = archiver.get_message(5)
+    assert message["content"] == "old 4" and message["archived"]
+    assert message["translations"] == [{"target_lang": "fr", "translated_text": "vieux 4"}]
+    assert archiver.get_message(21)["archived"] is False
+    assert archiver.get_message(999) is None
+
+    history = archiver.group_history(1, limit=10)
+    assert [m["content"] for m in history] == ["new 1", "new 0"] + [f"old {i}" for i in range(19, 11, -1)]
+    assert [m["archived"] for m in history] == [False] * 2 + [True] * 8
+
+
+def test_an_interrupted_run_resumes_without_duplicates(filled, tmp_path, monkeypatch):
+    archiver = Archiver(filled, str(tmp_path / "archive"), batch_size=5, pause=0.01)
+
+    def interrupt(seconds):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(archive.time, "sleep", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        archiver.run(CUTOFF)
+    monkeypatch.undo()
+    assert counts(filled) == [17, 17, 17]
+    assert archived_ids(archiver) == [1, 2, 3, 4, 5]
+
+    # A crash between the copy and the delete: the next batch is already in
+    # the archive but still in dunno.db.
+    with sqlite3.connect(archiver.month_path("2025-03")) as conn:
+        conn.execute("ATTACH DATABASE ? AS live", (filled.url.database,))
+        for table, key in archive.TABLES:
+            conn.execute(f"INSERT INTO {table} SELECT * FROM live.{table} WHERE {key} BETWEEN 6 AND 10")
+
+    report = archiver.run(CUTOFF)
+    assert report["moved"]["messages"] == 15
+    assert counts(filled) == [2, 2, 2]
+    assert archived_ids(archiver) == list(range(1, 21))
+    assert archived_ids(archiver, "translations") == list(range(1, 21))
+
+
+def test_the_newest_message_is_never_archived(engine, tmp_path):
+    with engine.begin() as conn:
+        conn.execute(insert(Message), [{"content": "only", "created_at": OLD}])
+    report = Archiver(engine, str(tmp_path / "archive"), pause=0).run(CUTOFF)
+    assert report["moved"]["messages"] == 0
+    assert counts(engine) == [1, 0, 0]
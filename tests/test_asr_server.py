@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import numpy as np
+
+from asr_server import END, SAMPLE_RATE, ASRServer, frame, replay_session
+
+
+def speech(amplitude, seed=0):
+    """1 s of noise floor, then two tone "utterances" separated by silence."""
+    rng = np.random.default_rng(seed)
+
+    def noise(seconds):
+        return 0.001 * rng.standard_normal(int(SAMPLE_RATE * seconds))
+
+    def tone(seconds):
+        t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+        return amplitude * np.sin(2 * np.pi * 220 * t) + noise(seconds)
+
+    return np.concatenate([noise(1), tone(1), noise(1), tone(0.8), noise(1)]).astype(np.float32)
+
+
+class FakeModel:
+    """decode_batch stand-in: the "text" is the peak level of the clip."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, audios, language):
+        self.batches.append(len(audios))
+        return [{"text": f"{np.abs(a).max():.1f}", "language": language or "en"} for a in audios]
+
+
+async def serve(server, clients):
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        return await asyncio.gather(*(client(port) for client in clients))
+
+
+def test_sessions_share_batches_and_get_their_own_results():
+    model = FakeModel()
+    server = ASRServer(model, max_batch=8, max_wait_ms=100)
+    levels = [0.1, 0.2, 0.3, 0.4]
+    clients = [lambda port, level=level: replay_session("127.0.0.1", port, speech(level), f"client-{level}")
+               for level in levels]
+    try:
+        results = asyncio.run(serve(server, clients))
+    finally:
+        server.close()
+
+    for level, session in zip(levels, results):
+        assert [r["text"] for r in session] == [f"{level:.1f}"] * 2
+        starts = [r["start"] for r in session]
+        assert starts == sorted(starts) and 0.5 < starts[0] < 1.2
+    assert sum(model.batches) == 8
+    assert max(model.batches) > 1
+
+
+def test_a_session_must_start_with_hello():
+    async def client(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(frame(END))
+        await writer.drain()
+        lines = [json.loads(line) for line in (await reader.read()).splitlines()]
+        writer.close()
+        return lines
+
+    server = ASRServer(FakeModel())
+    try:
+        (lines,) = asyncio.run(serve(server, [client]))
+    finally:
+        server.close()
+    assert lines == [{"event": "end"}]
+    assert server.active == 0
+
+
+def test_language_is_passed_to_the_model():
+    model = FakeModel()
+    server = ASRServer(model, max_wait_ms=10)
+
+    async def client(port):
+        return await replay_session("127.0.0.1", port, speech(0.3), "fr-client", language="fr")
+
+    try:
+        (session,) = asyncio.run(serve(server, [client]))
+    finally:
+        server.close()
+    assert [r["language"] for r in session] == ["fr", "fr"]
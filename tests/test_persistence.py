@@ -0,0 +1,56 @@
+import json
+
+from sqlalchemy import func, select
+
+from models.message import Message
+from models.translation import Translation
+from persistence import WriteBehindWriter
+
+
+def count(engine, model):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model)).scalar()
+
+
+def test_translations_are_linked_to_their_messages(engine, tmp_path):
+    writer = WriteBehindWriter(engine, str(tmp_path / "journal.jsonl"), max_batch=3, max_delay=0.05)
+    for i in range(5):
+        key = writer.record_utterance(f"hello {i}", "en")
+        writer.record_translation(key, "en", "fr", f"hello {i}", f"bonjour {i}", source_hash=f"h{i}")
+    writer.close()
+    assert writer.stats()["written"] == 10
+    with engine.connect() as conn:
+        rows = conn.execute(select(Message.content, Translation.translated_text, Message.is_translated)
+                            .join(Translation, Translation.message_id == Message.id)
+                            .order_by(Message.id)).all()
+    assert rows == [(f"hello {i}", f"bonjour {i}", True) for i in range(5)]
+    assert (tmp_path / "journal.jsonl").read_text() == ""
+
+
+def test_a_bad_record_is_quarantined_and_the_rest_written(engine, tmp_path):
+    journal = tmp_path / "journal.jsonl"
+    writer = WriteBehindWriter(engine, str(journal), max_batch=10, max_delay=0.05, max_attempts=2)
+    writer.record_utterance("fine", "en")
+    bad = writer.record_utterance("unknown owner", "en", owner_id=999)     # foreign key violation
+    writer.record_utterance("also fine", "en")
+    writer.close()
+
+    assert writer.quarantined == 1
+    assert count(engine, Message) == 2
+    (failed,) = [json.loads(line) for line in (tmp_path / "journal.jsonl.failed.jsonl").read_text().splitlines()]
+    assert failed["key"] == bad and "FOREIGN KEY" in failed["error"]
+
+
+def test_records_left_in_the_journal_are_replayed(engine, tmp_path):
+    journal = tmp_path / "journal.jsonl"
+    record = {"kind": "utterance", "key": "k1", "content": "before the crash", "language": "en",
+              "owner_id": None, "group_id": None, "audio_path": None, "duration": None,
+              "created_at": "2026-01-01T10:00:00"}
+    journal.write_text(json.dumps(record) + "\n" + '{"kind": "utter')     # torn last line
+
+    writer = WriteBehindWriter(engine, str(journal))
+    writer.close()
+    assert writer.replayed == 1
+    with engine.connect() as conn:
+        assert conn.execute(select(Message.content)).scalars().all() == ["before the crash"]
+    assert journal.read_text() == ""
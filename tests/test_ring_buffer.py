@@ -0,0 +1,66 @@
+import threading
+
+import numpy as np
+
+from ring_buffer import BLOCK, DROP_NEWEST, DROP_OLDEST, RingBuffer
+
+
+def test_views_stay_contiguous_across_the_wrap():
+    ring = RingBuffer(8)
+    ring.write(np.arange(6, dtype=np.float32))
+    assert ring.read(6).tolist() == list(range(6))
+    ring.write(np.arange(6, 12, dtype=np.float32))    # wraps at slot 8
+    start, view = ring.peek()
+    assert start == 6
+    assert view.tolist() == list(range(6, 12))
+    assert view.base is not None                        # a view into the ring, not a copy
+
+
+def test_drop_oldest_keeps_the_most_recent_audio():
+    ring = RingBuffer(8, policy=DROP_OLDEST)
+    for block in range(3):
+        ring.write(np.arange(block * 5, block * 5 + 5, dtype=np.float32))
+    start, view = ring.peek()
+    assert start == 7
+    assert view.tolist() == list(range(7, 15))
+    assert ring.dropped_oldest == 7 and ring.overruns == 2
+
+
+def test_drop_newest_keeps_the_backlog():
+    ring = RingBuffer(8, policy=DROP_NEWEST)
+    ring.write(np.arange(6, dtype=np.float32))
+    assert ring.write(np.arange(6, 11, dtype=np.float32)) == 2
+    assert ring.read().tolist() == list(range(8))
+    assert ring.dropped_newest == 3
+
+
+def test_block_waits_for_the_consumer():
+    ring = RingBuffer(4, policy=BLOCK, block_timeout=5)
+    ring.write(np.zeros(4, dtype=np.float32))
+    threading.Timer(0.05, ring.advance, (4,)).start()
+    assert ring.write(np.ones(4, dtype=np.float32)) == 4
+    assert ring.read().tolist() == [1.0] * 4
+
+
+def test_block_larger_than_the_ring_keeps_its_tail():
+    ring = RingBuffer(4)
+    ring.write(np.arange(10, dtype=np.float32))
+    start, view = ring.peek()
+    assert (start, view.tolist()) == (6, [6.0, 7.0, 8.0, 9.0])
+
+
+def test_capture_time_of_each_write():
+    ring = RingBuffer(16)
+    ring.write(np.zeros(4, dtype=np.float32), captured=100.0)
+    ring.write(np.zeros(4, dtype=np.float32), captured=101.0)
+    assert ring.capture_time(0) == 100.0
+    assert ring.capture_time(3) == 100.0
+    assert ring.capture_time(4) == 101.0
+    assert ring.capture_time(7) == 101.0
+
+
+def test_blocks_drain_after_close():
+    ring = RingBuffer(8)
+    ring.write(np.arange(5, dtype=np.float32))
+    ring.close()
+    assert [view.tolist() for view in ring.blocks()] == [list(range(5))]
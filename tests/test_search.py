@@ -0,0 +1,61 @@
+from sqlalchemy import insert, text
+
+import search
+from models.group import Group
+from models.message import Message
+
+
+def add_messages(engine, rows):
+    with engine.begin() as conn:
+        conn.execute(insert(Message), [{"content": content, "group_id": group, "language": "fr"}
+                                       for content, group in rows])
+
+
+def all_pages(engine, query, **kwargs):
+    pages, after = [], None
+    with engine.connect() as conn:
+        while True:
+            page = search.search(conn, query, after=after, **kwargs)
+            pages.append(page.items)
+            if page.next_cursor is None:
+                return pages
+            after = page.next_cursor
+
+
+def test_keyset_pages_cover_every_match_once(engine):
+    with engine.begin() as conn:
+        conn.execute(insert(Group), [{"name": "one"}, {"name": "two"}])
+    # Rows before install() are the backfill's job, rows after it the triggers'.
+    add_messages(engine, [(f"bonjour café {'très ' * (i % 4)}numéro {i}", 1) for i in range(12)])
+    search.install(engine)
+    assert search.rebuild(engine, batch_size=5)["messages"] == 12
+    add_messages(engine, [(f"bonjour {'encore ' * (i % 3)}{i}", 1) for i in range(13)])
+    add_messages(engine, [("bonjour d'ailleurs", 2)] * 5 + [("au revoir", 1)])
+
+    pages = all_pages(engine, "bonjour", group_id=1, limit=10)
+    assert [len(items) for items in pages] == [10, 10, 5]
+    items = [item for page in pages for item in page]
+    assert len({item["id"] for item in items}) == 25
+    assert {item["group_id"] for item in items} == {1}
+    keys = [(item["rank"], item["id"]) for item in items]
+    assert keys == sorted(keys)
+
+
+def test_match_folds_diacritics_and_prefixes(engine):
+    with engine.begin() as conn:
+        conn.execute(insert(Group), [{"name": "one"}])
+    search.install(engine)
+    add_messages(engine, [("un café crème", 1), ("cafeteria", 1), ("thé", 1)])
+    (items,) = all_pages(engine, "cafe")
+    assert sorted(item["snippet"] for item in items) == ["[cafeteria]", "un [café] crème"]
+
+
+def test_deleted_rows_leave_the_index(engine):
+    with engine.begin() as conn:
+        conn.execute(insert(Group), [{"name": "one"}])
+    search.install(engine)
+    add_messages(engine, [("bonjour", 1), ("bonjour", 1)])
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM messages WHERE id = 1"))
+    (items,) = all_pages(engine, "bonjour")
+    assert [item["id"] for item in items] == [2]
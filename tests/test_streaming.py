@@ -0,0 +1,81 @@
+import numpy as np
+
+from streaming import HypothesisBuffer, StreamingTranscriber
+
+SAMPLE_RATE = 16000
+
+
+def test_hypothesis_buffer_commits_the_agreed_prefix():
+    buffer = HypothesisBuffer()
+    buffer.insert([(0.0, 0.4, " hello"), (0.5, 0.9, " wold")], 0.0)
+    assert buffer.flush() == []
+    buffer.insert([(0.0, 0.4, " Hello"), (0.5, 0.9, " world"), (1.0, 1.3, " again")], 0.0)
+    assert [w for _, _, w in buffer.flush()] == [" Hello"]
+    assert buffer.last_committed_time == 0.4
+    assert [w for _, _, w in buffer.pending()] == [" world", " again"]
+
+
+def test_hypothesis_buffer_strips_repeated_committed_words():
+    buffer = HypothesisBuffer()
+    for _ in range(2):
+        buffer.insert([(0.0, 0.4, " one"), (0.5, 0.9, " two")], 0.0)
+        buffer.flush()
+    assert [w for _, _, w in buffer.committed] == [" one", " two"]
+    # The decoder repeats "two" (ending at the commit point) before the new word.
+    for _ in range(2):
+        buffer.insert([(0.85, 0.9, " two"), (1.0, 1.4, " three")], 0.0)
+        buffer.flush()
+    assert [w for _, _, w in buffer.committed] == [" one", " two", " three"]
+
+
+class ScriptedDecoder:
+    """Decodes the buffer into one word per second of stream time."""
+
+    def __init__(self, transcriber):
+        self.transcriber = transcriber
+        self.windows = []
+
+    def __call__(self, audio, prompt):
+        offset = self.transcriber.buffer_offset
+        duration = len(audio) / SAMPLE_RATE
+        self.windows.append(duration)
+        words = []
+        for second in range(int(offset), int(offset + duration)):
+            if second >= offset:
+                words.append((second - offset, second + 0.8 - offset, f" w{second}"))
+        return words
+
+
+def test_streaming_commits_every_word_once_and_trims_the_buffer():
+    committed = []
+    transcriber = StreamingTranscriber(on_commit=committed.append, step=0.5, max_buffer=12.0)
+    decoder = ScriptedDecoder(transcriber)
+    transcriber.decode = decoder
+    for _ in range(40):
+        transcriber.insert_audio(np.zeros(SAMPLE_RATE // 2, dtype=np.float32))
+        if transcriber.ready():
+            transcriber.process()
+    transcriber.finish()
+    words = " ".join(committed).split()
+    assert words == [f"w{i}" for i in range(20)]
+    assert max(decoder.windows) < 3.0
+
+
+def test_streaming_bounds_the_buffer_when_nothing_is_decoded():
+    transcriber = StreamingTranscriber(decode=lambda audio, prompt: [], step=0.5, max_buffer=4.0)
+    for _ in range(40):
+        transcriber.insert_audio(np.zeros(SAMPLE_RATE // 2, dtype=np.float32))
+        transcriber.process()
+        assert transcriber.buffered_seconds <= 4.0
+
+
+def test_streaming_commits_a_hypothesis_that_never_stabilises():
+    committed = []
+    flips = iter(range(1000))
+    transcriber = StreamingTranscriber(on_commit=committed.append, step=0.5, max_buffer=3.0,
+                                       decode=lambda audio, prompt: [(0.0, 0.5, f" take{next(flips)}")])
+    for _ in range(20):
+        transcriber.insert_audio(np.zeros(SAMPLE_RATE // 2, dtype=np.float32))
+        transcriber.process()
+    assert committed
+    assert transcriber.buffered_seconds <= 3.0
@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+from fakes import FakeTranslator
+from translate_batcher import BatchedTranslator, MicroBatcher
+from translation_cache import TranslationCache
+
+
+def test_micro_batcher_coalesces_and_keeps_order():
+    gate = threading.Event()
+    sizes = []
+
+    def batch_fn(items):
+        gate.wait(5)
+        sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_items=4, max_wait_ms=200, max_in_flight=1)
+    futures = [batcher.submit(i) for i in range(10)]
+    gate.set()
+    assert [f.result(5) for f in futures] == [i * 2 for i in range(10)]
+    batcher.close()
+    assert sum(sizes) == 10 and max(sizes) <= 4
+    assert len(sizes) < 10
+    assert batcher.stats()["items"] == 10
+
+
+def test_micro_batcher_fails_every_future_of_a_failed_batch():
+    def batch_fn(items):
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(batch_fn, max_items=8, max_wait_ms=50)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(5)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
+
+
+def test_micro_batcher_rejects_a_short_result_list():
+    batcher = MicroBatcher(lambda items: items[:-1], max_items=2, max_wait_ms=200)
+    futures = [batcher.submit(i) for i in range(2)]
+    with pytest.raises(RuntimeError):
+        futures[0].result(5)
+    batcher.close()
+
+
+def test_batched_translator_translates_duplicates_once():
+    translator = FakeTranslator()
+    translations = BatchedTranslator(translator, TranslationCache(translator), max_items=8, max_wait_ms=200)
+    futures = [translations.submit(text, "fr") for text in ("hello", "Hello ", "bye", "hello")]
+    assert [f.result(5) for f in futures] == ["[fr] hello", "[fr] hello", "[fr] bye", "[fr] hello"]
+    translations.close()
+    assert translator.calls == 1
+    assert translator.items == 2
+    stats = translations.stats()
+    assert stats["translator_calls"] == 1 and stats["translated"] == 2
+    assert stats["cache"]["translator_calls"] == 1
+
+
+def test_batched_translator_answers_memory_hits_without_the_translator():
+    translator = FakeTranslator()
+    translations = BatchedTranslator(translator, TranslationCache(translator), max_wait_ms=10)
+    assert translations.submit("good morning", "es").result(5) == "[es] good morning"
+    hit = translations.submit("good morning", "es")
+    assert hit.done() and hit.result() == "[es] good morning"
+    # Same text, other language: a new translator call.
+    assert translations.submit("good morning", "de").result(5) == "[de] good morning"
+    translations.close()
+    assert translator.calls == 2
+
+
+def test_batched_translator_uses_the_store_from_the_worker():
+    class Store:
+        def __init__(self):
+            self.rows = {}
+            self.threads = set()
+
+        def get(self, source_hash, target_lang, source_lang=None):
+            self.threads.add(threading.current_thread().name)
+            return self.rows.get((source_hash, target_lang))
+
+        def put(self, source_hash, source_lang, target_lang, original, translated):
+            self.rows[(source_hash, target_lang)] = translated
+
+    store = Store()
+    translator = FakeTranslator()
+    first = BatchedTranslator(translator, TranslationCache(translator, store=store), max_wait_ms=10)
+    assert first.submit("see you", "it").result(5) == "[it] see you"
+    first.close()
+
+    # A fresh process: empty memory tier, the store answers.
+    second = BatchedTranslator(translator, TranslationCache(translator, store=store), max_wait_ms=10)
+    assert second.submit("see you", "it").result(5) == "[it] see you"
+    second.close()
+    assert translator.calls == 1
+    assert threading.current_thread().name not in store.threads
+
+
+def test_read_only_store_is_not_written():
+    class Store:
+        puts = 0
+
+        def get(self, *args):
+            return None
+
+        def put(self, *args):
+            Store.puts += 1
+
+    translator = FakeTranslator()
+    cache = TranslationCache(translator, store=Store(), store_writes=False)
+    assert cache.translate("thanks", "fr") == "[fr] thanks"
+    assert Store.puts == 0